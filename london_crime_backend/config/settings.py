@@ -27,12 +27,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'crime.middleware.RequestTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'crime.profiling.RequestProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -57,10 +59,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# CRIME_DATABASE_PATH and CRIME_DATA_DIR point a process at another copy of
+# the data, e.g. a synthetic one for the benchmarks (crime/benchmarks/)
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('CRIME_DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
@@ -78,7 +82,7 @@ REST_FRAMEWORK = {
 }
 
 # Data directory for cached Excel files
-DATA_DIR = BASE_DIR / 'data'
+DATA_DIR = Path(os.environ.get('CRIME_DATA_DIR', BASE_DIR / 'data'))
 DATA_DIR.mkdir(exist_ok=True)
 
 # data.london.gov.uk Excel URL
@@ -86,3 +90,106 @@ CRIME_DATA_EXCEL_URL = (
     'https://data.london.gov.uk/download/e5n6w/628/'
     'M1045_MonthlyCrimeDashboard_TNOCrimeData.xlsx'
 )
+
+# Aggregate query backend: 'sql' runs GROUP BY queries against the database,
+# 'cube' serves them from an in-memory columnar copy (crime/cube.py)
+CRIME_QUERY_BACKEND = os.environ.get('CRIME_QUERY_BACKEND', 'sql')
+
+# Response cache for the crime API (crime/response_cache.py). Entries are
+# keyed on the dataset version, so they never need to expire; both backends
+# are bounded and evict least-recently-used entries. 'locmem' is per
+# process, 'file' is shared by every worker on the host.
+CRIME_CACHE_BACKEND = os.environ.get('CRIME_CACHE_BACKEND', 'locmem')
+CRIME_CACHE_MAX_ENTRIES = int(os.environ.get('CRIME_CACHE_MAX_ENTRIES', 2000))
+CRIME_RESPONSE_CACHE = 'crime'
+
+CRIME_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'crime-responses',
+    },
+    'file': {
+        'BACKEND': 'crime.cache_backends.LRUFileBasedCache',
+        'LOCATION': DATA_DIR / 'response_cache',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    CRIME_RESPONSE_CACHE: {
+        **CRIME_CACHE_BACKENDS[CRIME_CACHE_BACKEND],
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': CRIME_CACHE_MAX_ENTRIES},
+    },
+}
+
+# Seconds a shared cache (reverse proxy / CDN) may serve an API response
+# before revalidating it with its ETag. Browsers always revalidate.
+CRIME_HTTP_SHARED_MAX_AGE = int(os.environ.get('CRIME_HTTP_SHARED_MAX_AGE', 3600))
+
+# Seconds a full import waits after publishing a new data generation before
+# deleting the previous one, so requests already reading it can finish
+CRIME_GENERATION_GC_DELAY = int(os.environ.get('CRIME_GENERATION_GC_DELAY', 10))
+
+# Rows import_crime_data holds in memory and writes per INSERT batch; peak
+# memory of the import grows with this, not with the size of the data file
+CRIME_IMPORT_BATCH_SIZE = int(os.environ.get('CRIME_IMPORT_BATCH_SIZE', 20000))
+
+# Months of history import_crime_data keeps: the current calendar month and
+# the months before it (0 keeps everything in the source). The CSV cache
+# holds every month, so a change applies at the next import from the cache.
+CRIME_DATA_RETENTION_MONTHS = int(os.environ.get('CRIME_DATA_RETENTION_MONTHS', 0))
+
+# Trailing windows, in months, that borough rankings are precomputed for at
+# import time (crime/rankings.py); /borough-ranking/ takes one as ?window=
+# and uses 12 months, or the longest window if 12 is not listed, by default
+CRIME_RANKING_WINDOWS = sorted({
+    int(window) for window in os.environ.get('CRIME_RANKING_WINDOWS', '3,6,12').split(',')
+})
+
+# Borough boundaries for lookups by location (crime/borough_boundaries.py):
+# the GeoJSON the frontend's map draws
+CRIME_BOROUGH_BOUNDARIES = Path(os.environ.get(
+    'CRIME_BOROUGH_BOUNDARIES',
+    BASE_DIR.parent / 'london_crime_frontend' / 'public' / 'london-boroughs.geojson',
+))
+
+# Server-Timing header and a 'crime.timing' log line for every crime API
+# request (crime/middleware.py); set to 0 to turn off
+CRIME_REQUEST_TIMING = os.environ.get('CRIME_REQUEST_TIMING', '1') != '0'
+# Level of the 'crime.timing' logger: the per-request lines are logged at
+# INFO, so set this to INFO to see them (the Server-Timing header is sent
+# either way)
+CRIME_TIMING_LOG_LEVEL = os.environ.get('CRIME_TIMING_LOG_LEVEL', 'WARNING')
+
+# Prometheus metrics at /metrics/ (crime/metrics.py); set to 0 to turn off.
+# Every worker process writes to its own file in CRIME_METRICS_DIR, which
+# must be shared by all workers of the server (and only by them).
+CRIME_METRICS = os.environ.get('CRIME_METRICS', '1') != '0'
+CRIME_METRICS_DIR = Path(os.environ.get('CRIME_METRICS_DIR', DATA_DIR / 'metrics'))
+# /metrics/ answers staff users (logged in through the admin) and, when
+# this is set, scrapers sending "Authorization: Bearer <token>"; anyone
+# else gets a 401
+CRIME_METRICS_TOKEN = os.environ.get('CRIME_METRICS_TOKEN', '')
+
+# Who may add ?_profile=1 to a crime API request to get a cProfile and SQL
+# report instead of the response (crime/profiling.py): 'staff' (admin
+# users), 'all' or 'off'
+CRIME_PROFILING = os.environ.get('CRIME_PROFILING', 'staff')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'crime.timing': {
+            'handlers': ['console'],
+            'level': CRIME_TIMING_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
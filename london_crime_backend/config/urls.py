@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from crime import views as crime_views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('crime.urls')),
+    path('metrics/', crime_views.metrics, name='metrics'),
 ]
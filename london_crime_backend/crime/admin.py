@@ -4,6 +4,7 @@ from .models import CrimeRecord
 
 @admin.register(CrimeRecord)
 class CrimeRecordAdmin(admin.ModelAdmin):
-    list_display = ('month_year', 'area_name', 'offence_group', 'count')
-    list_filter = ('area_name', 'offence_group')
-    search_fields = ('area_name', 'offence_group', 'offence_subgroup')
+    list_display = ('month_year', 'area', 'offence_group', 'count')
+    list_filter = ('area', 'offence_group')
+    list_select_related = ('area', 'offence_group')
+    search_fields = ('area__name', 'offence_group__name', 'offence_subgroup__name')
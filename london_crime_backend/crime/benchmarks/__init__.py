@@ -0,0 +1,11 @@
+"""
+Performance tooling for the crime API.
+
+- synthetic: source rows with production cardinalities, for any number of
+  months (``manage.py generate_crime_data``)
+- harness: times every endpoint over representative filters and reports
+  p50/p95 latency and query counts as JSON (``manage.py benchmark_endpoints``)
+
+Point CRIME_DATABASE_PATH and CRIME_DATA_DIR at a scratch copy before
+generating data: the generator replaces the live dataset.
+"""
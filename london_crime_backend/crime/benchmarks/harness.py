@@ -0,0 +1,215 @@
+"""
+Endpoint micro-benchmarks: time every view in crime/urls.py across
+representative filter combinations and report latency percentiles and
+query counts as JSON.
+
+Requests go through the full Django stack with the test client. Unless
+``cached`` is set, the response cache is cleared before every request, so
+the numbers are those of the views themselves.
+"""
+import math
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, reset_queries
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from .. import urls
+from ..dataset import dataset_state
+from ..models import CrimeRecord, ImportedMonth
+from ..months import month_label
+
+
+# Filter combinations for the aggregate endpoints, as (label, params)
+# builders over the latest month index in the data
+AGGREGATE_CASES = (
+    ('all months', lambda last: {}),
+    ('latest month', lambda last: {'start_date': month_label(last), 'end_date': month_label(last)}),
+    ('last 12 months', lambda last: {'start_date': month_label(last - 11), 'end_date': month_label(last)}),
+    ('last 12 months, borough', lambda last: {
+        'start_date': month_label(last - 11), 'end_date': month_label(last), 'borough': 'Camden',
+    }),
+    ('last 12 months, offence group', lambda last: {
+        'start_date': month_label(last - 11), 'end_date': month_label(last), 'offence_group': 'Theft',
+    }),
+    ('last 12 months, offence groups', lambda last: {
+        'start_date': month_label(last - 11), 'end_date': month_label(last),
+        'offence_groups': 'Burglary,Robbery,Theft',
+    }),
+    ('latest month, boroughs only, subgroup', lambda last: {
+        'start_date': month_label(last), 'end_date': month_label(last), 'area_type': 'Borough',
+        'offence_group': 'Theft', 'offence_subgroup': 'Shoplifting',
+    }),
+)
+
+AGGREGATE_ENDPOINTS = ('summary', 'borough-totals', 'time-series', 'offence-breakdown', 'dashboard')
+
+OTHER_CASES = {
+    'boroughs': (('all', {}), ('boroughs only', {'area_type': 'Borough'})),
+    'area-types': (('all', {}),),
+    'offence-groups': (('all', {}),),
+    'offence-subgroups': (('all', {}), ('one group', {'offence_group': 'Theft'})),
+    'date-range': (('all', {}),),
+    'borough-ranking': (
+        ('overall', {'postcode': 'E1 6AN'}),
+        ('offence group', {'postcode': 'SW1A 2AA', 'offence_group': 'Theft'}),
+    ),
+}
+
+# Endpoints taking a JSON body, as (label, body) cases
+POST_CASES = {
+    'borough-ranking-bulk': (
+        ('1000 postcodes, 2 groups', {
+            'postcodes': ['E1 6AN', 'SW1A 2AA', 'N1 9GU', 'SE1 7PB', 'W2 1JB'] * 200,
+            'offence_groups': ['OVERALL', 'Theft'],
+        }),
+    ),
+}
+
+
+def dataset_info():
+    """Size and month span of the live data, for the report."""
+    months = ImportedMonth.objects.aggregate(first=Min('month_index'), last=Max('month_index'))
+    if months['last'] is None:
+        months = CrimeRecord.objects.aggregate(first=Min('month_index'), last=Max('month_index'))
+    return {
+        'version': dataset_state()['version'],
+        'rows': CrimeRecord.objects.count(),
+        'first_month': month_label(months['first']) if months['first'] is not None else None,
+        'last_month': month_label(months['last']) if months['last'] is not None else None,
+        'last_month_index': months['last'],
+    }
+
+
+def endpoint_cases(last_month):
+    """
+    (url name, case label, params) for every view in crime/urls.py; views
+    without cases of their own are requested without params. For the
+    views in POST_CASES params is the JSON body.
+    """
+    cases = []
+    for pattern in urls.urlpatterns:
+        name = pattern.name
+        if name in POST_CASES:
+            cases += [(name, label, body) for label, body in POST_CASES[name]]
+        elif name in AGGREGATE_ENDPOINTS:
+            cases += [(name, label, params(last_month)) for label, params in AGGREGATE_CASES]
+        else:
+            cases += [(name, label, params) for label, params in OTHER_CASES.get(name, (('all', {}),))]
+    return cases
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def _request(client, url, params, post):
+    """Make a request and read its whole body; returns (response, body)."""
+    if post:
+        response = client.post(url, params, content_type='application/json')
+    else:
+        response = client.get(url, params)
+    if response.streaming:
+        return response, b''.join(response.streaming_content)
+    return response, response.content
+
+
+def measure(client, url, params, repeat=20, warmup=1, cached=False, post=False):
+    """
+    Time ``repeat`` requests of ``url`` (POSTing ``params`` as JSON if
+    ``post``); returns a result dict with the status, response size, query
+    count and latency statistics (ms).
+    """
+    cache = caches[settings.CRIME_RESPONSE_CACHE]
+    # Untimed: warms up, and counts the queries of an uncached request. The
+    # query log is reset when a request starts, so start capturing from empty.
+    cache.clear()
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        response, body = _request(client, url, params, post)
+    for _ in range(warmup - 1):
+        _request(client, url, params, post)
+
+    samples = []
+    for _ in range(repeat):
+        if not cached:
+            cache.clear()
+        started = time.perf_counter()
+        _request(client, url, params, post)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'status': response.status_code,
+        'bytes': len(body),
+        'queries': len(queries),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'min_ms': round(min(samples), 3),
+        'max_ms': round(max(samples), 3),
+    }
+
+
+def run(backends=None, repeat=20, warmup=1, cached=False, progress=None):
+    """
+    Benchmark every endpoint case under each query backend ('sql',
+    'cube'; the configured one by default). Returns the report dict.
+    """
+    backends = backends or [settings.CRIME_QUERY_BACKEND]
+    info = dataset_info()
+    client = Client()
+    results = []
+    for backend in backends:
+        with override_settings(CRIME_QUERY_BACKEND=backend):
+            for name, label, params in endpoint_cases(info['last_month_index'] or 0):
+                result = {
+                    'endpoint': name,
+                    'case': label,
+                    'params': params,
+                    'backend': backend,
+                    **measure(
+                        client, reverse(name), params, repeat, warmup, cached,
+                        post=name in POST_CASES,
+                    ),
+                }
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'repeat': repeat,
+        'cached': cached,
+        'dataset': info,
+        'results': results,
+    }
+
+
+def regressions(report, baseline, tolerance=1.25, slack_ms=1.0):
+    """
+    Messages for the cases of ``report`` that are slower than in
+    ``baseline`` (p50 above ``tolerance`` times the baseline's plus
+    ``slack_ms``, to ignore noise on fast views) or run more queries.
+    """
+    previous = {
+        (r['endpoint'], r['case'], r['backend']): r for r in baseline.get('results', ())
+    }
+    messages = []
+    for result in report['results']:
+        before = previous.get((result['endpoint'], result['case'], result['backend']))
+        if before is None:
+            continue
+        where = f'{result["endpoint"]} [{result["case"]}, {result["backend"]}]'
+        if result['p50_ms'] > before['p50_ms'] * tolerance + slack_ms:
+            messages.append(
+                f'{where}: p50 {result["p50_ms"]:.1f} ms, was {before["p50_ms"]:.1f} ms'
+            )
+        if result['queries'] > before['queries']:
+            messages.append(f'{where}: {result["queries"]} queries, was {before["queries"]}')
+    return messages
@@ -0,0 +1,103 @@
+"""
+Synthetic crime data with the shape of the published file.
+
+Rows have the cardinalities the dashboard sees in production: every
+London borough plus "Other / NK", wards under each borough, and every
+offence group and subgroup of the MPS data, for any number of months.
+Names are upper case like the source, so they go through the same
+cleaning as real data when imported.
+"""
+import csv
+import random
+
+from ..ingest import SOURCE_FIELDS
+from ..months import month_label
+
+
+BOROUGHS = (
+    'Barking and Dagenham', 'Barnet', 'Bexley', 'Brent', 'Bromley', 'Camden',
+    'City of London', 'Croydon', 'Ealing', 'Enfield', 'Greenwich', 'Hackney',
+    'Hammersmith and Fulham', 'Haringey', 'Harrow', 'Havering', 'Hillingdon',
+    'Hounslow', 'Islington', 'Kensington and Chelsea', 'Kingston upon Thames',
+    'Lambeth', 'Lewisham', 'Merton', 'Newham', 'Redbridge', 'Richmond upon Thames',
+    'Southwark', 'Sutton', 'Tower Hamlets', 'Waltham Forest', 'Wandsworth',
+    'Westminster',
+)
+
+# Crimes the MPS cannot place in a borough
+UNKNOWN_AREA = 'Other / NK'
+
+OFFENCES = {
+    'ARSON AND CRIMINAL DAMAGE': ('ARSON', 'CRIMINAL DAMAGE'),
+    'BURGLARY': ('BURGLARY - RESIDENTIAL', 'BURGLARY - BUSINESS AND COMMUNITY'),
+    'DRUG OFFENCES': ('DRUG TRAFFICKING', 'POSSESSION OF DRUGS'),
+    'FRAUD AND FORGERY': ('FRAUD AND FORGERY',),
+    'MISCELLANEOUS CRIMES AGAINST SOCIETY': ('MISCELLANEOUS CRIMES AGAINST SOCIETY',),
+    'NFIB FRAUD': ('NFIB FRAUD',),
+    'POSSESSION OF WEAPONS': ('POSSESSION OF WEAPONS',),
+    'PUBLIC ORDER OFFENCES': (
+        'PUBLIC FEAR ALARM OR DISTRESS', 'OTHER OFFENCES PUBLIC ORDER',
+        'RACE OR RELIGIOUS AGG PUBLIC FEAR',
+    ),
+    'ROBBERY': ('ROBBERY OF BUSINESS PROPERTY', 'ROBBERY OF PERSONAL PROPERTY'),
+    'SEXUAL OFFENCES': ('RAPE', 'OTHER SEXUAL OFFENCES'),
+    'THEFT': ('BICYCLE THEFT', 'OTHER THEFT', 'SHOPLIFTING', 'THEFT FROM THE PERSON'),
+    'VEHICLE OFFENCES': (
+        'INTERFERING WITH A MOTOR VEHICLE', 'THEFT FROM A VEHICLE',
+        'THEFT OR TAKING OF A MOTOR VEHICLE',
+    ),
+    'VIOLENCE AGAINST THE PERSON': ('HOMICIDE', 'VIOLENCE WITH INJURY', 'VIOLENCE WITHOUT INJURY'),
+}
+
+AREA_TYPES = ('Borough', 'Ward')
+
+
+def synthetic_rows(months, last_month, area_types=AREA_TYPES, wards=20, seed=0):
+    """
+    Yield source rows (SOURCE_FIELDS order) for ``months`` months up to
+    and including month index ``last_month``, month by month.
+
+    With 'Ward' in ``area_types`` each borough has ``wards`` wards, and a
+    borough's counts are the sums of its wards' counts. Rows of other area
+    types have one area per borough.
+    """
+    rng = random.Random(seed)
+    offences = [(group, sub) for group, subs in OFFENCES.items() for sub in subs]
+    areas = [(borough, [f'{borough} Ward {i + 1}' for i in range(wards)]) for borough in BOROUGHS]
+    # Typical monthly count per ward and offence, fixed for the whole run
+    rates = {
+        (borough, ward, offence): rng.lognormvariate(1.5, 1.0)
+        for borough, names in areas for ward in names for offence in offences
+    }
+    for month in range(last_month - months + 1, last_month + 1):
+        month_year = f'{month_label(month)}-01 00:00:00'
+        season = 1 + 0.1 * ((month % 12) - 5.5) / 5.5
+        for borough, names in areas:
+            totals = {}
+            for ward in names:
+                for offence in offences:
+                    count = int(rng.gauss(rates[borough, ward, offence] * season, 1) + 0.5)
+                    count = max(count, 0)
+                    totals[offence] = totals.get(offence, 0) + count
+                    if 'Ward' in area_types:
+                        yield (month_year, 'Ward', ward, *offence, count)
+            for area_type in area_types:
+                if area_type != 'Ward':
+                    for offence in offences:
+                        yield (month_year, area_type, borough, *offence, totals[offence])
+        for area_type in area_types:
+            if area_type != 'Ward':
+                for offence in offences:
+                    yield (month_year, area_type, UNKNOWN_AREA, *offence, rng.randint(0, 5))
+
+
+def write_source_csv(path, rows):
+    """Write source rows as a CSV that ``import_crime_data --file`` reads. Returns the row count."""
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SOURCE_FIELDS)
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    return written
@@ -0,0 +1,206 @@
+"""
+Borough lookup by location, from the borough boundaries the frontend's map
+draws (CRIME_BOROUGH_BOUNDARIES, a GeoJSON file of Polygon or MultiPolygon
+features with a 'name' property).
+
+The boundaries are loaded once per process (and again when the file
+changes) into a grid over their bounding box:
+
+- each cell that no boundary edge touches lies wholly inside one borough
+  (or outside them all), found once when the grid is built, so most points
+  are answered by the cell alone
+- each row of the grid keeps, per borough, the boundary edges that span its
+  latitudes; a point in a cell on a boundary is placed with an exact
+  even-odd ray-casting test against those few edges rather than the whole
+  boundary
+
+Coordinates are (longitude, latitude) in degrees, as in GeoJSON. A point
+exactly on a border between two boroughs goes to either one.
+"""
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+
+# Cells per side of the grid
+GRID_SIZE = 128
+
+# Seconds between checks for a changed boundary file
+RELOAD_INTERVAL = 5
+
+
+class BoundariesUnavailable(Exception):
+    """The boundary file is missing or cannot be read."""
+
+
+def _rings(geometry):
+    if geometry['type'] == 'Polygon':
+        return geometry['coordinates']
+    if geometry['type'] == 'MultiPolygon':
+        return [ring for polygon in geometry['coordinates'] for ring in polygon]
+    raise ValueError(f'Unsupported geometry type: {geometry["type"]}')
+
+
+def _edges(rings):
+    """(y1, y2, x1, dx/dy) of every non-horizontal edge of the rings."""
+    edges = []
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+            if y1 != y2:
+                edges.append((y1, y2, x1, (x2 - x1) / (y2 - y1), min(x1, x2), max(x1, x2)))
+    return edges
+
+
+def _inside(edges, x, y):
+    """Even-odd test: does a ray from (x, y) towards +x cross ``edges`` an odd number of times?"""
+    inside = False
+    for y1, y2, x1, slope in edges:
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * slope:
+            inside = not inside
+    return inside
+
+
+class BoroughBoundaries:
+    """The grid index of a set of borough boundaries; see the module docstring."""
+
+    def __init__(self, features, size=GRID_SIZE):
+        boroughs = []
+        for feature in features:
+            edges = _edges(_rings(feature['geometry']))
+            if edges:
+                boroughs.append((feature['properties']['name'], edges))
+        if not boroughs:
+            raise ValueError('No borough boundaries')
+        self.names = [name for name, _ in boroughs]
+
+        xs = [x for _, edges in boroughs for edge in edges for x in edge[4:6]]
+        ys = [y for _, edges in boroughs for edge in edges for y in edge[:2]]
+        self.size = size
+        self.x0, self.y0 = min(xs), min(ys)
+        self.cell_width = (max(xs) - self.x0) / size
+        self.cell_height = (max(ys) - self.y0) / size
+
+        # rows[row]: [(borough index, edges spanning the row's latitudes)];
+        # boundary_cells: cells an edge's bounding box touches
+        rows = [[] for _ in range(size)]
+        boundary_cells = set()
+        for index, (_, edges) in enumerate(boroughs):
+            by_row = {}
+            for edge in edges:
+                y1, y2, x1, slope, min_x, max_x = edge
+                first_row, last_row = self._row(min(y1, y2)), self._row(max(y1, y2))
+                first_col, last_col = self._col(min_x), self._col(max_x)
+                for row in range(first_row, last_row + 1):
+                    by_row.setdefault(row, []).append((y1, y2, x1, slope))
+                    boundary_cells.update((row, col) for col in range(first_col, last_col + 1))
+            for row, row_edges in by_row.items():
+                rows[row].append((index, row_edges))
+        self.rows = rows
+
+        # cells[row][col]: the borough index of a cell with no boundary in
+        # it, None if it is outside every borough, or -1 for boundary cells
+        self.cells = []
+        for row in range(size):
+            y = self.y0 + (row + 0.5) * self.cell_height
+            cells = []
+            for col in range(size):
+                if (row, col) in boundary_cells:
+                    cells.append(-1)
+                else:
+                    cells.append(self._test(row, self.x0 + (col + 0.5) * self.cell_width, y))
+            self.cells.append(cells)
+
+    def _row(self, y):
+        return min(max(int((y - self.y0) / self.cell_height), 0), self.size - 1)
+
+    def _col(self, x):
+        return min(max(int((x - self.x0) / self.cell_width), 0), self.size - 1)
+
+    def _test(self, row, x, y):
+        for index, edges in self.rows[row]:
+            if _inside(edges, x, y):
+                return index
+        return None
+
+    def borough(self, lon, lat):
+        """The name of the borough containing (lon, lat), or None if none does."""
+        col = (lon - self.x0) / self.cell_width
+        row = (lat - self.y0) / self.cell_height
+        if not (0 <= col <= self.size and 0 <= row <= self.size):
+            return None
+        row, col = min(int(row), self.size - 1), min(int(col), self.size - 1)
+        index = self.cells[row][col]
+        if index == -1:
+            index = self._test(row, lon, lat)
+        return None if index is None else self.names[index]
+
+
+def load_boundaries(path):
+    """A BoroughBoundaries for the GeoJSON file at ``path``."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return BoroughBoundaries(data['features'])
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise BoundariesUnavailable(f'Cannot load borough boundaries from {path}: {e}') from e
+
+
+_boundaries = (None, None, 0.0)  # (file signature, BoroughBoundaries, next check)
+_boundaries_lock = threading.Lock()
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        raise BoundariesUnavailable(f'Cannot load borough boundaries from {path}: {e}') from e
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def get_boundaries():
+    """
+    The process-wide BoroughBoundaries, loaded on first use and again when
+    CRIME_BOROUGH_BOUNDARIES changes (checked every RELOAD_INTERVAL
+    seconds). Raises BoundariesUnavailable if the file cannot be loaded.
+    """
+    global _boundaries
+    boundaries, next_check = _boundaries[1:]
+    if boundaries is not None and time.monotonic() < next_check:
+        return boundaries
+    with _boundaries_lock:
+        signature, boundaries, next_check = _boundaries
+        now = time.monotonic()
+        if boundaries is not None and now < next_check:
+            return boundaries
+        path = settings.CRIME_BOROUGH_BOUNDARIES
+        current = _file_signature(path)
+        if current != signature or boundaries is None:
+            boundaries = load_boundaries(path)
+        _boundaries = (current, boundaries, now + RELOAD_INTERVAL)
+    return boundaries
+
+
+def boundaries_state():
+    """
+    (signature, modified) of the boundaries get_boundaries() serves: a
+    string that changes with the file and its modification time (unix), or
+    (None, None) if they cannot be loaded. See crime/response_cache.py.
+    """
+    try:
+        get_boundaries()
+    except BoundariesUnavailable:
+        return None, None
+    inode, mtime_ns, size = _boundaries[0]
+    return f'boundaries:{inode}:{mtime_ns}:{size}', mtime_ns / 1e9
+
+
+def lookup_location(lat, lon):
+    """
+    The borough containing a WGS84 latitude/longitude, or None: the
+    location counterpart of postcode_mapping.lookup_borough. Raises
+    BoundariesUnavailable if the boundaries cannot be loaded.
+    """
+    return get_boundaries().borough(lon, lat)
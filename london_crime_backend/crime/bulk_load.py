@@ -0,0 +1,74 @@
+"""
+Bulk loading helpers for the import.
+
+bulk_create builds a model instance per row and a multi-row INSERT per
+batch. For a full import it is much quicker to hand the database driver
+plain tuples with executemany, and to build the secondary indexes once
+after the load instead of maintaining them row by row.
+
+Both helpers run on the default connection and expect to be called inside
+the import's transaction.
+"""
+import contextlib
+from itertools import islice
+
+from django.db import connection
+
+
+def secondary_indexes(model):
+    """{name: [columns]} of the non-unique, non-primary-key indexes on a table."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return {
+        name: info['columns']
+        for name, info in constraints.items()
+        if info['index'] and not info['unique'] and not info['primary_key']
+    }
+
+
+@contextlib.contextmanager
+def indexes_dropped(model):
+    """Drop a table's secondary indexes for the duration of a bulk load."""
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    indexes = secondary_indexes(model)
+    with connection.cursor() as cursor:
+        for name in indexes:
+            cursor.execute(f'DROP INDEX {qn(name)}')
+    yield indexes
+    with connection.cursor() as cursor:
+        for name, columns in indexes.items():
+            cursor.execute(
+                f'CREATE INDEX {qn(name)} ON {table} '
+                f'({", ".join(qn(column) for column in columns)})'
+            )
+
+
+def insert_rows(model, fields, rows, batch_size=50000, progress=None):
+    """
+    INSERT ``rows`` (an iterable of tuples, one value per field) into the
+    model's table with executemany. Values must be plain Python types.
+    ``progress`` is called with the running row count after every batch.
+    Returns the number of rows inserted.
+    """
+    qn = connection.ops.quote_name
+    columns = [model._meta.get_field(field).column for field in fields]
+    sql = (
+        f'INSERT INTO {qn(model._meta.db_table)} '
+        f'({", ".join(qn(column) for column in columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))})'
+    )
+
+    inserted = 0
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            cursor.executemany(sql, batch)
+            inserted += len(batch)
+            if progress is not None:
+                progress(inserted)
+    return inserted
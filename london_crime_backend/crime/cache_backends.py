@@ -0,0 +1,45 @@
+"""
+Cache backends used by the crime API response cache.
+"""
+import os
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """
+    FileBasedCache that evicts least-recently-used entries.
+
+    Django's file cache culls a random sample of entries once MAX_ENTRIES is
+    reached. Here every hit refreshes the entry's mtime and culling removes
+    the oldest files first, so the cache directory can be shared by several
+    worker processes and still behave as a bounded LRU.
+    """
+
+    def get(self, key, default=None, version=None):
+        fname = self._key_to_file(key, version)
+        value = super().get(key, default, version)
+        if value is not default:
+            try:
+                os.utime(fname)
+            except FileNotFoundError:
+                pass
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def last_used(fname):
+            try:
+                return os.path.getmtime(fname)
+            except FileNotFoundError:
+                return 0
+
+        filelist.sort(key=last_used)
+        for fname in filelist[:num_entries // self._cull_frequency]:
+            self._delete(fname)
@@ -0,0 +1,220 @@
+"""
+Columnar copy of the imported rows, memory-mapped by readers.
+
+Alongside the CSV cache, every import writes its cleaned rows to
+DATA_DIR/columns-<dataset version>/ as one .npy array per field plus a
+JSON file of string dictionaries:
+
+- string fields hold codes into a *sorted* dictionary, so code order is
+  string order (the layout crime/cube.py works on)
+- rows are sorted by month (stable), so a month range is a slice
+
+The arrays are opened with ``np.load(mmap_mode='r')``: loading takes
+milliseconds whatever the size, and every process mapping the same files
+shares one copy of the pages. The directory is named after the dataset
+version it was published with, so a reader only uses a cache that
+matches the data it is serving.
+
+A cache written from the CSV cache's rows records the CSV's size and
+modification time, and import_crime_data only reads it back instead of
+the CSV while those are unchanged (see ``covering_cache``).
+"""
+import json
+import os
+import shutil
+import tempfile
+from array import array
+
+import numpy as np
+from django.conf import settings
+
+from .ingest import CLEAN_FIELDS
+
+
+DICTIONARIES_FILENAME = 'dictionaries.json'
+
+# Cleaned row fields stored as plain integers; the others are strings
+INT_FIELDS = ('month_index', 'count')
+
+# Codes buffered per field before they are appended to the spill file
+FLUSH_ROWS = 65536
+
+
+def cache_dir(version):
+    return settings.DATA_DIR / f'columns-{version}'
+
+
+def file_signature(path):
+    """[size, mtime_ns] of the file at ``path``, or None if there is none."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _code_dtype(size):
+    return np.min_scalar_type(max(size - 1, 0))
+
+
+class ColumnCacheWriter:
+    """
+    Builds a column cache from cleaned rows as they stream past (see
+    ``track``). Codes are spilled to files as they come, so memory only
+    holds the dictionaries; ``publish`` sorts and writes the arrays one
+    field at a time.
+    """
+
+    def __init__(self, first=None, source=None):
+        # Oldest month index the rows were limited to (None: every month)
+        self.first = first
+        # The CSV cache holding the same rows, which later imports may read
+        # back from here while it is unchanged; None for rows that came
+        # from elsewhere
+        self.source = source
+        self.tmp_dir = tempfile.mkdtemp(dir=settings.DATA_DIR, prefix='.columns-')
+        self.dictionaries = {field: {} for field in CLEAN_FIELDS if field not in INT_FIELDS}
+        self.buffers = {field: array('q') for field in CLEAN_FIELDS}
+        self.rows = 0
+
+    def _spill_path(self, field):
+        return os.path.join(self.tmp_dir, f'{field}.raw')
+
+    def _flush(self):
+        for field, buffer in self.buffers.items():
+            with open(self._spill_path(field), 'ab') as f:
+                buffer.tofile(f)
+            del buffer[:]
+
+    def track(self, rows):
+        """Pass cleaned ``rows`` through unchanged, adding each to the cache."""
+        fields = list(enumerate(CLEAN_FIELDS))
+        for row in rows:
+            for position, field in fields:
+                value = row[position]
+                mapping = self.dictionaries.get(field)
+                if mapping is not None:
+                    value = mapping.setdefault(value, len(mapping))
+                self.buffers[field].append(value)
+            self.rows += 1
+            if len(self.buffers['count']) >= FLUSH_ROWS:
+                self._flush()
+            yield row
+
+    def publish(self, version):
+        """
+        Write the arrays and dictionaries, and make the cache the one for
+        dataset ``version``, removing caches of other versions. Call it once
+        the rows have all been read, so the source CSV is complete.
+        """
+        self._flush()
+        labels = {}
+        remaps = {}
+        for field, mapping in self.dictionaries.items():
+            values = list(mapping)
+            order = sorted(range(len(values)), key=values.__getitem__)
+            remap = np.empty(len(values), dtype=np.int64)
+            remap[order] = np.arange(len(values))
+            labels[field] = [values[i] for i in order]
+            remaps[field] = remap
+
+        def column(field):
+            values = np.fromfile(self._spill_path(field), dtype=np.int64)
+            if field in remaps:
+                values = remaps[field][values].astype(_code_dtype(len(labels[field])))
+            return values
+
+        # Sort rows by month, keeping file order within a month
+        order = np.argsort(column('month_year'), kind='stable')
+        for field in CLEAN_FIELDS:
+            np.save(os.path.join(self.tmp_dir, f'{field}.npy'), column(field)[order])
+            os.remove(self._spill_path(field))
+        with open(os.path.join(self.tmp_dir, DICTIONARIES_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': version, 'first_month': self.first,
+                'source': file_signature(self.source) if self.source is not None else None,
+                'rows': self.rows, 'labels': labels,
+            }, f)
+
+        # mkdtemp makes the directory private; readers may run as another user
+        os.chmod(self.tmp_dir, 0o755)
+        target = cache_dir(version)
+        if target.exists():
+            shutil.rmtree(target)
+        os.replace(self.tmp_dir, target)
+        # Processes still mapping an old cache keep their pages until they
+        # reload; the files just lose their names
+        for path in settings.DATA_DIR.glob('columns-*'):
+            if path != target:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def discard(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def open_columns(path):
+    """
+    (dictionaries, codes) of the cache in directory ``path``: the parsed
+    dictionaries file (with 'version' and 'labels', each string field's
+    sorted values) and each field's read-only memory-mapped array.
+    """
+    with open(path / DICTIONARIES_FILENAME, encoding='utf-8') as f:
+        dictionaries = json.load(f)
+    codes = {
+        field: np.load(path / f'{field}.npy', mmap_mode='r')
+        for field in CLEAN_FIELDS
+    }
+    return dictionaries, codes
+
+
+def load_columns(version):
+    """
+    (labels, codes) of the cache for dataset ``version`` (see
+    ``open_columns``), or None if there is none.
+    """
+    try:
+        dictionaries, codes = open_columns(cache_dir(version))
+    except FileNotFoundError:
+        return None
+    if dictionaries['version'] != version:
+        return None
+    return dictionaries['labels'], codes
+
+
+def covering_cache(version, first, csv_path):
+    """
+    Directory of the cache for dataset ``version`` if it holds the rows of
+    the CSV cache at ``csv_path``, unchanged since the cache was written,
+    for every month from index ``first`` on (every month, if None), else
+    None.
+    """
+    path = cache_dir(version)
+    try:
+        with open(path / DICTIONARIES_FILENAME, encoding='utf-8') as f:
+            dictionaries = json.load(f)
+    except FileNotFoundError:
+        return None
+    held = dictionaries.get('first_month')
+    if dictionaries['version'] != version:
+        return None
+    source = dictionaries.get('source')
+    if source is None or source != file_signature(csv_path):
+        return None
+    if held is not None and (first is None or held > first):
+        return None
+    return path
+
+
+def read_columns(path):
+    """Yield the cleaned rows (CLEAN_FIELDS order) of the cache in directory ``path``."""
+    dictionaries, codes = open_columns(path)
+    labels = dictionaries['labels']
+    for start in range(0, len(codes['count']), FLUSH_ROWS):
+        columns = []
+        for field in CLEAN_FIELDS:
+            values = codes[field][start:start + FLUSH_ROWS].tolist()
+            if field in labels:
+                names = labels[field]
+                values = [names[code] for code in values]
+            columns.append(values)
+        yield from zip(*columns)
@@ -0,0 +1,312 @@
+"""
+In-memory columnar copy of the CrimeRecord table.
+
+The table is small enough to keep in RAM, so instead of running a SQL
+GROUP BY for every request the cube loads all rows once per process into
+NumPy arrays and answers the same filter + group-by-sum queries with
+vectorized masks and ``bincount``.
+
+String columns are dictionary-encoded against *sorted* dictionaries, so
+code order matches string order. Rows are sorted by month, which turns the
+start_date/end_date filters into a contiguous slice of the arrays; months
+are located by their integer month index (see crime/months.py).
+
+When the import's column cache (crime/column_cache.py) matches the live
+dataset, the cube maps its arrays instead of querying the table: loading
+takes milliseconds and every worker process shares the same pages.
+
+Enabled with ``CRIME_QUERY_BACKEND = 'cube'`` in settings.
+"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from .column_cache import load_columns
+from .dataset import current_version
+from .dimensions import dimension_names
+from .models import Area, CrimeRecord, OffenceGroup, OffenceSubgroup
+from .months import month_index, month_range
+
+
+DIMENSIONS = (
+    'month_year',
+    'area_type',
+    'area_name',
+    'offence_group',
+    'offence_subgroup',
+)
+
+# CrimeRecord column each cube dimension is read from, and the dimension
+# table naming its ids where the column is a foreign key
+COLUMNS = {
+    'month_year': ('month_year', None),
+    'area_type': ('area_type', None),
+    'area_name': ('area', Area),
+    'offence_group': ('offence_group', OffenceGroup),
+    'offence_subgroup': ('offence_subgroup', OffenceSubgroup),
+}
+
+# group_totals counts into one bin per possible combination of the grouped
+# values while there are at most this many per selected row; beyond that the
+# bins are mostly empty, and sorting out the keys that occur is cheaper
+DENSE_GROUPS_PER_ROW = 4
+
+
+class CrimeCube:
+    """Dictionary-encoded, month-sorted column arrays for CrimeRecord."""
+
+    def __init__(self, labels, codes, counts):
+        # labels: field -> sorted list of distinct values
+        # codes:  field -> integer array indexing into labels[field]
+        self.labels = labels
+        self.codes = codes
+        self.counts = counts
+        self.lookup = {
+            field: {value: i for i, value in enumerate(values)}
+            for field, values in labels.items()
+        }
+        # Object arrays of the labels, for decoding many codes at once
+        self.label_arrays = {}
+        for field, values in labels.items():
+            self.label_arrays[field] = np.empty(len(values), dtype=object)
+            self.label_arrays[field][:] = values
+        # Month index of each month code, ascending
+        self.month_keys = [month_index(label) for label in labels['month_year']]
+        self.month_codes = {key: code for code, key in enumerate(self.month_keys)}
+        # Row offsets of each month: rows of month code m are
+        # month_bounds[m]:month_bounds[m + 1]
+        self.month_bounds = np.searchsorted(
+            codes['month_year'], np.arange(len(labels['month_year']) + 1)
+        )
+
+    @classmethod
+    def load(cls, queryset=None):
+        """Build a cube from a CrimeRecord queryset (all rows by default)."""
+        if queryset is None:
+            queryset = CrimeRecord.objects.all()
+
+        seen = {field: {} for field in DIMENSIONS}
+        raw_codes = {field: array('q') for field in DIMENSIONS}
+        counts = array('q')
+
+        columns = [COLUMNS[field][0] for field in DIMENSIONS]
+        rows = queryset.values_list(*columns, 'count').iterator(chunk_size=20000)
+        for row in rows:
+            for field, value in zip(DIMENSIONS, row):
+                mapping = seen[field]
+                raw_codes[field].append(mapping.setdefault(value, len(mapping)))
+            counts.append(row[-1] or 0)
+
+        labels = {}
+        codes = {}
+        for field in DIMENSIONS:
+            values = list(seen[field])
+            model = COLUMNS[field][1]
+            if model is not None:
+                names = dimension_names(model)
+                values = [names[pk] for pk in values]
+            order = sorted(range(len(values)), key=values.__getitem__)
+            remap = np.empty(len(values), dtype=np.int64)
+            remap[order] = np.arange(len(values))
+            dtype = np.min_scalar_type(max(len(values) - 1, 0))
+            labels[field] = [values[i] for i in order]
+            codes[field] = remap[np.frombuffer(raw_codes[field], dtype=np.int64)].astype(dtype)
+
+        counts = np.frombuffer(counts, dtype=np.int64)
+
+        # Sort rows by month so date filters become a slice
+        order = np.argsort(codes['month_year'], kind='stable')
+        codes = {field: column[order] for field, column in codes.items()}
+        return cls(labels, codes, counts[order])
+
+    @classmethod
+    def load_cached(cls, version):
+        """
+        Build a cube on the column cache of dataset ``version``, or return
+        None if there is no such cache.
+        """
+        cached = load_columns(version)
+        if cached is None:
+            return None
+        labels, codes = cached
+        return cls(
+            {field: labels[field] for field in DIMENSIONS},
+            {field: codes[field] for field in DIMENSIONS},
+            codes['count'],
+        )
+
+    # ------------------------------------------------------------------
+    # Filtering
+    # ------------------------------------------------------------------
+
+    def _row_range(self, params):
+        """Translate start_date/end_date into a [lo, hi) row slice."""
+        start, end = month_range(params)
+        first = bisect_left(self.month_keys, start) if start is not None else 0
+        last = bisect_right(self.month_keys, end) if end is not None else len(self.month_keys)
+        if last <= first:
+            return 0, 0
+        return self.month_bounds[first], self.month_bounds[last]
+
+    def _equals(self, field, value, lo, hi):
+        code = self.lookup[field].get(value)
+        if code is None:
+            return None
+        return self.codes[field][lo:hi] == code
+
+    def _select(self, params, months=None):
+        """
+        Mirror views._apply_filters: returns (lo, hi, mask) where mask is a
+        boolean array over rows lo:hi, or None when no row filter applies.
+        ``months`` optionally restricts rows to a list of month indexes.
+        """
+        lo, hi = self._row_range(params)
+        mask = None
+        conditions = []
+
+        if months is not None:
+            month_codes = sorted(
+                self.month_codes[m] for m in months if m in self.month_codes
+            )
+            if not month_codes:
+                return 0, 0, None
+            lo = max(lo, self.month_bounds[month_codes[0]])
+            hi = min(hi, self.month_bounds[month_codes[-1] + 1])
+            if hi <= lo:
+                return 0, 0, None
+            mask = np.isin(self.codes['month_year'][lo:hi], month_codes)
+
+        borough = params.get('borough')
+        offence_group = params.get('offence_group')
+        offence_groups = params.get('offence_groups')
+        offence_subgroup = params.get('offence_subgroup')
+        area_type = params.get('area_type')
+
+        if borough:
+            conditions.append(('area_name', borough))
+        if offence_group:
+            conditions.append(('offence_group', offence_group))
+        elif offence_groups:
+            groups_list = [g.strip() for g in offence_groups.split(',') if g.strip()]
+            group_codes = [
+                self.lookup['offence_group'][g]
+                for g in groups_list if g in self.lookup['offence_group']
+            ]
+            if not group_codes:
+                return 0, 0, None
+            condition = np.isin(self.codes['offence_group'][lo:hi], group_codes)
+            mask = condition if mask is None else (mask & condition)
+        if offence_subgroup:
+            conditions.append(('offence_subgroup', offence_subgroup))
+        if area_type:
+            conditions.append(('area_type', area_type))
+
+        for field, value in conditions:
+            condition = self._equals(field, value, lo, hi)
+            if condition is None:
+                return 0, 0, None
+            mask = condition if mask is None else (mask & condition)
+
+        return lo, hi, mask
+
+    def _selected(self, field, lo, hi, mask):
+        column = self.codes[field][lo:hi]
+        return column if mask is None else column[mask]
+
+    def _selected_counts(self, lo, hi, mask):
+        counts = self.counts[lo:hi]
+        return counts if mask is None else counts[mask]
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def total(self, params):
+        """SUM(count) over the filtered rows."""
+        lo, hi, mask = self._select(params)
+        return int(self._selected_counts(lo, hi, mask).sum())
+
+    def group_totals(self, field, params, months=None):
+        """
+        SUM(count) per distinct value of ``field`` over the filtered rows.
+
+        Returns a list of ``(value, total)`` pairs in value order; values
+        with no matching rows are omitted, as with a SQL GROUP BY. ``field``
+        may also be a tuple of fields, in which case values are tuples.
+        """
+        fields = (field,) if isinstance(field, str) else tuple(field)
+        shape = tuple(len(self.labels[f]) for f in fields)
+        lo, hi, mask = self._select(params, months)
+        if hi <= lo:
+            return []
+
+        # Combine the grouping columns into a single integer key
+        codes = np.ravel_multi_index(
+            [self._selected(f, lo, hi, mask).astype(np.intp) for f in fields], shape
+        )
+        counts = self._selected_counts(lo, hi, mask)
+        size = int(np.prod(shape))
+        if size <= DENSE_GROUPS_PER_ROW * len(codes):
+            present = np.flatnonzero(np.bincount(codes, minlength=size))
+            sums = np.bincount(codes, weights=counts, minlength=size)[present]
+        else:
+            # Most combinations of the grouped values have no rows (e.g.
+            # month x ward x subgroup over years of history): number only
+            # the keys that occur, so the bins grow with the selected rows
+            present, inverse = np.unique(codes, return_inverse=True)
+            sums = np.bincount(inverse, weights=counts, minlength=len(present))
+        totals = sums.round().astype(np.int64).tolist()
+
+        keys = [
+            self.label_arrays[f][column].tolist()
+            for f, column in zip(fields, np.unravel_index(present, shape))
+        ]
+        values = keys[0] if len(fields) == 1 else zip(*keys)
+        return list(zip(values, totals))
+
+    def ranked_totals(self, field, params):
+        """
+        group_totals ordered by descending total, ties in ascending value
+        order (the same tie-break the SQL path uses).
+        """
+        # group_totals is in value order and sorted() is stable
+        return sorted(self.group_totals(field, params), key=lambda item: -item[1])
+
+    def distinct(self, field, params=None):
+        """Sorted distinct values of ``field`` over the filtered rows."""
+        if not params:
+            return list(self.labels[field])
+        lo, hi, mask = self._select(params)
+        codes = self._selected(field, lo, hi, mask)
+        labels = self.labels[field]
+        return [labels[code] for code in np.unique(codes)]
+
+
+_cube = None
+_cube_version = None
+_cube_lock = threading.Lock()
+
+
+def get_cube():
+    """
+    Return the process-wide cube, (re)loading it on first use and whenever
+    the dataset version changes.
+    """
+    global _cube, _cube_version
+    version = current_version()
+    if _cube is None or _cube_version != version:
+        with _cube_lock:
+            if _cube is None or _cube_version != version:
+                _cube = CrimeCube.load_cached(version) or CrimeCube.load()
+                _cube_version = version
+    return _cube
+
+
+def reset_cube():
+    """Drop the cached cube so the next request reloads it."""
+    global _cube, _cube_version
+    with _cube_lock:
+        _cube = None
+        _cube_version = None
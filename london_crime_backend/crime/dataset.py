@@ -0,0 +1,100 @@
+"""
+Dataset version stamp.
+
+import_crime_data bumps the version after every successful import. Anything
+derived from the data (response cache keys, the in-memory cube) is keyed on
+it, so nothing computed from a previous import is served once new data is
+in place.
+
+The stamp is a small JSON file in DATA_DIR, so every worker process sees the
+same value without a database query. It is re-read only when the file
+changes on disk.
+
+The live data generation (see crime/generations.py) is stored in the
+database, in the transaction that publishes it; current_generation() reads
+it once per dataset version.
+"""
+import json
+import os
+import tempfile
+import time
+
+from django.conf import settings
+
+
+STAMP_FILENAME = 'dataset_version.json'
+
+_stamp_cache = (None, None)  # (file signature, parsed state)
+_generation = (None, 0)  # (dataset version, live generation)
+
+
+def _stamp_path():
+    return settings.DATA_DIR / STAMP_FILENAME
+
+
+def dataset_state():
+    """
+    Return the current stamp: a dict with 'version' (int, 0 before the first
+    import) and 'imported_at' (unix time of the import, or None). Imports
+    also record 'import_seconds', how long they took.
+    """
+    global _stamp_cache
+    path = _stamp_path()
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return {'version': 0, 'imported_at': None}
+
+    signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if _stamp_cache[0] != signature:
+        with open(path, encoding='utf-8') as f:
+            _stamp_cache = (signature, json.load(f))
+    return _stamp_cache[1]
+
+
+def current_version():
+    """The current dataset version number."""
+    return dataset_state()['version']
+
+
+def current_generation():
+    """
+    The generation number of the rows readers should see, 0 before the
+    first full import. Read from LiveGeneration when the dataset version
+    changes: an import publishes its generation, then bumps the version.
+    """
+    global _generation
+    version = current_version()
+    if _generation[0] != version:
+        from .models import LiveGeneration
+        generation = LiveGeneration.objects.values_list('generation', flat=True).first()
+        _generation = (version, generation or 0)
+    return _generation[1]
+
+
+def bump_version(**extra):
+    """
+    Record that a new dataset has been imported and return the new stamp.
+    Extra keyword arguments are stored alongside the version; keys not
+    given keep their previous values.
+    """
+    state = {
+        **dataset_state(),
+        **extra,
+        'version': current_version() + 1,
+        'imported_at': int(time.time()),
+    }
+    path = _stamp_path()
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.dataset_version')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        # mkstemp makes the file private; readers may run as another user
+        os.chmod(tmp_path, 0o644)
+        # Atomic swap: readers see either the old or the new stamp
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return state
@@ -0,0 +1,87 @@
+"""
+Name <-> id lookups for the dimension tables (Area, OffenceGroup,
+OffenceSubgroup).
+
+Queries filter and group on the integer keys; names only come in when
+resolving filter params and when labelling the final output rows. The
+tables hold a few hundred rows at most, so each process keeps them as
+dicts, reloaded when the dataset version changes.
+
+An import commits new dimension rows, and fact rows using them, before it
+bumps the version, so a query in between can meet an id the cached table
+does not have yet; the table is then reloaded on the spot.
+"""
+from .dataset import current_version
+
+
+_tables = {}  # model -> (dataset version, _Names, {name: id})
+
+
+class _Names(dict):
+    """{id: name} of a dimension table that reloads it on an unknown id."""
+
+    def __init__(self, model, names):
+        super().__init__(names)
+        self.model = model
+
+    def __missing__(self, pk):
+        # Caller loops keep this dict: give it the new ids as well
+        names = _load(self.model)[1]
+        self.update(names)
+        if pk not in names:
+            raise KeyError(pk)
+        return names[pk]
+
+
+def _load(model, version=None):
+    if version is None:
+        version = current_version()
+    names = _Names(model, model.objects.values_list('id', 'name'))
+    table = (version, names, {name: pk for pk, name in names.items()})
+    _tables[model] = table
+    return table
+
+
+def _table(model):
+    version = current_version()
+    table = _tables.get(model)
+    if table is None or table[0] != version:
+        table = _load(model, version)
+    return table
+
+
+def dimension_names(model):
+    """
+    {id: name} for every row of a dimension table. Looking up an id that
+    is not in it reloads the table (KeyError if the id is still missing).
+    """
+    return _table(model)[1]
+
+
+def dimension_id(model, name):
+    """The id of ``name`` in a dimension table, or None if it is unknown."""
+    return _table(model)[2].get(name)
+
+
+def dimension_ids(model, names):
+    """Ids of the known ``names`` in a dimension table."""
+    ids = _table(model)[2]
+    return [ids[name] for name in names if name in ids]
+
+
+def ensure_dimension_ids(model, names):
+    """
+    {name: id} for ``names``, inserting any that are not in the table yet.
+    Used by the import; existing ids are kept so they stay stable.
+    """
+    ids = dict(model.objects.values_list('name', 'id'))
+    missing = sorted(set(names) - set(ids))
+    if missing:
+        model.objects.bulk_create([model(name=name) for name in missing])
+        ids = dict(model.objects.values_list('name', 'id'))
+    return ids
+
+
+def reset_dimensions():
+    """Drop the cached lookups so the next query reloads them."""
+    _tables.clear()
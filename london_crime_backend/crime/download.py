@@ -0,0 +1,217 @@
+"""
+Conditional, resumable download of the source workbook.
+
+- Conditional: the ETag and Last-Modified of the last imported download
+  are kept in a small JSON file next to the data, and sent back as
+  If-None-Match / If-Modified-Since. A 304 means there is nothing new to
+  import.
+- Resumable: bytes are written to ``<file>.part``, with the validators of
+  the response they came from in ``<file>.part.json``. A later attempt
+  (in the same run after a dropped connection, or in the next run) asks
+  for the rest with a Range request guarded by If-Range, so a file that
+  changed upstream in the meantime is fetched whole again.
+- Verified: the file is only moved into place once its size matches what
+  the server announced, its SHA-256 matches the server's digest header
+  when there is one, and it opens as a zip archive (as an XLSX must).
+"""
+import base64
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zipfile
+from pathlib import Path
+
+import requests
+
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+    'AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/91.0.4472.124 Safari/537.36'
+)
+
+# Small reads, so little of what arrived is lost when a connection drops
+# (a partly filled read is discarded)
+CHUNK_SIZE = 64 * 1024
+
+# Tries per download; each one resumes from the bytes already saved
+ATTEMPTS = 3
+
+CONTENT_RANGE = re.compile(r'bytes (\d+)-\d+/(\d+|\*)')
+
+
+class DownloadError(Exception):
+    """The download could not be completed or failed verification."""
+
+
+class IncompleteDownload(DownloadError):
+    """The connection ended early; worth another attempt."""
+
+
+def read_meta(path):
+    """The metadata saved by ``write_meta``, or {} if there is none."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_meta(path, meta):
+    """Save a download's metadata atomically."""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        # mkstemp makes the file private; readers may run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _announced_sha256(headers):
+    """
+    The SHA-256 (hex) of the whole file given by a Repr-Digest (RFC 9530)
+    or Digest (RFC 3230) header, if any.
+    """
+    for header, pattern in (
+        ('Repr-Digest', r'sha-256=:([A-Za-z0-9+/=]+):'),
+        ('Digest', r'(?i:sha-256)=([A-Za-z0-9+/=]+)'),
+    ):
+        match = re.search(pattern, headers.get(header, ''))
+        if match:
+            try:
+                return base64.b64decode(match.group(1)).hex()
+            except ValueError:
+                return None
+    return None
+
+
+def _validator(etag, last_modified):
+    """What If-Range can carry for a response: a strong ETag, else its date."""
+    if etag and not etag.startswith('W/'):
+        return etag
+    return last_modified
+
+
+def _discard(*paths):
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+def download(url, dest, previous=None, progress=None, timeout=300):
+    """
+    Download ``url`` to ``dest``. ``previous`` is the metadata returned
+    for the last download whose data is still in use; when it is for the
+    same URL the request is conditional, and None is returned if the file
+    has not changed. Otherwise returns the new download's metadata: a
+    dict of 'url', 'etag', 'last_modified', 'size' and 'sha256'.
+    ``progress(done, total)`` is called as bytes arrive (total may be
+    None).
+    """
+    dest = Path(dest)
+    part = dest.with_name(dest.name + '.part')
+    part_meta = dest.with_name(dest.name + '.part.json')
+    for attempt in range(1, ATTEMPTS + 1):
+        try:
+            return _fetch(url, dest, part, part_meta, previous, progress, timeout)
+        except (IncompleteDownload, requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == ATTEMPTS:
+                raise IncompleteDownload(
+                    f'{e} (after {ATTEMPTS} attempts; the next run resumes)'
+                ) from e
+        except requests.RequestException as e:
+            raise DownloadError(str(e)) from e
+
+
+def _fetch(url, dest, part, part_meta, previous, progress, timeout):
+    # Ask for an uncompressed body so byte ranges and sizes line up
+    headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': 'identity'}
+    saved = read_meta(part_meta)
+    offset = part.stat().st_size if part.exists() else 0
+    resume = saved.get('url') == url and _validator(saved.get('etag'), saved.get('last_modified'))
+    if offset and resume:
+        headers['Range'] = f'bytes={offset}-'
+        headers['If-Range'] = resume
+    else:
+        offset = 0
+        if previous and previous.get('url') == url:
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304 and 'Range' not in headers:
+            return None
+        if response.status_code == 416:
+            # What we hold is not a prefix of the file any more
+            _discard(part, part_meta)
+            raise IncompleteDownload('Saved partial download no longer matches; restarting')
+        response.raise_for_status()
+
+        if response.status_code == 206:
+            match = CONTENT_RANGE.fullmatch(response.headers.get('Content-Range', ''))
+            if not match or int(match.group(1)) != offset:
+                _discard(part, part_meta)
+                raise IncompleteDownload('Server resumed at the wrong offset; restarting')
+            total = int(match.group(2)) if match.group(2) != '*' else None
+            etag, last_modified = saved.get('etag'), saved.get('last_modified')
+            mode = 'ab'
+        else:
+            # A full response: the first try, or the file changed since the
+            # partial download
+            offset = 0
+            length = response.headers.get('Content-Length')
+            total = int(length) if length and length.isdigit() else None
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            mode = 'wb'
+            write_meta(part_meta, {'url': url, 'etag': etag, 'last_modified': last_modified})
+        announced = _announced_sha256(response.headers)
+
+        done = offset
+        with open(part, mode) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                done += len(chunk)
+                if progress is not None:
+                    progress(done, total)
+
+    if total is not None and done < total:
+        raise IncompleteDownload(f'Connection closed after {done} of {total} bytes')
+    if total is not None and done > total:
+        _discard(part, part_meta)
+        raise DownloadError(f'Received {done} bytes, more than the {total} announced')
+    sha256 = _sha256(part)
+    if announced is not None and announced != sha256:
+        _discard(part, part_meta)
+        raise DownloadError('Downloaded file does not match the checksum sent by the server')
+    if not zipfile.is_zipfile(part):
+        _discard(part, part_meta)
+        raise DownloadError('Downloaded file is not an XLSX workbook')
+
+    os.replace(part, dest)
+    _discard(part_meta)
+    return {
+        'url': url,
+        'etag': etag,
+        'last_modified': last_modified,
+        'size': done,
+        'sha256': sha256,
+    }
@@ -0,0 +1,46 @@
+"""
+Data generations.
+
+A full import never touches the rows readers are using. It writes its
+CrimeRecord, rollup, BoroughRanking and ImportedMonth rows under a new
+generation number and publishes that generation in LiveGeneration, in the
+same transaction. The default managers of those models only return rows of
+the live generation, so every process switches to the new data at once
+(when the import bumps the dataset version, crime/dataset.py), and the old
+generation is deleted afterwards.
+"""
+from django.db.models import Max
+
+from .dataset import current_generation
+from .models import BoroughRanking, CrimeRecord, ImportedMonth, LiveGeneration
+from .rollups import ROLLUPS
+
+
+GENERATION_MODELS = [CrimeRecord, *ROLLUPS, BoroughRanking, ImportedMonth]
+
+
+def next_generation():
+    """A generation number that no stored row uses yet."""
+    latest = CrimeRecord.all_generations.aggregate(latest=Max('generation'))['latest']
+    return max(latest or 0, current_generation()) + 1
+
+
+def publish_generation(generation):
+    """
+    Make ``generation`` the live one. Call it in the transaction that writes
+    the generation's rows, so that they are published when it commits.
+    """
+    LiveGeneration.objects.update_or_create(pk=1, defaults={'generation': generation})
+
+
+def delete_generations(keep):
+    """
+    Delete the rows of every generation except ``keep``: superseded imports
+    and any left behind by an import that did not finish. Returns the
+    number of rows deleted per model.
+    """
+    deleted = {}
+    for model in GENERATION_MODELS:
+        count, _ = model.all_generations.exclude(generation=keep).delete()
+        deleted[model.__name__] = count
+    return deleted
@@ -0,0 +1,277 @@
+"""
+Streaming readers and row cleaning for import_crime_data.
+
+Rows go from the source file (the downloaded XLSX, or the CSV cached from
+an earlier download) through clean_rows() as plain tuples and on to the
+database in batches, so memory use stays the same whatever the file size.
+The CSV cache keeps every month of the source; retained_rows() applies the
+CRIME_DATA_RETENTION_MONTHS window on the way to the database.
+"""
+import csv
+import hashlib
+import math
+import pickle
+import tempfile
+
+from openpyxl import load_workbook
+
+from .months import month_index
+from .xlsx_reader import SheetReader
+
+
+# Source column -> field, for the columns we actually use in the dashboard.
+# The cached CSV has one column per field, in this order.
+COLUMNS_TO_KEEP = {
+    'Month_Year': 'month_year',
+    'Area Type': 'area_type',
+    'Area name': 'area_name',
+    'Offence Group': 'offence_group',
+    'Offence Subgroup': 'offence_subgroup',
+    'Count': 'count',
+}
+SOURCE_FIELDS = tuple(COLUMNS_TO_KEEP.values())
+
+# Fields of the tuples yielded by clean_rows()
+CLEAN_FIELDS = (
+    'month_year', 'month_index', 'area_type',
+    'area_name', 'offence_group', 'offence_subgroup', 'count',
+)
+
+# XLSX readers, see read_xlsx()
+READERS = ('openpyxl', 'expat')
+
+def read_xlsx(path, warn=None, reader='openpyxl'):
+    """
+    Yield a tuple of raw cell values (SOURCE_FIELDS order) per data row of
+    the workbook's active sheet. ``reader`` is
+    'openpyxl' (its read-only streaming mode) or 'expat' (the faster
+    crime.xlsx_reader). Missing columns are reported through ``warn`` and
+    read as None.
+    """
+    if reader == 'expat':
+        return iter(SheetReader(path, COLUMNS_TO_KEEP, warn=warn))
+    return _openpyxl_rows(path, warn)
+
+
+def _openpyxl_rows(path, warn):
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        headers = list(next(rows, ()))
+        positions = []
+        for column in COLUMNS_TO_KEEP:
+            if column in headers:
+                positions.append(headers.index(column))
+            else:
+                positions.append(None)
+                if warn is not None:
+                    warn(f'Column "{column}" not found in Excel')
+        for row in rows:
+            yield tuple(
+                row[i] if i is not None and i < len(row) else None
+                for i in positions
+            )
+    finally:
+        wb.close()
+
+
+def read_csv(path):
+    """Yield a tuple of strings (SOURCE_FIELDS order) per row of a cached CSV."""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        positions = csv_positions(next(reader, []))
+        yield from csv_rows(reader, positions)
+
+
+def csv_positions(headers):
+    """Index of each of SOURCE_FIELDS in a CSV header row (None if missing)."""
+    return [headers.index(field) if field in headers else None for field in SOURCE_FIELDS]
+
+
+def csv_rows(records, positions):
+    """Tuples of SOURCE_FIELDS values for parsed CSV records."""
+    for record in records:
+        yield tuple(record[i] if i is not None else '' for i in positions)
+
+
+def write_csv(rows, path):
+    """
+    Pass cleaned ``rows`` through unchanged, writing them to a CSV cache
+    at ``path``. Cleaning again gives the same rows, so the cache can be
+    imported like the source.
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SOURCE_FIELDS)
+        for row in rows:
+            writer.writerow(row[:1] + row[2:])
+            yield row
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _count(value):
+    """Count as an int; blanks and anything unparseable count as 0."""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return int(value) if math.isfinite(value) else 0
+
+
+def clean_rows(rows, skipped=None):
+    """
+    Yield cleaned tuples (CLEAN_FIELDS order) for raw source rows: text
+    fields as strings ('' when missing), offence names title-cased (e.g.
+    "THEFT" -> "Theft") and the count as an int. Rows whose month is not
+    recognisable are dropped and counted in ``skipped[0]`` when a one-item
+    list is passed.
+    """
+    for month_year, area_type, area_name, offence_group, offence_subgroup, count in rows:
+        month_year = _text(month_year)
+        index = month_index(month_year)
+        if index is None:
+            if skipped is not None:
+                skipped[0] += 1
+            continue
+        yield (
+            month_year,
+            index,
+            _text(area_type),
+            _text(area_name),
+            _text(offence_group).title(),
+            _text(offence_subgroup).title(),
+            _count(count),
+        )
+
+
+def retained_rows(rows, first):
+    """Cleaned rows from month index ``first`` on (all of them if it is None)."""
+    if first is None:
+        return rows
+    return (row for row in rows if row[1] >= first)
+
+
+class MonthSpill:
+    """
+    Cleaned rows of some months set aside in one temporary file per month,
+    so that a source mixing its months can be written back a month at a
+    time (see ``rows``). At most ``batch_size`` rows are held in memory,
+    however many months there are.
+
+    Use as a context manager; the files are removed on exit.
+    """
+
+    def __init__(self, months, batch_size, dir=None):
+        self.batch_size = batch_size
+        self.files = {}
+        self.buffers = {}
+        for month in months:
+            self.files[month] = tempfile.TemporaryFile(dir=dir)
+            self.buffers[month] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, rows):
+        """Set aside the ``rows`` of the spilled months; other rows are dropped."""
+        buffered = 0
+        for row in rows:
+            buffer = self.buffers.get(row[1])
+            if buffer is None:
+                continue
+            buffer.append(row)
+            buffered += 1
+            if buffered >= self.batch_size:
+                self._flush()
+                buffered = 0
+        self._flush()
+
+    def _flush(self):
+        for month, buffer in self.buffers.items():
+            if buffer:
+                pickle.dump(buffer, self.files[month], protocol=pickle.HIGHEST_PROTOCOL)
+                buffer.clear()
+
+    def rows(self, month):
+        """The rows set aside for ``month``, in the order they were added."""
+        f = self.files[month]
+        f.seek(0)
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+class MonthChecksums:
+    """
+    Per-month row counts and checksums of cleaned rows, accumulated as the
+    rows stream past (see ``track``).
+
+    A row's hash is a 128-bit BLAKE2b digest of its values and a month's
+    checksum is the sum of its row hashes modulo 2**128, so it does not
+    depend on the order rows appear in the source file and only needs
+    constant memory per month.
+
+    Months before ``first`` (a month index) are outside the retention
+    window: their rows pass through uncounted.
+    """
+    MODULUS = 1 << 128
+
+    def __init__(self, first=None):
+        self.first = first
+        self.months = {}  # month_index -> [month_year, row count, hash sum]
+
+    def track(self, rows):
+        """Pass cleaned ``rows`` through unchanged, adding each to the checksums."""
+        months = self.months
+        first = self.first
+        for row in rows:
+            month_year, index, *values = row
+            if first is not None and index < first:
+                yield row
+                continue
+            key = '\x1f'.join(map(str, (month_year, *values))).encode()
+            digest = int.from_bytes(hashlib.blake2b(key, digest_size=16).digest(), 'big')
+            month = months.get(index)
+            if month is None:
+                month = months[index] = [month_year, 0, 0]
+            month[1] += 1
+            month[2] = (month[2] + digest) % self.MODULUS
+            yield row
+
+    def merge(self, months):
+        """Add the ``months`` of another MonthChecksums (rows seen elsewhere)."""
+        for index, (month_year, count, total) in months.items():
+            if self.first is not None and index < self.first:
+                continue
+            month = self.months.get(index)
+            if month is None:
+                self.months[index] = [month_year, count, total]
+            else:
+                month[1] += count
+                month[2] = (month[2] + total) % self.MODULUS
+
+    def checksums(self):
+        """{month_index: (month_year, row_count, checksum)} of the rows seen."""
+        return {
+            index: (month_year, count, f'{total:032x}')
+            for index, (month_year, count, total) in self.months.items()
+        }
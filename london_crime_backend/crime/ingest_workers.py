@@ -0,0 +1,154 @@
+"""
+Parallel parsing and cleaning for ``import_crime_data --workers N``.
+
+The main process splits the source file into blocks of whole rows and
+keeps at most ``2 * N`` of them in flight, so a slow writer holds the
+readers back instead of letting parsed rows pile up in memory. Worker
+processes parse and clean a block and send it back as compact columns
+(the ints in arrays, each string column as a per-block list of distinct
+values plus an array of codes) together with the block's month
+checksums. Blocks are collected in file order, so the rows come out
+exactly as the serial pipeline yields them and the single writer in the
+main process does the same inserts.
+"""
+import csv
+import io
+import multiprocessing
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .ingest import (
+    CLEAN_FIELDS, COLUMNS_TO_KEEP, MonthChecksums, clean_rows, csv_positions, csv_rows,
+)
+from .xlsx_reader import SheetReader
+
+
+# Bytes of source per block handed to a worker
+BLOCK_SIZE = 1024 * 1024
+
+# Positions of the int fields in a cleaned row; the others are strings
+INT_FIELDS = {CLEAN_FIELDS.index('month_index'), CLEAN_FIELDS.index('count')}
+
+# Per-worker state, set by _init_worker
+_worker = {}
+
+
+def _csv_blocks(path, size):
+    """The header positions, then blocks of whole records, of a CSV file."""
+    with open(path, 'rb') as f:
+        yield csv_positions(next(csv.reader([f.readline().decode('utf-8')]), []))
+        data = b''
+        while True:
+            chunk = f.read(size)
+            data += chunk
+            end = data.rfind(b'\n') + 1
+            # A newline inside a quoted field does not end a record; quotes
+            # inside fields are doubled, so an odd count means we are in one
+            while end and data.count(b'"', 0, end) % 2:
+                end = data.rfind(b'\n', 0, end - 1) + 1
+            if not chunk:
+                end = len(data)
+            if end:
+                yield data[:end]
+                data = data[end:]
+            if not chunk:
+                return
+
+
+def _init_worker(kind, path, head, first):
+    _worker['kind'] = kind
+    _worker['head'] = head
+    _worker['first'] = first
+    if kind == 'xlsx':
+        reader = SheetReader(path, COLUMNS_TO_KEEP)
+        reader.load()
+        _worker['reader'] = reader
+
+
+def _clean_block(block):
+    """
+    Worker: parse and clean one block. Returns (columns, month checksums,
+    rows skipped, seconds taken).
+    """
+    started = time.perf_counter()
+    if _worker['kind'] == 'xlsx':
+        rows = _worker['reader'].parse_block(_worker['head'], block)
+    else:
+        records = csv.reader(io.StringIO(block.decode('utf-8'), newline=''))
+        rows = csv_rows(records, _worker['head'])
+
+    skipped = [0]
+    checksums = MonthChecksums(_worker['first'])
+    cleaned = list(checksums.track(clean_rows(rows, skipped)))
+
+    columns = []
+    for position, values in enumerate(zip(*cleaned) if cleaned else [()] * len(CLEAN_FIELDS)):
+        if position in INT_FIELDS:
+            columns.append(array('q', values))
+        else:
+            distinct = {}
+            codes = array('I', [distinct.setdefault(value, len(distinct)) for value in values])
+            columns.append((list(distinct), codes))
+    return columns, checksums.months, skipped[0], time.perf_counter() - started
+
+
+def _decode(columns):
+    """Cleaned row tuples from a block's columns."""
+    return zip(*(
+        values if position in INT_FIELDS else [values[0][code] for code in values[1]]
+        for position, values in enumerate(columns)
+    ))
+
+
+def parallel_clean_rows(kind, path, workers, checksums, skipped, stages, warn=None):
+    """
+    Cleaned rows of a source file ('csv' or 'xlsx', the latter always read
+    with crime.xlsx_reader), parsed by ``workers`` processes. Month
+    checksums and skipped rows are added to ``checksums`` and
+    ``skipped[0]``; seconds spent are added to ``stages`` under 'split',
+    'parse' (summed over workers), 'wait' and 'decode'.
+    """
+    for stage in ('split', 'parse', 'wait', 'decode'):
+        stages.setdefault(stage, 0.0)
+
+    started = time.perf_counter()
+    if kind == 'xlsx':
+        blocks = SheetReader(path, COLUMNS_TO_KEEP, warn=warn).blocks(BLOCK_SIZE)
+    else:
+        blocks = _csv_blocks(path, BLOCK_SIZE)
+    head = next(blocks, None)
+    stages['split'] += time.perf_counter() - started
+    if head is None:
+        return
+
+    # Fresh interpreters rather than forks of a process holding a
+    # database connection
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        workers, mp_context=context, initializer=_init_worker, initargs=(kind, path, head, checksums.first),
+    ) as pool:
+        pending = deque()
+        while True:
+            started = time.perf_counter()
+            while len(pending) < 2 * workers:
+                block = next(blocks, None)
+                if block is None:
+                    break
+                pending.append(pool.submit(_clean_block, block))
+            stages['split'] += time.perf_counter() - started
+            if not pending:
+                return
+
+            started = time.perf_counter()
+            columns, months, block_skipped, seconds = pending.popleft().result()
+            stages['wait'] += time.perf_counter() - started
+            stages['parse'] += seconds
+            checksums.merge(months)
+            skipped[0] += block_skipped
+
+            started = time.perf_counter()
+            rows = list(_decode(columns))
+            stages['decode'] += time.perf_counter() - started
+            yield from rows
@@ -0,0 +1,96 @@
+"""
+Time every crime API endpoint over representative filters (see
+crime/benchmarks/harness.py) and write a JSON report.
+
+Usage:
+    python manage.py benchmark_endpoints                          # Configured backend
+    python manage.py benchmark_endpoints --backend sql --backend cube
+    python manage.py benchmark_endpoints --output report.json
+    python manage.py benchmark_endpoints --baseline report.json   # Fail on regressions
+
+Run it against a dataset of known size (e.g. from generate_crime_data) so
+reports can be compared.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crime.benchmarks.harness import regressions, run
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the crime API endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend',
+            action='append',
+            choices=('sql', 'cube'),
+            help='Query backend to benchmark; repeat for several '
+                 '(default: CRIME_QUERY_BACKEND)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed requests per case (default 20)',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=1,
+            help='Untimed requests per case first (default 1)',
+        )
+        parser.add_argument(
+            '--cached',
+            action='store_true',
+            help='Leave the response cache on (default: cleared before every request)',
+        )
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument(
+            '--baseline',
+            help='Earlier report to compare with; exits with an error on regressions',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=1.25,
+            help='Allowed p50 slowdown against the baseline (default 1.25)',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['warmup'] < 1:
+            raise CommandError('--repeat and --warmup must be at least 1')
+
+        def progress(result):
+            self.stdout.write(
+                f'  {result["backend"]:<4} {result["endpoint"]:<18} {result["case"]:<38} '
+                f'p50 {result["p50_ms"]:8.2f} ms  p95 {result["p95_ms"]:8.2f} ms  '
+                f'{result["queries"]:>2} queries'
+            )
+
+        report = run(
+            backends=options['backend'], repeat=options['repeat'],
+            warmup=options['warmup'], cached=options['cached'], progress=progress,
+        )
+        dataset = report['dataset']
+        self.stdout.write(
+            f'Dataset version {dataset["version"]}: {dataset["rows"]} rows, '
+            f'{dataset["first_month"]} to {dataset["last_month"]}'
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+            found = regressions(report, baseline, tolerance=options['tolerance'])
+            for message in found:
+                self.stdout.write(self.style.ERROR(f'  {message}'))
+            if found:
+                raise CommandError(f'{len(found)} regressions against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
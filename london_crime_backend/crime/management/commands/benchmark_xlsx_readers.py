@@ -0,0 +1,219 @@
+"""
+Compare the two XLSX readers of import_crime_data (openpyxl read-only
+mode and crime.xlsx_reader) for throughput and peak memory.
+
+Usage:
+    python manage.py benchmark_xlsx_readers                  # Synthetic workbook, 500k rows
+    python manage.py benchmark_xlsx_readers --rows 1000000
+    python manage.py benchmark_xlsx_readers --path data.xlsx # An existing workbook
+
+Each reader runs in a fresh process so their peak RSS can be compared.
+Both are fed through clean_rows and must produce the same month checksums.
+"""
+import datetime
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import zipfile
+from itertools import chain, islice
+from xml.sax.saxutils import escape
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crime.benchmarks.synthetic import synthetic_rows
+from crime.ingest import READERS, MonthChecksums, clean_rows, read_xlsx
+from crime.months import month_index
+
+
+# A dozen columns like the published file, in its order
+HEADERS = (
+    'Area Type', 'Borough_SNT', 'Area name', 'Area code', 'Offence Group',
+    'Offence Subgroup', 'Measure', 'Financial Year', 'FY_FYIndex',
+    'Month_Year', 'Count', 'Refresh Date',
+)
+
+# Month of the last synthetic row; rows are generated up to it
+LAST_MONTH = month_index('2026-09')
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '</Types>'
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+    '</Relationships>'
+)
+# Style 1 shows a date, so Month_Year cells read back as datetimes
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd h:mm:ss"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _column_name(index):
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+def workbook_rows(count):
+    """
+    ``count`` rows of HEADERS values, made from the rows of
+    crime.benchmarks.synthetic for the months up to LAST_MONTH. The
+    columns the import does not read are filled in like the published file.
+    """
+    per_month = sum(1 for _ in synthetic_rows(1, LAST_MONTH))
+    rows = synthetic_rows(-(-count // per_month), LAST_MONTH)
+    codes = {}
+    for month_year, area_type, area, group, subgroup, value in islice(rows, count):
+        month_year = datetime.datetime.fromisoformat(month_year)
+        fy = month_year.year if month_year.month >= 4 else month_year.year - 1
+        yield (
+            area_type, area, area, f'E0{codes.setdefault(area, len(codes)):07d}',
+            group, subgroup, 'Offences', f'{fy}-{(fy + 1) % 100:02d}', fy - 2009,
+            month_year, value, 'r',
+        )
+
+
+def write_workbook(path, rows):
+    """
+    Write ``rows`` (HEADERS order) as a single-sheet XLSX with a shared
+    strings table, the way Excel saves the published file.
+    """
+    epoch = datetime.datetime(1899, 12, 30)
+    strings = {}
+
+    def cell(ref, value):
+        if isinstance(value, datetime.datetime):
+            return f'<c r="{ref}" s="1"><v>{(value - epoch).days}</v></c>'
+        if isinstance(value, (int, float)):
+            return f'<c r="{ref}"><v>{value}</v></c>'
+        index = strings.setdefault(value, len(strings))
+        return f'<c r="{ref}" t="s"><v>{index}</v></c>'
+
+    columns = [_column_name(i) for i in range(len(HEADERS))]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', ROOT_RELS)
+        archive.writestr('xl/workbook.xml', WORKBOOK)
+        archive.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', STYLES)
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            for number, row in enumerate(chain([HEADERS], rows), 1):
+                cells = ''.join(cell(f'{c}{number}', v) for c, v in zip(columns, row))
+                sheet.write(f'<row r="{number}">{cells}</row>'.encode())
+            sheet.write(b'</sheetData></worksheet>')
+        with archive.open('xl/sharedStrings.xml', 'w') as table:
+            table.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            )
+            for value in strings:
+                table.write(f'<si><t>{escape(value)}</t></si>'.encode())
+            table.write(b'</sst>')
+
+
+def _measure(path, reader, results):
+    """Child process: read the workbook with one reader."""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    checksums = MonthChecksums()
+    rows = 0
+    for _ in checksums.track(clean_rows(read_xlsx(path, reader=reader))):
+        rows += 1
+    results.put({
+        'reader': reader,
+        'rows': rows,
+        'seconds': time.perf_counter() - started,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'reader_rss_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024,
+        'checksums': checksums.checksums(),
+    })
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the XLSX readers of import_crime_data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=500000,
+            help='Rows in the synthetic workbook (default 500000)',
+        )
+        parser.add_argument(
+            '--path',
+            help='Benchmark an existing workbook instead of a synthetic one',
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = options['path']
+            if path is None:
+                path = os.path.join(tmp, 'synthetic.xlsx')
+                self.stdout.write(f'Writing a synthetic workbook of {options["rows"]} rows...')
+                write_workbook(path, workbook_rows(options['rows']))
+            size = os.path.getsize(path) / (1024 * 1024)
+            self.stdout.write(f'Workbook: {path} ({size:.1f} MB)')
+
+            # A fresh interpreter per reader, so peak RSS is the reader's own
+            context = multiprocessing.get_context('spawn')
+            results = []
+            for reader in READERS:
+                queue = context.Queue()
+                process = context.Process(target=_measure, args=(path, reader, queue))
+                process.start()
+                results.append(queue.get())
+                process.join()
+
+        for result in results:
+            self.stdout.write(
+                f'  {result["reader"]:<10} {result["rows"]} rows in {result["seconds"]:.1f}s '
+                f'({result["rows"] / max(result["seconds"], 1e-9):,.0f} rows/s), '
+                f'peak RSS {result["peak_rss_mb"]:.0f} MB (+{result["reader_rss_mb"]:.0f} MB reading)'
+            )
+        if any(r['checksums'] != results[0]['checksums'] for r in results):
+            raise CommandError('The readers produced different rows')
+        self.stdout.write(self.style.SUCCESS('Both readers produced the same rows.'))
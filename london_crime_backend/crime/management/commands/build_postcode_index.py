@@ -0,0 +1,138 @@
+"""
+Build the full-postcode index used by borough-ranking (see
+crime/postcode_index.py) from an ONS postcode directory CSV.
+
+Usage:
+    python manage.py build_postcode_index ONSPD_FEB_2025_UK.csv
+    python manage.py build_postcode_index NSPL.csv --district-column laua
+    python manage.py build_postcode_index postcodes.csv --include-terminated
+
+The CSV needs a postcode column (pcds, pcd, pcd2 or postcode) and a local
+authority district column (oslaua, laua or ladNNcd), as in the ONS
+Postcode Directory and National Statistics Postcode Lookup. Postcodes in
+the London boroughs (E09 codes) are indexed with their borough; the other
+postcodes of the outward codes in POSTCODE_TO_BOROUGH are indexed as
+outside London, so border postcodes are not put in a London borough.
+Terminated postcodes (with a doterm) are skipped unless asked for.
+"""
+import csv
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crime.postcode_index import index_dir, normalize, write_postcode_index
+from crime.postcode_mapping import POSTCODE_TO_BOROUGH
+
+
+# ONS codes of the London boroughs, named as in the crime data
+LONDON_DISTRICTS = {
+    'E09000001': 'City of London',
+    'E09000002': 'Barking and Dagenham',
+    'E09000003': 'Barnet',
+    'E09000004': 'Bexley',
+    'E09000005': 'Brent',
+    'E09000006': 'Bromley',
+    'E09000007': 'Camden',
+    'E09000008': 'Croydon',
+    'E09000009': 'Ealing',
+    'E09000010': 'Enfield',
+    'E09000011': 'Greenwich',
+    'E09000012': 'Hackney',
+    'E09000013': 'Hammersmith and Fulham',
+    'E09000014': 'Haringey',
+    'E09000015': 'Harrow',
+    'E09000016': 'Havering',
+    'E09000017': 'Hillingdon',
+    'E09000018': 'Hounslow',
+    'E09000019': 'Islington',
+    'E09000020': 'Kensington and Chelsea',
+    'E09000021': 'Kingston upon Thames',
+    'E09000022': 'Lambeth',
+    'E09000023': 'Lewisham',
+    'E09000024': 'Merton',
+    'E09000025': 'Newham',
+    'E09000026': 'Redbridge',
+    'E09000027': 'Richmond upon Thames',
+    'E09000028': 'Southwark',
+    'E09000029': 'Sutton',
+    'E09000030': 'Tower Hamlets',
+    'E09000031': 'Waltham Forest',
+    'E09000032': 'Wandsworth',
+    'E09000033': 'Westminster',
+}
+
+POSTCODE_COLUMNS = ('pcds', 'pcd', 'pcd2', 'postcode')
+DISTRICT_COLUMNS = ('oslaua', 'laua')
+DISTRICT_COLUMN = re.compile(r'lad\d{2}cd')
+
+
+def _outward(clean):
+    return clean[:-3]
+
+
+def _covered(outward, outwards):
+    """True if the fallback mapping has ``outward`` or a prefix of it."""
+    return any(outward[:length] in outwards for length in range(len(outward), 0, -1))
+
+
+class Command(BaseCommand):
+    help = 'Build the full-postcode borough index from an ONS postcode CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help='ONS Postcode Directory or NSPL CSV')
+        parser.add_argument('--postcode-column', help='Postcode column (default: detected)')
+        parser.add_argument('--district-column', help='Local authority column (default: detected)')
+        parser.add_argument(
+            '--include-terminated',
+            action='store_true',
+            help='Also index postcodes that are no longer in use',
+        )
+
+    def _column(self, header, given, names, pattern=None):
+        if given:
+            if given not in header:
+                raise CommandError(f'No column {given!r} in the CSV')
+            return given
+        for name in header:
+            if name.lower() in names or (pattern and pattern.fullmatch(name.lower())):
+                return name
+        raise CommandError(f'No column for {"/".join(names)} in the CSV; name it with an option')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        outwards = set(POSTCODE_TO_BOROUGH)
+        boroughs = {}
+        skipped = 0
+        with open(options['csv'], newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            header = reader.fieldnames or []
+            postcode_column = self._column(header, options['postcode_column'], POSTCODE_COLUMNS)
+            district_column = self._column(
+                header, options['district_column'], DISTRICT_COLUMNS, DISTRICT_COLUMN,
+            )
+            terminated = 'doterm' if 'doterm' in header and not options['include_terminated'] else None
+
+            for row in reader:
+                if terminated and row[terminated].strip():
+                    skipped += 1
+                    continue
+                clean = normalize(row[postcode_column])
+                if len(clean) < 5:
+                    continue
+                borough = LONDON_DISTRICTS.get(row[district_column].strip())
+                if borough is None and not _covered(_outward(clean), outwards):
+                    continue
+                boroughs[clean] = borough
+
+        if not boroughs:
+            raise CommandError('No London postcodes found in the CSV')
+        count = write_postcode_index(boroughs)
+        london = sum(1 for borough in boroughs.values() if borough is not None)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} postcodes ({london} in London, {count - london} outside '
+            f'it in shared outward codes) in {time.perf_counter() - started:.1f}s'
+        ))
+        if skipped:
+            self.stdout.write(f'  → Skipped {skipped} terminated postcodes')
+        self.stdout.write(f'  → Written to {index_dir()}')
@@ -0,0 +1,95 @@
+"""
+Replace the crime data with a synthetic dataset, for benchmarks.
+
+Usage:
+    python manage.py generate_crime_data                    # 36 months, boroughs and wards
+    python manage.py generate_crime_data --months 180       # 15 years of history
+    python manage.py generate_crime_data --area-types Borough --noinput
+
+The rows are written to a temporary CSV and imported with
+``import_crime_data --file``, so the dimension tables, rollups, month
+checksums and dataset version are all built as for real data. Point
+CRIME_DATABASE_PATH and CRIME_DATA_DIR at a scratch copy first.
+"""
+import datetime
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from crime.benchmarks.synthetic import AREA_TYPES, synthetic_rows, write_source_csv
+from crime.months import month_index
+
+
+class Command(BaseCommand):
+    help = 'Replace the crime data with a synthetic dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=36,
+            help='Months of history (default 36)',
+        )
+        parser.add_argument(
+            '--last-month',
+            help='Latest month, as YYYY-MM (default: last calendar month)',
+        )
+        parser.add_argument(
+            '--area-types',
+            default=','.join(AREA_TYPES),
+            help=f'Comma-separated area types (default {",".join(AREA_TYPES)})',
+        )
+        parser.add_argument(
+            '--wards',
+            type=int,
+            default=20,
+            help='Wards per borough when Ward is an area type (default 20)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default 0)')
+        parser.add_argument(
+            '--noinput',
+            action='store_true',
+            help='Do not ask for confirmation before replacing the data',
+        )
+
+    def handle(self, *args, **options):
+        if options['last_month']:
+            last_month = month_index(options['last_month'])
+            if last_month is None:
+                raise CommandError('--last-month must look like YYYY-MM')
+        else:
+            today = datetime.date.today()
+            last_month = today.year * 12 + today.month - 2
+        area_types = [t.strip() for t in options['area_types'].split(',') if t.strip()]
+        if options['months'] < 1 or not area_types:
+            raise CommandError('Need at least one month and one area type')
+
+        database = settings.DATABASES['default']['NAME']
+        if not options['noinput']:
+            answer = input(
+                f'This replaces all crime data in {database} with synthetic data. '
+                "Type 'yes' to continue: "
+            )
+            if answer != 'yes':
+                raise CommandError('Cancelled.')
+
+        rows = synthetic_rows(
+            options['months'], last_month, area_types=area_types,
+            wards=options['wards'], seed=options['seed'],
+        )
+        fd, path = tempfile.mkstemp(dir=settings.DATA_DIR, prefix='.synthetic-', suffix='.csv')
+        os.close(fd)
+        try:
+            started = time.perf_counter()
+            count = write_source_csv(path, rows)
+            self.stdout.write(
+                f'Generated {count} rows over {options["months"]} months '
+                f'({time.perf_counter() - started:.1f}s)'
+            )
+            call_command('import_crime_data', file=path, stdout=self.stdout, stderr=self.stderr)
+        finally:
+            os.remove(path)
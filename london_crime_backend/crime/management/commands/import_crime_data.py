@@ -2,33 +2,79 @@
 Management command to download and import the MPS Monthly Crime data.
 
 Usage:
-    python manage.py import_crime_data          # Download if missing, then import
-    python manage.py import_crime_data --force   # Re-download and re-import
+    python manage.py import_crime_data                # Download if missing, then import
+    python manage.py import_crime_data --force        # Re-download (if changed upstream) and re-import
+    python manage.py import_crime_data --incremental  # Only rewrite months that changed
+    python manage.py import_crime_data --batch-size N # Rows per INSERT batch
+    python manage.py import_crime_data --reader expat # Faster XLSX reader (crime/xlsx_reader.py)
+    python manage.py import_crime_data --workers 4    # Parse and clean in 4 processes
+    python manage.py import_crime_data --file data.csv # Import a local CSV or XLSX instead
 """
-import csv
+import contextlib
 import os
+import time
+from itertools import islice
+from pathlib import Path
 
-import pandas as pd
-import requests
-from openpyxl import load_workbook
 from django.conf import settings
-from django.core.management.base import BaseCommand
-
-from crime.models import CrimeRecord
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from crime.bulk_load import indexes_dropped, insert_rows
+from crime.column_cache import ColumnCacheWriter, covering_cache, read_columns
+from crime.dataset import bump_version, current_generation, current_version
+from crime.dimensions import ensure_dimension_ids
+from crime.download import DownloadError, download, read_meta, write_meta
+from crime.generations import delete_generations, next_generation, publish_generation
+from crime.ingest import (
+    READERS, MonthChecksums, MonthSpill, clean_rows, read_csv, read_xlsx, retained_rows,
+    write_csv,
+)
+from crime.ingest_workers import parallel_clean_rows
+from crime.models import Area, CrimeRecord, ImportedMonth, OffenceGroup, OffenceSubgroup
+from crime.months import first_retained_month, month_label
+from crime.rankings import rebuild_rankings
+from crime.rollups import rebuild_rollups
 
 
 EXCEL_FILENAME = 'MonthlyCrimeDashboard_TNOCrimeData.xlsx'
 CSV_FILENAME = 'MonthlyCrimeDashboard_TNOCrimeData.csv'
-
-# Only the columns we actually use in the dashboard
-COLUMNS_TO_KEEP = {
-    'Month_Year': 'month_year',
-    'Area Type': 'area_type',
-    'Area name': 'area_name',
-    'Offence Group': 'offence_group',
-    'Offence Subgroup': 'offence_subgroup',
-    'Count': 'count',
-}
+# ETag, Last-Modified, size and SHA-256 of the download the cache came from
+DOWNLOAD_META_FILENAME = 'MonthlyCrimeDashboard_TNOCrimeData.download.json'
+
+# CrimeRecord fields written by the import: the generation, then one per
+# cleaned row value (crime.ingest.CLEAN_FIELDS), names replaced by ids
+RECORD_FIELDS = (
+    'generation', 'month_year', 'month_index', 'area_type',
+    'area', 'offence_group', 'offence_subgroup', 'count',
+)
+
+# Position of each dimension name in a cleaned row
+DIMENSIONS = ((3, Area), (4, OffenceGroup), (5, OffenceSubgroup))
+
+
+def record_rows(rows, generation, batch_size):
+    """
+    CrimeRecord value tuples (in RECORD_FIELDS order) for cleaned rows.
+    Rows are taken ``batch_size`` at a time so that names not seen before
+    can be added to the dimension tables once per batch.
+    """
+    ids = {model: {} for _, model in DIMENSIONS}
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        for position, model in DIMENSIONS:
+            missing = {row[position] for row in batch} - ids[model].keys()
+            if missing:
+                ids[model].update(ensure_dimension_ids(model, missing))
+        areas, groups, subgroups = (ids[model] for _, model in DIMENSIONS)
+        for month_year, index, area_type, area, group, subgroup, count in batch:
+            yield (
+                generation, month_year, index, area_type,
+                areas[area], groups[group], subgroups[subgroup], count,
+            )
 
 
 class Command(BaseCommand):
@@ -38,199 +84,401 @@ class Command(BaseCommand):
         parser.add_argument(
             '--force',
             action='store_true',
-            help='Force re-download even if the cached file exists',
+            help='Download again even if the cached file exists (skipped '
+                 'when the server reports the file has not changed)',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only replace months whose rows differ from the last import',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.CRIME_IMPORT_BATCH_SIZE,
+            help='Rows held in memory and written per INSERT batch '
+                 f'(default {settings.CRIME_IMPORT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--reader',
+            choices=READERS,
+            default='openpyxl',
+            help='How a downloaded XLSX is read: openpyxl read-only mode, or '
+                 'expat, which parses only the columns we keep (about twice as fast)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes that parse and clean the source file, feeding a '
+                 'single writer (default 1: all in this process; with more, '
+                 'an XLSX is always read with the expat reader). Ignored on a '
+                 'single CPU, where the workers only take time from the writer',
+        )
+        parser.add_argument(
+            '--file',
+            help='Import this CSV (columns as in the CSV cache) or XLSX file '
+                 'instead of the published data; the caches are left alone',
         )
 
     def handle(self, *args, **options):
         excel_path = settings.DATA_DIR / EXCEL_FILENAME
         csv_path = settings.DATA_DIR / CSV_FILENAME
+        meta_path = settings.DATA_DIR / DOWNLOAD_META_FILENAME
         force = options['force']
-
-        # Step 1: Download XLSX if needed
-        if not csv_path.exists() or force:
-            self._download(excel_path)
-            self._convert_to_csv_streaming(excel_path, csv_path)
+        self.reader = options['reader']
+        self.workers = options['workers']
+        if self.workers > 1 and (os.cpu_count() or 1) <= 1:
+            self._warn(f'One CPU: ignoring --workers {self.workers}, parsing in this process')
+            self.workers = 1
+        self.stages = {}
+        first = first_retained_month(settings.CRIME_DATA_RETENTION_MONTHS)
+
+        # Step 1: Download XLSX if needed. Its rows are imported straight
+        # from the workbook and copied to the CSV cache on the way, since
+        # later runs read the CSV much faster than the XLSX.
+        if options['file']:
+            path = Path(options['file'])
+            self.stdout.write(f'Importing {path}')
+            part_path = None
+            source = ('xlsx' if path.suffix.lower() == '.xlsx' else 'csv', path)
+        elif not csv_path.exists() or force:
+            # Only ask whether the file changed when we still hold its rows
+            previous = read_meta(meta_path) if csv_path.exists() else None
+            fetched = self._download(excel_path, previous)
+            if fetched is None or fetched['sha256'] == (previous or {}).get('sha256'):
+                if excel_path.exists():
+                    os.remove(excel_path)
+                self.stdout.write(self.style.SUCCESS(
+                    'Source file unchanged since the last download; nothing to import.'
+                ))
+                return
+            part_path = csv_path.with_name(csv_path.name + '.part')
+            self.stdout.write('Reading XLSX (streaming mode)...')
+            source = ('xlsx', excel_path)
+        elif (columns_path := covering_cache(current_version(), first, csv_path)) is not None:
+            # The column cache written by the last import holds the same
+            # rows, already cleaned, and reads far faster than the CSV
+            self.stdout.write(self.style.SUCCESS(
+                f'Using cached columns: {columns_path} (same rows as the unchanged {csv_path})'
+            ))
+            part_path = None
+            source = ('columns', columns_path)
         else:
             self.stdout.write(self.style.SUCCESS(
                 f'Using cached CSV: {csv_path}'
             ))
+            part_path = None
+            source = ('csv', csv_path)
+
+        # Step 2: Import
+        if first is not None:
+            self.stdout.write(
+                f'Keeping months from {month_label(first)} '
+                f'(CRIME_DATA_RETENTION_MONTHS={settings.CRIME_DATA_RETENTION_MONTHS})'
+            )
+        self._import(
+            *source,
+            first=first,
+            cache_path=part_path,
+            incremental=options['incremental'],
+            batch_size=options['batch_size'],
+            csv_cache=None if options['file'] else part_path or csv_path,
+        )
 
-        # Step 2: Import from CSV (much faster than XLSX)
-        self._import(csv_path)
-
-    def _download(self, dest_path):
-        url = settings.CRIME_DATA_EXCEL_URL
-        self.stdout.write(f'Downloading data from {url} ...')
-
-        headers = {
-            'User-Agent': (
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                'AppleWebKit/537.36 (KHTML, like Gecko) '
-                'Chrome/91.0.4472.124 Safari/537.36'
+        if part_path is not None:
+            os.replace(part_path, csv_path)
+            write_meta(meta_path, fetched)
+            # Report size savings
+            xlsx_size = os.path.getsize(excel_path) / (1024 * 1024)
+            csv_size = os.path.getsize(csv_path) / (1024 * 1024)
+            self.stdout.write(
+                f'  → Cached {xlsx_size:.1f} MB (XLSX) as {csv_size:.1f} MB (CSV)'
             )
-        }
-
-        response = requests.get(url, headers=headers, stream=True, timeout=300)
-        response.raise_for_status()
-
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
-
-        with open(dest_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=1024 * 1024):
-                f.write(chunk)
-                downloaded += len(chunk)
-                if total_size:
-                    pct = (downloaded / total_size) * 100
-                    self.stdout.write(
-                        f'\r  Downloaded {downloaded // (1024*1024)} MB '
-                        f'/ {total_size // (1024*1024)} MB  ({pct:.0f}%)',
-                        ending=''
-                    )
+            # Remove the XLSX to save disk space
+            os.remove(excel_path)
+            self.stdout.write(f'  → Removed XLSX file')
 
-        self.stdout.write('')  # newline
-        self.stdout.write(self.style.SUCCESS(f'Saved XLSX to {dest_path}'))
+    def _warn(self, message):
+        self.stdout.write(self.style.WARNING(message))
 
-    def _convert_to_csv_streaming(self, excel_path, csv_path):
+    def _rows(self, kind, path, checksums, skipped):
         """
-        Convert XLSX to CSV using openpyxl streaming (read_only=True).
-        This avoids loading the entire file into memory, preventing OOM crashes on small instances.
+        Cleaned rows of a source file ('xlsx' or 'csv') or column cache
+        directory ('columns'), added to ``checksums`` as they are read (see
+        crime/ingest.py).
         """
-        self.stdout.write('Converting XLSX to CSV (streaming mode)...')
-        self.stdout.write('  → Opening workbook (this may take a moment)...')
-
-        # Load workbook in read-only mode (streaming)
-        wb = load_workbook(excel_path, read_only=True, data_only=True)
-        ws = wb.active
+        if kind == 'columns':
+            return checksums.track(read_columns(path))
+        if self.workers > 1:
+            return parallel_clean_rows(
+                kind, path, self.workers, checksums, skipped, self.stages, warn=self._warn,
+            )
+        if kind == 'xlsx':
+            rows = read_xlsx(path, warn=self._warn, reader=self.reader)
+        else:
+            rows = read_csv(path)
+        return checksums.track(clean_rows(rows, skipped))
 
-        # Get rows generator
-        rows = ws.rows
-        
-        # Read header row
-        try:
-            header_row = next(rows)
-            headers = [cell.value for cell in header_row]
-        except StopIteration:
-            self.stdout.write(self.style.ERROR('Empty Excel file'))
+    def _report_stages(self, seconds):
+        """Where the time of a --workers run went; the writer gets the rest."""
+        if not self.stages:
             return
+        reading = self.stages['split'] + self.stages['wait'] + self.stages['decode']
+        self.stdout.write(
+            f'  → split {self.stages["split"]:.1f}s, '
+            f'parse {self.stages["parse"]:.1f}s across {self.workers} workers, '
+            f'waiting on workers {self.stages["wait"]:.1f}s, '
+            f'decode {self.stages["decode"]:.1f}s, write {seconds - reading:.1f}s'
+        )
 
-        # Map Excel column names to indices
-        col_indices = {}
-        for col_name, field_name in COLUMNS_TO_KEEP.items():
-            try:
-                idx = headers.index(col_name)
-                col_indices[field_name] = idx
-            except ValueError:
-                self.stdout.write(self.style.WARNING(f'Column "{col_name}" not found in Excel'))
-
-        # Prepare CSV output
-        with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=COLUMNS_TO_KEEP.values())
-            writer.writeheader()
-
-            count = 0
-            for row in rows:
-                row_data = {}
-                # Extract only the columns we need
-                for field_name, idx in col_indices.items():
-                    val = row[idx].value if idx < len(row) else None
-                    row_data[field_name] = val
-                
-                # FILTER: Only keep data from 2023 onwards
-                # This reduces DB size and significantly speeds up imports/queries
-                month_val = row_data.get('month_year')
-                if month_val:
-                    # Convert to string for comparison (works for datetime objs or str)
-                    # "2023..." >= "2023" is True. "2022..." is False.
-                    if str(month_val) < '2023':
-                        continue
-
-                writer.writerow(row_data)
-                count += 1
-                
-                if count % 50000 == 0:
-                    self.stdout.write(f'  → Processed {count} rows...', ending='\r')
-
-        self.stdout.write(f'  → Processed {count} rows total.')
-        
-        # Cleanup
-        wb.close()
-
-        # Report size savings
-        xlsx_size = os.path.getsize(excel_path) / (1024 * 1024)
-        csv_size = os.path.getsize(csv_path) / (1024 * 1024)
-        self.stdout.write(self.style.SUCCESS(
-            f'  → Converted: {xlsx_size:.1f} MB (XLSX) → {csv_size:.1f} MB (CSV)'
-        ))
+    def _download(self, dest_path, previous=None):
+        """
+        Download the workbook to ``dest_path`` (see crime/download.py).
+        Returns its metadata, or None if the server says it is unchanged
+        since the download described by ``previous``.
+        """
+        url = settings.CRIME_DATA_EXCEL_URL
+        self.stdout.write(f'Downloading data from {url} ...')
 
-        # Remove the XLSX to save disk space
-        os.remove(excel_path)
-        self.stdout.write(f'  → Removed XLSX file')
-
-    def _import(self, csv_path):
-        self.stdout.write('Reading CSV file...')
-
-        # Pandas is fine for CSV reading (much lower RAM overhead than chunks of XML)
-        # But we can also use chunksize if we really needed to be safe, 
-        # though read_csv is generally efficient enough for 75MB on 512MB RAM.
-        df = pd.read_csv(csv_path, dtype=str)
-        self.stdout.write(f'  → {len(df)} rows, {len(df.columns)} columns')
-
-        # Clean data
-        df = df.fillna({
-            'area_type': '',
-            'area_name': '',
-            'offence_group': '',
-            'offence_subgroup': '',
-            'count': '0',
-        })
-
-        df['month_year'] = df['month_year'].astype(str)
-        df['count'] = pd.to_numeric(df['count'], errors='coerce').fillna(0).astype(int)
-
-        # Title-case offence names (e.g. "THEFT" -> "Theft")
-        if 'offence_group' in df.columns:
-            df['offence_group'] = df['offence_group'].str.title()
-        if 'offence_subgroup' in df.columns:
-            df['offence_subgroup'] = df['offence_subgroup'].str.title()
-
-        # Clear existing data
-        self.stdout.write('Clearing existing records...')
-        CrimeRecord.objects.all().delete()
-
-        # Bulk create in batches
-        batch_size = 5000
-        total = len(df)
-        self.stdout.write(f'Importing {total} records in batches of {batch_size}...')
-
-        for start in range(0, total, batch_size):
-            end = min(start + batch_size, total)
-            batch = df.iloc[start:end]
-
-            records = []
-            for _, row in batch.iterrows():
-                records.append(CrimeRecord(
-                    month_year=row['month_year'],
-                    area_type=row.get('area_type', ''),
-                    area_name=row.get('area_name', ''),
-                    offence_group=row.get('offence_group', ''),
-                    offence_subgroup=row.get('offence_subgroup', ''),
-                    count=row.get('count', 0),
-                ))
+        shown = [None]
 
-            CrimeRecord.objects.bulk_create(records)
+        def progress(downloaded, total_size):
+            if total_size:
+                pct = (downloaded / total_size) * 100
+                if round(pct) == shown[0]:
+                    return
+                shown[0] = round(pct)
+                self.stdout.write(
+                    f'\r  Downloaded {downloaded // (1024*1024)} MB '
+                    f'/ {total_size // (1024*1024)} MB  ({pct:.0f}%)',
+                    ending=''
+                )
 
-            pct = (end / total) * 100
-            self.stdout.write(f'  → {end}/{total} ({pct:.0f}%)')
+        try:
+            fetched = download(url, dest_path, previous=previous, progress=progress)
+        except DownloadError as e:
+            raise CommandError(f'Download failed: {e}')
+        self.stdout.write('')  # newline
+        if fetched is not None:
+            self.stdout.write(self.style.SUCCESS(
+                f'Saved XLSX to {dest_path} (sha256 {fetched["sha256"][:12]}…)'
+            ))
+        return fetched
 
-        self.stdout.write(self.style.SUCCESS(
-            f'Successfully imported {total} crime records.'
-        ))
+    def _import(self, kind, path, first=None, cache_path=None, incremental=False,
+                batch_size=20000, csv_cache=None):
+        """
+        Import the months from index ``first`` on (all if None) of a
+        source file ('xlsx' or 'csv') or column cache ('columns'). Every
+        cleaned row is copied to ``cache_path`` as a CSV when given; the
+        imported ones also go to a new column cache published with the
+        dataset version. ``csv_cache`` is the CSV cache holding the same
+        rows, if they are its rows: later imports read the column cache
+        instead while that file is unchanged.
+        """
+        if connection.vendor == 'sqlite':
+            # WAL lets readers carry on while the import writes (the setting
+            # persists in the database file)
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+
+        started = time.perf_counter()
+        skipped = [0]
+        checksums = MonthChecksums(first)
+        rows = self._rows(kind, path, checksums, skipped)
+        if cache_path is not None:
+            rows = write_csv(rows, cache_path)
+        rows = retained_rows(rows, first)
+        columns = ColumnCacheWriter(first, source=csv_cache)
+        rows = columns.track(rows)
+        try:
+            if incremental:
+                # The second pass reads the CSV, which exists by then
+                source = ('csv', cache_path) if cache_path is not None else (kind, path)
+                reread = lambda: self._rows(*source, MonthChecksums(), [0])
+                if not self._load_changed_months(rows, checksums, reread, batch_size):
+                    # The rows match the live data, so the cache does too
+                    columns.publish(current_version())
+                    self.stdout.write(self.style.SUCCESS('No months changed; nothing to import.'))
+                    return
+                # Invalidate cached responses and in-memory copies of the old data
+                state = bump_version(import_seconds=round(time.perf_counter() - started, 1))
+            else:
+                generation = self._load_all(rows, checksums, batch_size)
+                # Readers switch over to the published generation here
+                state = bump_version(import_seconds=round(time.perf_counter() - started, 1))
+            columns.publish(state['version'])
+        except BaseException:
+            columns.discard()
+            raise
+        if skipped[0]:
+            self.stdout.write(self.style.WARNING(
+                f'  → Skipped {skipped[0]} rows with an unrecognised month'
+            ))
+        self.stdout.write(f'  → Dataset version {state["version"]}')
+
+        if not incremental:
+            # Give requests that started on the old generation time to finish
+            time.sleep(settings.CRIME_GENERATION_GC_DELAY)
+            deleted = delete_generations(keep=generation)
+            self.stdout.write(
+                f'  → Removed {deleted["CrimeRecord"]} records of previous generations'
+            )
 
         # Print summary stats
-        areas = CrimeRecord.objects.values_list('area_name', flat=True).distinct().count()
+        areas = CrimeRecord.objects.values_list('area', flat=True).distinct().count()
         offence_groups = CrimeRecord.objects.values_list('offence_group', flat=True).distinct().count()
         months = CrimeRecord.objects.values_list('month_year', flat=True).distinct().count()
         self.stdout.write(f'  → {areas} unique areas')
         self.stdout.write(f'  → {offence_groups} offence groups')
         self.stdout.write(f'  → {months} distinct months')
+
+    def _progress(self, done):
+        self.stdout.write(f'  → {done} rows...', ending='\r')
+
+    def _load_all(self, rows, checksums, batch_size):
+        """
+        Write cleaned ``rows`` as a new data generation, with its rollups
+        and month checksums, in a single pass over the rows, and publish it
+        in the same transaction. ``checksums`` is the MonthChecksums the
+        rows are added to as they are read. Returns the generation.
+        """
+        # Rows of an earlier import that never got published
+        delete_generations(keep=current_generation())
+        generation = next_generation()
+
+        # Readers only see the live generation, so nothing here affects them
+        # until the transaction commits and the dataset version is bumped.
+        # Indexes are only dropped for the load when there is nothing to serve.
+        started = time.perf_counter()
+        with transaction.atomic():
+            self.stdout.write(f'Importing records as generation {generation}...')
+            if CrimeRecord.all_generations.exists():
+                without_indexes = contextlib.nullcontext({})
+            else:
+                without_indexes = indexes_dropped(CrimeRecord)
+            with without_indexes as indexes:
+                records = record_rows(rows, generation, batch_size)
+                inserted = insert_rows(
+                    CrimeRecord, RECORD_FIELDS, records,
+                    batch_size=batch_size, progress=self._progress,
+                )
+                self.stdout.write(f'  → {inserted} rows total.')
+                loaded = time.perf_counter()
+                if indexes:
+                    self.stdout.write(f'Rebuilding {len(indexes)} indexes...')
+            indexed = time.perf_counter()
+
+            # Build the pre-aggregated rollup tables used by the API
+            self.stdout.write('Building rollup tables...')
+            for name, count in rebuild_rollups(generation=generation).items():
+                self.stdout.write(f'  → {name}: {count} rows')
+            self.stdout.write(
+                f'  → BoroughRanking: {rebuild_rankings(generation=generation)} rows'
+            )
+
+            ImportedMonth.all_generations.bulk_create(
+                ImportedMonth(
+                    generation=generation, month_index=index, month_year=month_year,
+                    row_count=count, checksum=checksum,
+                )
+                for index, (month_year, count, checksum) in checksums.checksums().items()
+            )
+            publish_generation(generation)
+        finished = time.perf_counter()
+
+        load_seconds = loaded - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully imported {inserted} crime records '
+            f'({inserted / max(load_seconds, 1e-9):,.0f} rows/s).'
+        ))
+        self.stdout.write(
+            f'  → load {load_seconds:.1f}s, indexes {indexed - loaded:.1f}s, '
+            f'rollups {finished - indexed:.1f}s'
+        )
+        self._report_stages(load_seconds)
+        return generation
+
+    def _load_changed_months(self, rows, checksums, reread, batch_size):
+        """
+        Replace only the months whose checksum differs from the stored one,
+        add new months and drop months no longer in the source. Works on
+        the live generation in place, one transaction per month (its
+        records, rollups and checksum), so readers never see a half-written
+        month; the rankings are rebuilt once all months are in.
+
+        The first pass over ``rows`` only fills in ``checksums``; the rows
+        of the changed months are then read from ``reread()`` and set aside
+        a month at a time (see MonthSpill). If the import stops part way,
+        the months already written keep their new checksums and the next
+        --incremental run picks up the rest. Returns the number of months
+        written.
+        """
+        started = time.perf_counter()
+        for _ in rows:
+            pass
+        months = checksums.checksums()
+
+        generation = current_generation()
+        stored = {m.month_index: m for m in ImportedMonth.objects.all()}
+        changed = sorted(
+            month for month, (_, _, checksum) in months.items()
+            if month not in stored or stored[month].checksum != checksum
+        )
+        removed = sorted(set(stored) - set(months))
+        self.stdout.write(
+            f'{len(months) - len(changed)} months unchanged, {len(changed)} to import, '
+            f'{len(removed)} to remove'
+        )
+        if not changed and not removed:
+            return 0
+
+        inserted = 0
+        written = 0
+        try:
+            with MonthSpill(changed, batch_size, dir=settings.DATA_DIR) as spill:
+                spill.add(reread())
+                for month in changed:
+                    month_year, count, checksum = months[month]
+                    with transaction.atomic():
+                        CrimeRecord.objects.filter(month_index=month).delete()
+                        ImportedMonth.objects.filter(month_index=month).delete()
+                        records = record_rows(spill.rows(month), generation, batch_size)
+                        inserted += insert_rows(
+                            CrimeRecord, RECORD_FIELDS, records, batch_size=batch_size,
+                        )
+                        rebuild_rollups(months=[month])
+                        ImportedMonth.objects.create(
+                            generation=generation, month_index=month, month_year=month_year,
+                            row_count=count, checksum=checksum,
+                        )
+                    written += 1
+                    status = 'changed' if month in stored else 'new'
+                    self.stdout.write(f'  → {month_year}: {status}, {count} rows')
+
+            for month in removed:
+                with transaction.atomic():
+                    CrimeRecord.objects.filter(month_index=month).delete()
+                    ImportedMonth.objects.filter(month_index=month).delete()
+                    rebuild_rollups(months=[month])
+                written += 1
+                self.stdout.write(f'  → {stored[month].month_year}: removed')
+        except BaseException:
+            if written:
+                # The months already committed are live: do not leave them
+                # behind rankings and cached responses of the old data
+                rebuild_rankings()
+                bump_version()
+            raise
+
+        # Every window ends at the latest month, so rank afresh
+        rebuild_rankings()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully imported {inserted} crime records in {len(changed)} months, '
+            f'removed {len(removed)} months ({elapsed:.1f}s).'
+        ))
+        self._report_stages(elapsed)
+        return len(changed) + len(removed)
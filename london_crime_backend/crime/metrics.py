@@ -0,0 +1,384 @@
+"""
+Prometheus metrics for the crime API, shared by every worker process.
+
+Each process adds to its own memory-mapped file in CRIME_METRICS_DIR
+(named after its pid and start time), so recording a value is a few in-place writes with
+no locking between processes. ``/metrics/`` sums the files of all
+processes at scrape time and renders the text exposition format, so
+whichever gunicorn worker answers the scrape reports the totals of all of
+them. Only staff users and scrapers with CRIME_METRICS_TOKEN may read it
+(see ``scrape_allowed``).
+
+A process folds its file into ``archive.json`` when it exits, keeping
+counters and histograms monotonic across worker restarts; its gauges
+(requests in flight) are dropped. Each process holds a lock on its file
+while it runs, so the file of one that died without cleaning up is
+recognised by the next scrape and folded in the same way, however the pid
+is reused.
+
+The dataset gauges are read from the dataset stamp (crime/dataset.py),
+where import_crime_data records the version and how long the import took.
+"""
+import atexit
+import bisect
+import hmac
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.files import locks
+
+from .dataset import dataset_state
+
+
+ARCHIVE_FILENAME = 'archive.json'
+LOCK_FILENAME = '.lock'
+
+# Latency buckets in seconds (the Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+INITIAL_FILE_SIZE = 64 * 1024
+
+# Layout of a value file: the number of bytes in use, then entries of a key
+# length, the UTF-8 key padded to 8 bytes and the value as a double. The
+# used size is written last, so a reader never sees a half-written entry.
+_USED = struct.Struct('q')
+_LENGTH = struct.Struct('i')
+_VALUE = struct.Struct('d')
+
+
+def _entries(data, used):
+    """(key, value offset, value) of each entry in a value file's bytes."""
+    position = _USED.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        start = position + _LENGTH.size
+        key = bytes(data[start:start + length]).decode('utf-8')
+        position += -(-(_LENGTH.size + length) // 8) * 8
+        yield key, position, _VALUE.unpack_from(data, position)[0]
+        position += _VALUE.size
+
+
+class _ValueFile:
+    """Values by key in a memory-mapped file, written by one process."""
+
+    def __init__(self, path):
+        # Lock under a temporary name, so a scrape never takes the new file
+        # for the file of a process that has exited
+        pending = path.with_name(f'.{path.name}')
+        self.file = open(pending, 'a+b')
+        locks.lock(self.file, locks.LOCK_EX)
+        os.replace(pending, path)
+        self.path = path
+        size = os.fstat(self.file.fileno()).st_size
+        if size < INITIAL_FILE_SIZE:
+            self.file.truncate(INITIAL_FILE_SIZE)
+            size = INITIAL_FILE_SIZE
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.used = _USED.unpack_from(self.map, 0)[0] or _USED.size
+        self.positions = {key: position for key, position, _ in _entries(self.map, self.used)}
+        self.lock = threading.Lock()
+
+    def _append(self, key):
+        encoded = key.encode('utf-8')
+        padded = -(-(_LENGTH.size + len(encoded)) // 8) * 8
+        end = self.used + padded + _VALUE.size
+        if end > len(self.map):
+            size = max(end, 2 * len(self.map))
+            self.file.truncate(size)
+            self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), size)
+        _LENGTH.pack_into(self.map, self.used, len(encoded))
+        start = self.used + _LENGTH.size
+        self.map[start:start + len(encoded)] = encoded
+        _VALUE.pack_into(self.map, self.used + padded, 0.0)
+        self.positions[key] = self.used + padded
+        self.used = end
+        _USED.pack_into(self.map, 0, end)
+        return self.positions[key]
+
+    def add(self, key, amount):
+        with self.lock:
+            position = self.positions.get(key)
+            if position is None:
+                position = self._append(key)
+            value = _VALUE.unpack_from(self.map, position)[0]
+            _VALUE.pack_into(self.map, position, value + amount)
+
+    def close(self):
+        """Release the file, leaving it to be folded into the archive."""
+        with self.lock:
+            self.map.close()
+            locks.unlock(self.file)
+            self.file.close()
+
+
+def _read_values(path):
+    """{key: value} of a value file written by any process."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _USED.size:
+        return {}
+    used = min(_USED.unpack_from(data, 0)[0], len(data))
+    return {key: value for key, _, value in _entries(data, used)}
+
+
+_process_file = None  # (pid, _ValueFile) of this process
+_process_file_lock = threading.Lock()
+
+
+def _values():
+    """This process's value file, opened afresh after a fork."""
+    global _process_file
+    pid = os.getpid()
+    if _process_file is None or _process_file[0] != pid:
+        with _process_file_lock:
+            if _process_file is None or _process_file[0] != pid:
+                directory = settings.CRIME_METRICS_DIR
+                directory.mkdir(parents=True, exist_ok=True)
+                path = directory / f'{pid}-{time.time_ns()}.db'
+                _process_file = (pid, _ValueFile(path))
+                atexit.register(_archive_process_file, pid)
+    return _process_file[1]
+
+
+def _archive_process_file(pid):
+    """At exit, fold this process's value file into the archive."""
+    global _process_file
+    with _process_file_lock:
+        if _process_file is None or _process_file[0] != pid or pid != os.getpid():
+            return
+        _process_file[1].close()
+        _process_file = None
+    collect()
+
+
+def _key(sample, labels):
+    return json.dumps([sample, sorted(labels.items())], separators=(',', ':'))
+
+
+def _format_labels(labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == int(value) and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+METRICS = {}
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        METRICS[name] = self
+
+    def _add(self, sample, labels, amount):
+        if settings.CRIME_METRICS:
+            _values().add(_key(sample, labels), amount)
+
+    def samples(self, values):
+        """Exposition lines for the (labels, value) pairs of each sample name."""
+        return [
+            f'{self.name}{_format_labels(labels)} {_format_value(value)}'
+            for labels, value in sorted(values.get(self.name, ()))
+        ]
+
+    def render(self, values):
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+            *self.samples(values),
+        ]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self._add(self.name, labels, amount)
+
+
+class Gauge(Metric):
+    """A gauge summed over the live processes (values of exited ones are dropped)."""
+
+    type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        self._add(self.name, labels, amount)
+
+    def dec(self, amount=1, **labels):
+        self._add(self.name, labels, -amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        # Buckets are stored per interval and made cumulative when rendered
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self._add(f'{self.name}_bucket', {**labels, 'le': repr(self.buckets[index])}, 1)
+        self._add(f'{self.name}_sum', labels, value)
+        self._add(f'{self.name}_count', labels, 1)
+
+    def samples(self, values):
+        buckets = {}
+        for labels, value in values.get(f'{self.name}_bucket', ()):
+            le = dict(labels)['le']
+            series = tuple(label for label in labels if label[0] != 'le')
+            buckets.setdefault(series, {})[le] = value
+        sums = dict(values.get(f'{self.name}_sum', ()))
+        lines = []
+        for labels, count in sorted(values.get(f'{self.name}_count', ())):
+            labels = tuple(labels)
+            cumulative = 0
+            for bound in self.buckets:
+                cumulative += buckets.get(labels, {}).get(repr(bound), 0)
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(labels + (("le", repr(bound)),))} '
+                    f'{_format_value(cumulative)}'
+                )
+            lines.append(
+                f'{self.name}_bucket{_format_labels(labels + (("le", "+Inf"),))} '
+                f'{_format_value(count)}'
+            )
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(sums.get(labels, 0))}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {_format_value(count)}')
+        return lines
+
+
+REQUESTS = Counter('crime_http_requests_total', 'Requests to the crime API.')
+REQUEST_SECONDS = Histogram(
+    'crime_http_request_duration_seconds', 'Time to serve a crime API request.',
+)
+IN_FLIGHT = Gauge('crime_http_requests_in_flight', 'Crime API requests being served.')
+DB_QUERIES = Counter('crime_db_queries_total', 'SQL queries run by crime API requests.')
+DB_SECONDS = Counter(
+    'crime_db_query_seconds_total', 'Time crime API requests spent in SQL queries.',
+)
+RESPONSE_CACHE = Counter(
+    'crime_response_cache_requests_total', 'Response cache lookups, by result (hit or miss).',
+)
+
+
+def observe_request(view, method, status, timing):
+    """Record a served request; ``timing`` is its crime.middleware.RequestTiming."""
+    REQUESTS.inc(view=view, method=method, status=str(status))
+    REQUEST_SECONDS.observe(timing.total, view=view)
+    DB_QUERIES.inc(timing.queries, view=view)
+    DB_SECONDS.inc(timing.db, view=view)
+
+
+def _exited(path):
+    """Whether the process that wrote the value file at ``path`` let go of it."""
+    with open(path, 'rb') as f:
+        if not locks.lock(f, locks.LOCK_EX | locks.LOCK_NB):
+            return False
+        locks.unlock(f)
+    return True
+
+
+def _is_gauge(key):
+    metric = METRICS.get(json.loads(key)[0])
+    return metric is not None and metric.type == 'gauge'
+
+
+def collect():
+    """
+    {key: value} summed over every process's value file, folding the
+    files of exited processes into the archive.
+    """
+    directory = settings.CRIME_METRICS_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    archive_path = directory / ARCHIVE_FILENAME
+    with open(directory / LOCK_FILENAME, 'a+b') as lock:
+        locks.lock(lock, locks.LOCK_EX)
+        try:
+            try:
+                with open(archive_path, encoding='utf-8') as f:
+                    archive = json.load(f)
+            except FileNotFoundError:
+                archive = {}
+            totals = dict(archive)
+            exited = []
+            for path in directory.glob('*.db'):
+                alive = not _exited(path)
+                for key, value in _read_values(path).items():
+                    if not alive:
+                        if _is_gauge(key):
+                            continue
+                        archive[key] = archive.get(key, 0) + value
+                    totals[key] = totals.get(key, 0) + value
+                if not alive:
+                    exited.append(path)
+            if exited:
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.archive')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(archive, f)
+                os.replace(tmp_path, archive_path)
+                for path in exited:
+                    path.unlink()
+        finally:
+            locks.unlock(lock)
+    return totals
+
+
+def scrape_allowed(request):
+    """
+    True when ``request`` may read the metrics: it carries the bearer token
+    CRIME_METRICS_TOKEN (when one is set), or comes from a staff user.
+    """
+    token = settings.CRIME_METRICS_TOKEN
+    if token:
+        scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(given.strip().encode(), token.encode()):
+            return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+def exposition():
+    """The metrics in the Prometheus text exposition format."""
+    values = {}
+    for key, value in collect().items():
+        sample, labels = json.loads(key)
+        values.setdefault(sample, []).append((tuple(tuple(label) for label in labels), value))
+
+    lines = []
+    for metric in METRICS.values():
+        lines += metric.render(values)
+
+    state = dataset_state()
+    for name, documentation, value in (
+        ('crime_dataset_version', 'Version of the live dataset.', state['version']),
+        ('crime_dataset_imported_timestamp_seconds', 'When the live dataset was imported.',
+         state['imported_at']),
+        ('crime_import_duration_seconds', 'How long the import of the live dataset took.',
+         state.get('import_seconds')),
+    ):
+        if value is not None:
+            lines += [
+                f'# HELP {name} {documentation}',
+                f'# TYPE {name} gauge',
+                f'{name} {_format_value(value)}',
+            ]
+    return '\n'.join(lines) + '\n'
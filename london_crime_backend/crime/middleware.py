@@ -0,0 +1,201 @@
+"""
+Per-request timing for the crime API.
+
+RequestTimingMiddleware measures every request served by a crime view:
+
+- db: number of SQL queries and the time spent executing them and
+  fetching their rows, through ``connection.execute_wrapper``
+- serialize: time in DRF serializers' ``.data`` (serializers deriving
+  from crime.serializers.TimedSerializer); a queryset handed to a
+  serializer runs its query here, so that time is in db as well
+- render: time turning the response data into JSON
+- total: the whole request, middleware below this one included
+
+The figures are sent in a Server-Timing header, which browser dev tools
+show alongside the request, and logged as one key=value line per request
+at INFO on the 'crime.timing' logger (also attached to the record as
+``timing`` for structured log handlers). The logger is at WARNING unless
+CRIME_TIMING_LOG_LEVEL=INFO turns the lines on:
+
+    view=dashboard method=GET status=200 total_ms=41.20 db_ms=30.10 queries=2 serialize_ms=1.30 render_ms=2.00
+
+The same figures feed the Prometheus metrics served at /metrics/ (see
+crime/metrics.py), along with the number of crime view requests in flight.
+
+The cost is a few perf_counter() calls per request and per query, so it
+is meant to stay on in production; CRIME_REQUEST_TIMING turns off the
+header and log line, CRIME_METRICS the metrics.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics
+
+
+logger = logging.getLogger('crime.timing')
+
+_current = ContextVar('crime_request_timing', default=None)
+
+# Cursor methods whose time counts as database time
+FETCH_METHODS = ('fetchone', 'fetchmany', 'fetchall')
+
+
+class RequestTiming:
+    """
+    Timings of one request, in seconds. Installed as the connection's
+    execute wrapper, it counts and times every query.
+    """
+
+    __slots__ = ('queries', 'db', 'serialize', 'render', 'total')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+            self._time_fetches(context['cursor'])
+
+    def _time_fetches(self, cursor):
+        # SQLite produces rows as they are fetched, so most of a large
+        # SELECT runs after execute() returns: time the fetches too
+        if '_timed_fetches' in vars(cursor):
+            return
+        cursor._timed_fetches = True
+        for name in FETCH_METHODS:
+            setattr(cursor, name, self._timed(getattr(cursor, name)))
+
+    def _timed(self, fetch):
+        def timed_fetch(*args):
+            started = time.perf_counter()
+            try:
+                return fetch(*args)
+            finally:
+                self.db += time.perf_counter() - started
+        return timed_fetch
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 2),
+            'db_ms': round(self.db * 1000, 2),
+            'queries': self.queries,
+            'serialize_ms': round(self.serialize * 1000, 2),
+            'render_ms': round(self.render * 1000, 2),
+        }
+
+    def header(self):
+        """The Server-Timing header value."""
+        return (
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serialize * 1000:.2f}, '
+            f'render;dur={self.render * 1000:.2f}, '
+            f'total;dur={self.total * 1000:.2f}'
+        )
+
+
+def current_timing():
+    """The RequestTiming of the request being served, or None."""
+    return _current.get()
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to ``phase`` of the current request."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timing, phase, getattr(timing, phase) + time.perf_counter() - started)
+
+
+def _is_crime_view(request):
+    match = request.resolver_match
+    return match is not None and match.func.__module__.startswith('crime.')
+
+
+class RequestTimingMiddleware:
+    """
+    Times requests to crime views (see the module docstring). Place it
+    near the top of MIDDLEWARE so ``total`` covers the middleware below.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.CRIME_REQUEST_TIMING or settings.CRIME_METRICS):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timing):
+                response = self.get_response(request)
+        finally:
+            timing.total = time.perf_counter() - started
+            if getattr(request, 'crime_in_flight', False):
+                metrics.IN_FLIGHT.dec()
+            _current.reset(token)
+
+        if not _is_crime_view(request):
+            return response
+        view = request.resolver_match.url_name
+        metrics.observe_request(view, request.method, response.status_code, timing)
+        if not settings.CRIME_REQUEST_TIMING:
+            return response
+        response['Server-Timing'] = timing.header()
+        # Let pages on other origins (the frontend) read the header
+        response['Timing-Allow-Origin'] = '*'
+        if logger.isEnabledFor(logging.INFO):
+            values = timing.as_dict()
+            logger.info(
+                'view=%s method=%s status=%s %s',
+                view, request.method, response.status_code,
+                ' '.join(f'{key}={value}' for key, value in values.items()),
+                extra={'timing': {
+                    'view': view,
+                    'method': request.method,
+                    'status': response.status_code,
+                    **values,
+                }},
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Only now is the view known: count crime views, not admin pages,
+        # static files or 404s, as in flight
+        if _is_crime_view(request):
+            metrics.IN_FLIGHT.inc()
+            request.crime_in_flight = True
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook; the render time runs
+        # from here to the post-render callback (which comes after the
+        # response cache's, so storing the entry counts as rendering)
+        timing = _current.get()
+        if timing is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timing.render += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
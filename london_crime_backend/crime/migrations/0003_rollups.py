@@ -0,0 +1,91 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:46
+
+from django.db import migrations, models
+
+
+ROLLUP_DIMENSIONS = {
+    'MonthOffenceGroupRollup': ('month_year', 'area_type', 'offence_group'),
+    'MonthBoroughRollup': ('month_year', 'area_type', 'area_name'),
+    'MonthOffenceSubgroupRollup': ('month_year', 'area_type', 'offence_group', 'offence_subgroup'),
+    'MonthBoroughOffenceGroupRollup': ('month_year', 'area_type', 'area_name', 'offence_group'),
+}
+
+
+def build_rollups(apps, schema_editor):
+    """Populate the new rollups from any data already imported."""
+    qn = schema_editor.connection.ops.quote_name
+    source = qn(apps.get_model('crime', 'CrimeRecord')._meta.db_table)
+    with schema_editor.connection.cursor() as cursor:
+        for name, dimensions in ROLLUP_DIMENSIONS.items():
+            table = qn(apps.get_model('crime', name)._meta.db_table)
+            columns = ', '.join(qn(field) for field in dimensions)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}, {qn("count")}) '
+                f'SELECT {columns}, SUM({qn("count")}) FROM {source} '
+                f'GROUP BY {columns}'
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crime', '0002_remove_crimerecord_area_code_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthOffenceSubgroupRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_year', models.CharField(max_length=20)),
+                ('area_type', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('offence_group', models.CharField(max_length=150)),
+                ('offence_subgroup', models.CharField(blank=True, default='', max_length=200)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month_year', 'offence_group'], name='crime_month_month_y_540cc9_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthOffenceGroupRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_year', models.CharField(max_length=20)),
+                ('area_type', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('offence_group', models.CharField(max_length=150)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month_year', 'offence_group'], name='crime_month_month_y_4b88b0_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthBoroughRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_year', models.CharField(max_length=20)),
+                ('area_type', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('area_name', models.CharField(max_length=150)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month_year', 'area_name'], name='crime_month_month_y_b6d09a_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthBoroughOffenceGroupRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_year', models.CharField(max_length=20)),
+                ('area_type', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('area_name', models.CharField(max_length=150)),
+                ('offence_group', models.CharField(max_length=150)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month_year', 'area_name'], name='crime_month_month_y_9a2927_idx'), models.Index(fields=['month_year', 'offence_group'], name='crime_month_month_y_6a6523_idx')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:57
+
+from django.db import migrations, models
+from django.db.models.functions import Cast, Substr
+
+
+MODELS = [
+    'CrimeRecord',
+    'MonthOffenceGroupRollup',
+    'MonthBoroughRollup',
+    'MonthOffenceSubgroupRollup',
+    'MonthBoroughOffenceGroupRollup',
+]
+
+
+def fill_month_index(apps, schema_editor):
+    """Derive month_index from the YYYY-MM prefix of existing month_year values."""
+    year = Cast(Substr('month_year', 1, 4), models.IntegerField())
+    month = Cast(Substr('month_year', 6, 2), models.IntegerField())
+    for name in MODELS:
+        apps.get_model('crime', name).objects.update(month_index=year * 12 + month - 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crime', '0003_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='crimerecord',
+            name='crime_crime_month_y_bc3641_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='crimerecord',
+            name='crime_crime_month_y_8d56c8_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthboroughoffencegrouprollup',
+            name='crime_month_month_y_9a2927_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthboroughoffencegrouprollup',
+            name='crime_month_month_y_6a6523_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthboroughrollup',
+            name='crime_month_month_y_b6d09a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthoffencegrouprollup',
+            name='crime_month_month_y_4b88b0_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthoffencesubgrouprollup',
+            name='crime_month_month_y_540cc9_idx',
+        ),
+        migrations.AddField(
+            model_name='crimerecord',
+            name='month_index',
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthboroughoffencegrouprollup',
+            name='month_index',
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthboroughrollup',
+            name='month_index',
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthoffencegrouprollup',
+            name='month_index',
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthoffencesubgrouprollup',
+            name='month_index',
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_month_index, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='crimerecord',
+            name='month_year',
+            field=models.CharField(max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='crimerecord',
+            index=models.Index(fields=['month_index', 'area_name'], name='crime_crime_month_i_05cecb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crimerecord',
+            index=models.Index(fields=['month_index', 'offence_group'], name='crime_crime_month_i_d7933c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthboroughoffencegrouprollup',
+            index=models.Index(fields=['month_index', 'area_name'], name='crime_month_month_i_f47610_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthboroughoffencegrouprollup',
+            index=models.Index(fields=['month_index', 'offence_group'], name='crime_month_month_i_4e2843_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthboroughrollup',
+            index=models.Index(fields=['month_index', 'area_name'], name='crime_month_month_i_dbf554_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthoffencegrouprollup',
+            index=models.Index(fields=['month_index', 'offence_group'], name='crime_month_month_i_3df779_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthoffencesubgrouprollup',
+            index=models.Index(fields=['month_index', 'offence_group'], name='crime_month_month_i_f8b3f7_idx'),
+        ),
+    ]
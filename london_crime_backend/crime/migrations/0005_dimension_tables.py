@@ -0,0 +1,293 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:31
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+# Old text column -> (new foreign key, dimension model)
+RECORD_DIMENSIONS = {
+    'area_name_text': ('area', 'Area'),
+    'offence_group_text': ('offence_group', 'OffenceGroup'),
+    'offence_subgroup_text': ('offence_subgroup', 'OffenceSubgroup'),
+}
+
+ROLLUP_DIMENSIONS = {
+    'MonthOffenceGroupRollup': ('month_index', 'month_year', 'area_type', 'offence_group_id'),
+    'MonthBoroughRollup': ('month_index', 'month_year', 'area_type', 'area_id'),
+    'MonthOffenceSubgroupRollup': ('month_index', 'month_year', 'area_type', 'offence_group_id', 'offence_subgroup_id'),
+    'MonthBoroughOffenceGroupRollup': ('month_index', 'month_year', 'area_type', 'area_id', 'offence_group_id'),
+}
+
+
+def fill_dimensions(apps, schema_editor):
+    """Move the distinct names into the dimension tables and point rows at them."""
+    CrimeRecord = apps.get_model('crime', 'CrimeRecord')
+    for column, (field, model_name) in RECORD_DIMENSIONS.items():
+        model = apps.get_model('crime', model_name)
+        names = CrimeRecord.objects.values_list(column, flat=True).distinct()
+        model.objects.bulk_create([model(name=name) for name in sorted(names)])
+        CrimeRecord.objects.update(**{
+            field: Subquery(model.objects.filter(name=OuterRef(column)).values('pk')[:1])
+        })
+
+
+def clear_rollups(apps, schema_editor):
+    """The rollups are rebuilt with the new columns at the end."""
+    for name in ROLLUP_DIMENSIONS:
+        apps.get_model('crime', name).objects.all().delete()
+
+
+def build_rollups(apps, schema_editor):
+    qn = schema_editor.connection.ops.quote_name
+    source = qn(apps.get_model('crime', 'CrimeRecord')._meta.db_table)
+    with schema_editor.connection.cursor() as cursor:
+        for name, dimensions in ROLLUP_DIMENSIONS.items():
+            table = qn(apps.get_model('crime', name)._meta.db_table)
+            columns = ', '.join(qn(column) for column in dimensions)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}, {qn("count")}) '
+                f'SELECT {columns}, SUM({qn("count")}) FROM {source} '
+                f'GROUP BY {columns}'
+            )
+
+
+def rollup_foreign_key(model_name):
+    return models.ForeignKey(
+        db_index=False,
+        default=0,
+        on_delete=django.db.models.deletion.PROTECT,
+        related_name='+',
+        to=f'crime.{model_name}',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crime', '0004_month_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Area',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='OffenceGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='OffenceSubgroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+
+        # Indexes on the text columns
+        migrations.RemoveIndex(
+            model_name='crimerecord',
+            name='crime_crime_month_i_05cecb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='crimerecord',
+            name='crime_crime_month_i_d7933c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='crimerecord',
+            name='crime_crime_area_na_fec598_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthboroughoffencegrouprollup',
+            name='crime_month_month_i_f47610_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthboroughoffencegrouprollup',
+            name='crime_month_month_i_4e2843_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthboroughrollup',
+            name='crime_month_month_i_dbf554_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthoffencegrouprollup',
+            name='crime_month_month_i_3df779_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthoffencesubgrouprollup',
+            name='crime_month_month_i_f8b3f7_idx',
+        ),
+
+        # CrimeRecord: text columns -> foreign keys
+        migrations.RenameField(
+            model_name='crimerecord',
+            old_name='area_name',
+            new_name='area_name_text',
+        ),
+        migrations.RenameField(
+            model_name='crimerecord',
+            old_name='offence_group',
+            new_name='offence_group_text',
+        ),
+        migrations.RenameField(
+            model_name='crimerecord',
+            old_name='offence_subgroup',
+            new_name='offence_subgroup_text',
+        ),
+        migrations.AddField(
+            model_name='crimerecord',
+            name='area',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='crime.area'),
+        ),
+        migrations.AddField(
+            model_name='crimerecord',
+            name='offence_group',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='crime.offencegroup'),
+        ),
+        migrations.AddField(
+            model_name='crimerecord',
+            name='offence_subgroup',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='crime.offencesubgroup'),
+        ),
+        migrations.RunPython(fill_dimensions, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='crimerecord',
+            name='area_name_text',
+        ),
+        migrations.RemoveField(
+            model_name='crimerecord',
+            name='offence_group_text',
+        ),
+        migrations.RemoveField(
+            model_name='crimerecord',
+            name='offence_subgroup_text',
+        ),
+        migrations.AlterField(
+            model_name='crimerecord',
+            name='area',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='crime.area'),
+        ),
+        migrations.AlterField(
+            model_name='crimerecord',
+            name='offence_group',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='crime.offencegroup'),
+        ),
+        migrations.AlterField(
+            model_name='crimerecord',
+            name='offence_subgroup',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='crime.offencesubgroup'),
+        ),
+
+        # Rollups: emptied, re-keyed, then rebuilt from CrimeRecord
+        migrations.RunPython(clear_rollups, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='monthoffencegrouprollup',
+            name='offence_group',
+        ),
+        migrations.RemoveField(
+            model_name='monthboroughrollup',
+            name='area_name',
+        ),
+        migrations.RemoveField(
+            model_name='monthoffencesubgrouprollup',
+            name='offence_group',
+        ),
+        migrations.RemoveField(
+            model_name='monthoffencesubgrouprollup',
+            name='offence_subgroup',
+        ),
+        migrations.RemoveField(
+            model_name='monthboroughoffencegrouprollup',
+            name='area_name',
+        ),
+        migrations.RemoveField(
+            model_name='monthboroughoffencegrouprollup',
+            name='offence_group',
+        ),
+        migrations.AddField(
+            model_name='monthoffencegrouprollup',
+            name='offence_group',
+            field=rollup_foreign_key('offencegroup'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthboroughrollup',
+            name='area',
+            field=rollup_foreign_key('area'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthoffencesubgrouprollup',
+            name='offence_group',
+            field=rollup_foreign_key('offencegroup'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthoffencesubgrouprollup',
+            name='offence_subgroup',
+            field=rollup_foreign_key('offencesubgroup'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthboroughoffencegrouprollup',
+            name='area',
+            field=rollup_foreign_key('area'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthboroughoffencegrouprollup',
+            name='offence_group',
+            field=rollup_foreign_key('offencegroup'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+
+        migrations.AddIndex(
+            model_name='crimerecord',
+            index=models.Index(fields=['month_index', 'area'], name='crime_crime_month_i_bc3785_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crimerecord',
+            index=models.Index(fields=['month_index', 'offence_group'], name='crime_crime_month_i_f55b6c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crimerecord',
+            index=models.Index(fields=['area', 'offence_group'], name='crime_crime_area_id_8b1f41_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthoffencegrouprollup',
+            index=models.Index(fields=['month_index', 'offence_group'], name='crime_month_month_i_f805aa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthboroughrollup',
+            index=models.Index(fields=['month_index', 'area'], name='crime_month_month_i_cc4f32_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthoffencesubgrouprollup',
+            index=models.Index(fields=['month_index', 'offence_group'], name='crime_month_month_i_8e69e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthboroughoffencegrouprollup',
+            index=models.Index(fields=['month_index', 'area'], name='crime_month_month_i_7c7b26_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthboroughoffencegrouprollup',
+            index=models.Index(fields=['month_index', 'offence_group'], name='crime_month_month_i_bf4fe2_idx'),
+        ),
+    ]
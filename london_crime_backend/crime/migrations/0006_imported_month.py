@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crime', '0005_dimension_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month_index', models.IntegerField(unique=True)),
+                ('month_year', models.CharField(max_length=20)),
+                ('row_count', models.IntegerField()),
+                ('checksum', models.CharField(max_length=64)),
+            ],
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crime', '0006_imported_month'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generation', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='crimerecord',
+            name='crime_crime_month_i_bc3785_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='crimerecord',
+            name='crime_crime_month_i_f55b6c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='crimerecord',
+            name='crime_crime_area_id_8b1f41_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthboroughoffencegrouprollup',
+            name='crime_month_month_i_7c7b26_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthboroughoffencegrouprollup',
+            name='crime_month_month_i_bf4fe2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthboroughrollup',
+            name='crime_month_month_i_cc4f32_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthoffencegrouprollup',
+            name='crime_month_month_i_f805aa_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='monthoffencesubgrouprollup',
+            name='crime_month_month_i_8e69e5_idx',
+        ),
+        migrations.AddField(
+            model_name='crimerecord',
+            name='generation',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importedmonth',
+            name='generation',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthboroughoffencegrouprollup',
+            name='generation',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthboroughrollup',
+            name='generation',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthoffencegrouprollup',
+            name='generation',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthoffencesubgrouprollup',
+            name='generation',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='importedmonth',
+            name='month_index',
+            field=models.IntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name='crimerecord',
+            index=models.Index(fields=['generation', 'month_index', 'area'], name='crime_crime_generat_395cb3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crimerecord',
+            index=models.Index(fields=['generation', 'month_index', 'offence_group'], name='crime_crime_generat_734ebb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='crimerecord',
+            index=models.Index(fields=['generation', 'area', 'offence_group'], name='crime_crime_generat_c3354e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthboroughoffencegrouprollup',
+            index=models.Index(fields=['generation', 'month_index', 'area'], name='crime_month_generat_933d4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthboroughoffencegrouprollup',
+            index=models.Index(fields=['generation', 'month_index', 'offence_group'], name='crime_month_generat_c12eb6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthboroughrollup',
+            index=models.Index(fields=['generation', 'month_index', 'area'], name='crime_month_generat_515ee2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthoffencegrouprollup',
+            index=models.Index(fields=['generation', 'month_index', 'offence_group'], name='crime_month_generat_e60497_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthoffencesubgrouprollup',
+            index=models.Index(fields=['generation', 'month_index', 'offence_group'], name='crime_month_generat_dd9790_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='importedmonth',
+            constraint=models.UniqueConstraint(fields=('generation', 'month_index'), name='crime_imported_month_unique'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crime', '0007_data_generations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoroughRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generation', models.IntegerField(default=0)),
+                ('window', models.IntegerField()),
+                ('rank', models.IntegerField()),
+                ('total_count', models.IntegerField()),
+                ('first_month', models.CharField(max_length=20)),
+                ('last_month', models.CharField(max_length=20)),
+                ('area', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='crime.area')),
+                ('offence_group', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='crime.offencegroup')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['generation', 'window', 'offence_group', 'rank'], name='crime_borou_generat_ec756c_idx')],
+            },
+        ),
+    ]
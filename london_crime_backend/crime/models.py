@@ -1,24 +1,224 @@
 from django.db import models
 
+from .dataset import current_generation
+
+
+class LiveGenerationManager(models.Manager):
+    """
+    Default manager of the generation-stamped tables: only rows of the live
+    generation, i.e. the last published import (see crime/generations.py).
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(generation=current_generation())
+
+
+class Dimension(models.Model):
+    """
+    A distinct name referenced by CrimeRecord and the rollups through a
+    small integer key, so the fact tables and their indexes hold integers
+    instead of repeating the strings. Populated by import_crime_data.
+    """
+    name = models.CharField(max_length=200, unique=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.name
+
+
+class Area(Dimension):
+    """A borough or ward name (Area name column)."""
+
+
+class OffenceGroup(Dimension):
+    """An offence group name, title-cased."""
+
+
+class OffenceSubgroup(Dimension):
+    """An offence subgroup name, title-cased ('' when missing)."""
+
 
 class CrimeRecord(models.Model):
     """
     Represents a single row from the MPS Monthly Crime Dashboard Excel data.
     Only stores the fields actively used by the dashboard.
     """
-    month_year = models.CharField(max_length=20, db_index=True)
+    # Import that wrote the row; see crime/generations.py
+    generation = models.IntegerField(default=0)
+    month_year = models.CharField(max_length=20)
+    # year * 12 + (month - 1); see crime/months.py
+    month_index = models.IntegerField()
     area_type = models.CharField(max_length=50, blank=True, default='')
-    area_name = models.CharField(max_length=150, db_index=True)
-    offence_group = models.CharField(max_length=150, db_index=True)
-    offence_subgroup = models.CharField(max_length=200, blank=True, default='')
+    area = models.ForeignKey(Area, on_delete=models.PROTECT, db_index=False)
+    offence_group = models.ForeignKey(OffenceGroup, on_delete=models.PROTECT)
+    offence_subgroup = models.ForeignKey(
+        OffenceSubgroup, on_delete=models.PROTECT, db_index=False
+    )
     count = models.IntegerField(default=0)
 
+    objects = LiveGenerationManager()
+    all_generations = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['generation', 'month_index', 'area']),
+            models.Index(fields=['generation', 'month_index', 'offence_group']),
+            models.Index(fields=['generation', 'area', 'offence_group']),
+        ]
+
+    def __str__(self):
+        return f"{self.month_year} | {self.area} | {self.offence_group}: {self.count}"
+
+
+class ImportedMonth(models.Model):
+    """
+    Checksum of the source rows imported for one month, so that
+    ``import_crime_data --incremental`` only rewrites months that changed.
+    """
+    generation = models.IntegerField(default=0)
+    month_index = models.IntegerField()
+    month_year = models.CharField(max_length=20)
+    row_count = models.IntegerField()
+    checksum = models.CharField(max_length=64)
+
+    objects = LiveGenerationManager()
+    all_generations = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['generation', 'month_index'], name='crime_imported_month_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month_year}: {self.row_count} rows"
+
+
+class LiveGeneration(models.Model):
+    """
+    The data generation readers see, in a single row. A full import sets it
+    in the transaction that writes the generation's rows, so the rows and
+    the pointer to them commit together (see crime/generations.py).
+    """
+    generation = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Generation {self.generation}"
+
+
+class Rollup(models.Model):
+    """
+    Pre-aggregated SUM(count) of CrimeRecord over a subset of its columns.
+
+    Rollups keep CrimeRecord's column names (including the dimension
+    foreign keys) so the same filters can be applied to either. They are
+    rebuilt by import_crime_data (see crime/rollups.py); ``dimensions``
+    lists the columns a rollup keeps besides the generation.
+    """
+    dimensions = ()
+
+    generation = models.IntegerField(default=0)
+    month_year = models.CharField(max_length=20)
+    month_index = models.IntegerField()
+    area_type = models.CharField(max_length=50, blank=True, default='')
+    count = models.IntegerField(default=0)
+
+    objects = LiveGenerationManager()
+    all_generations = models.Manager()
+
+    class Meta:
+        abstract = True
+
+
+class MonthOffenceGroupRollup(Rollup):
+    dimensions = ('month_index', 'month_year', 'area_type', 'offence_group')
+
+    offence_group = models.ForeignKey(
+        OffenceGroup, on_delete=models.PROTECT, db_index=False, related_name='+'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['generation', 'month_index', 'offence_group']),
+        ]
+
+
+class MonthBoroughRollup(Rollup):
+    dimensions = ('month_index', 'month_year', 'area_type', 'area')
+
+    area = models.ForeignKey(
+        Area, on_delete=models.PROTECT, db_index=False, related_name='+'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['generation', 'month_index', 'area']),
+        ]
+
+
+class MonthOffenceSubgroupRollup(Rollup):
+    dimensions = ('month_index', 'month_year', 'area_type', 'offence_group', 'offence_subgroup')
+
+    offence_group = models.ForeignKey(
+        OffenceGroup, on_delete=models.PROTECT, db_index=False, related_name='+'
+    )
+    offence_subgroup = models.ForeignKey(
+        OffenceSubgroup, on_delete=models.PROTECT, db_index=False, related_name='+'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['generation', 'month_index', 'offence_group']),
+        ]
+
+
+class MonthBoroughOffenceGroupRollup(Rollup):
+    dimensions = ('month_index', 'month_year', 'area_type', 'area', 'offence_group')
+
+    area = models.ForeignKey(
+        Area, on_delete=models.PROTECT, db_index=False, related_name='+'
+    )
+    offence_group = models.ForeignKey(
+        OffenceGroup, on_delete=models.PROTECT, db_index=False, related_name='+'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['generation', 'month_index', 'area']),
+            models.Index(fields=['generation', 'month_index', 'offence_group']),
+        ]
+
+
+class BoroughRanking(models.Model):
+    """
+    One borough's place in a precomputed ranking: boroughs by crime over
+    the latest ``window`` months, for one offence group (null for all
+    crime). Rebuilt by import_crime_data (see crime/rankings.py).
+    """
+    generation = models.IntegerField(default=0)
+    window = models.IntegerField()
+    offence_group = models.ForeignKey(
+        OffenceGroup, on_delete=models.PROTECT, null=True, db_index=False, related_name='+'
+    )
+    area = models.ForeignKey(
+        Area, on_delete=models.PROTECT, db_index=False, related_name='+'
+    )
+    rank = models.IntegerField()
+    total_count = models.IntegerField()
+    # month_year of the first and last month of the window
+    first_month = models.CharField(max_length=20)
+    last_month = models.CharField(max_length=20)
+
+    objects = LiveGenerationManager()
+    all_generations = models.Manager()
+
     class Meta:
         indexes = [
-            models.Index(fields=['month_year', 'area_name']),
-            models.Index(fields=['month_year', 'offence_group']),
-            models.Index(fields=['area_name', 'offence_group']),
+            models.Index(fields=['generation', 'window', 'offence_group', 'rank']),
         ]
 
     def __str__(self):
-        return f"{self.month_year} | {self.area_name} | {self.offence_group}: {self.count}"
+        return f"{self.window} months | {self.offence_group or 'Overall'} | {self.rank}. {self.area}"
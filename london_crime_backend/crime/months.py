@@ -0,0 +1,51 @@
+"""
+Integer month keys.
+
+month_year is stored as text in whatever format the source data uses
+(YYYY-MM, YYYY-MM-DD or YYYY-MM-DD HH:MM:SS). Queries filter and compare
+on ``month_index`` instead: year * 12 + (month - 1), so consecutive months
+are consecutive integers and "n months before" is a subtraction.
+"""
+import datetime
+
+
+def month_index(value):
+    """
+    Month index of a YYYY-MM[...] string (any of the month_year formats),
+    or None if it does not start with a valid year and month.
+    """
+    if not value or len(value) < 7 or value[4] != '-':
+        return None
+    year, month = value[:4], value[5:7]
+    if not (year.isdigit() and month.isdigit()):
+        return None
+    month = int(month)
+    if not 1 <= month <= 12:
+        return None
+    return int(year) * 12 + month - 1
+
+
+def first_retained_month(months, today=None):
+    """
+    Month index of the oldest month kept when keeping ``months`` calendar
+    months up to and including the current one (``today``'s month), or
+    None when ``months`` is 0, which keeps everything.
+    """
+    if not months:
+        return None
+    today = today or datetime.date.today()
+    return today.year * 12 + today.month - 1 - (months - 1)
+
+
+def month_label(index):
+    """YYYY-MM string for a month index (accepted anywhere a month_year is)."""
+    year, month = divmod(index, 12)
+    return f'{year:04d}-{month + 1:02d}'
+
+
+def month_range(params):
+    """
+    (first, last) month indexes selected by the start_date/end_date params.
+    Either end is None when the param is missing or not a recognisable month.
+    """
+    return month_index(params.get('start_date')), month_index(params.get('end_date'))
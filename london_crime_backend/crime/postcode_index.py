@@ -0,0 +1,167 @@
+"""
+Full-postcode index for borough lookup.
+
+build_postcode_index writes every unit postcode of the outward codes in
+POSTCODE_TO_BOROUGH, with its borough, to DATA_DIR/postcodes/:
+
+- keys.npy: the postcodes, sorted, each packed into an int64 (its ASCII
+  characters without the space, big-endian, so it takes one int.from_bytes)
+- boroughs.npy: a uint8 borough code per key; NOT_LONDON marks postcodes
+  outside London that share an outward code with London ones
+- boroughs.json: the borough names the codes index
+
+The arrays are memory-mapped and searched with bisect, within the range of
+the postcode's outward code, so a lookup is a ~10-step binary search over
+about 2.5 MB of shared pages rather than a Python dict of every postcode. lookup_borough (crime/postcode_mapping.py)
+falls back to the outward-code mapping for postcodes not in the index, or
+when there is no index.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from bisect import bisect_left
+
+import numpy as np
+from django.conf import settings
+
+
+INDEX_DIRNAME = 'postcodes'
+NAMES_FILENAME = 'boroughs.json'
+
+# Borough code of postcodes known to be outside London
+NOT_LONDON = 255
+
+# Longest postcode without its space (e.g. SW1A2AA); keys hold 8 bytes
+KEY_BYTES = 8
+
+# The inward code (e.g. 2AA) is the last 3 characters, so the low 24 bits
+INWARD_BITS = 24
+
+# Seconds between checks for a rebuilt index
+RELOAD_INTERVAL = 5
+
+
+def index_dir():
+    return settings.DATA_DIR / INDEX_DIRNAME
+
+
+def normalize(postcode):
+    """A postcode as the index stores it: upper case, no spaces."""
+    return postcode.upper().replace(' ', '')
+
+
+def postcode_key(clean):
+    """
+    The int64 key of a normalized postcode, or None if it is too long to
+    be one. (Non-ASCII text gets a key no postcode has.)
+    """
+    encoded = clean.encode()
+    return int.from_bytes(encoded, 'big') if len(encoded) <= KEY_BYTES else None
+
+
+def write_postcode_index(boroughs):
+    """
+    Write the index for ``boroughs``, a {normalized postcode: borough name
+    or None (outside London)} dict, replacing any previous index.
+    """
+    names = sorted({name for name in boroughs.values() if name is not None})
+    if len(names) >= NOT_LONDON:
+        raise ValueError(f'Too many boroughs for a uint8 code: {len(names)}')
+    codes = {name: code for code, name in enumerate(names)}
+    pairs = sorted(
+        (key, NOT_LONDON if name is None else codes[name])
+        for key, name in ((postcode_key(postcode), name) for postcode, name in boroughs.items())
+        if key is not None
+    )
+
+    target = index_dir()
+    tmp_dir = tempfile.mkdtemp(dir=settings.DATA_DIR, prefix=f'.{INDEX_DIRNAME}-')
+    try:
+        np.save(os.path.join(tmp_dir, 'keys.npy'), np.array([k for k, _ in pairs], dtype=np.int64))
+        np.save(os.path.join(tmp_dir, 'boroughs.npy'), np.array([c for _, c in pairs], dtype=np.uint8))
+        with open(os.path.join(tmp_dir, NAMES_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(names, f)
+        os.chmod(tmp_dir, 0o755)
+        if target.exists():
+            shutil.rmtree(target)
+        os.replace(tmp_dir, target)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return len(pairs)
+
+
+class PostcodeIndex:
+    """A loaded index; ``borough(clean)`` looks up one normalized postcode."""
+
+    def __init__(self, path):
+        with open(path / NAMES_FILENAME, encoding='utf-8') as f:
+            self.names = json.load(f)
+        # memoryviews index to plain ints, which bisect compares quickly
+        self._key_array = np.load(path / 'keys.npy', mmap_mode='r')
+        self._code_array = np.load(path / 'boroughs.npy', mmap_mode='r')
+        self.keys = memoryview(self._key_array)
+        self.codes = memoryview(self._code_array)
+        # Dropping a key's last 3 bytes (the inward code) leaves its outward
+        # code, and each outward code's keys are contiguous: map each to its
+        # (start, end) so a search only covers that range
+        outwards, starts = np.unique(self._key_array >> INWARD_BITS, return_index=True)
+        ends = np.append(starts[1:], len(self._key_array))
+        self.ranges = dict(zip(outwards.tolist(), zip(starts.tolist(), ends.tolist())))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def borough(self, clean):
+        """
+        The borough of a normalized postcode, NOT_LONDON if it is known to
+        be outside London, or None if the index does not have it.
+        """
+        key = postcode_key(clean)
+        if key is None:
+            return None
+        bounds = self.ranges.get(key >> INWARD_BITS)
+        if bounds is None:
+            return None
+        i = bisect_left(self.keys, key, *bounds)
+        if i == bounds[1] or self.keys[i] != key:
+            return None
+        code = self.codes[i]
+        return NOT_LONDON if code == NOT_LONDON else self.names[code]
+
+
+_index = (None, None, 0.0)  # (file signature, PostcodeIndex or None, next check)
+
+
+def get_postcode_index():
+    """The current index, or None if none has been built."""
+    global _index
+    signature, index, next_check = _index
+    now = time.monotonic()
+    if now < next_check:
+        return index
+    try:
+        st = os.stat(index_dir() / NAMES_FILENAME)
+        current = (st.st_ino, st.st_mtime_ns)
+    except FileNotFoundError:
+        current = None
+    if current != signature:
+        index = PostcodeIndex(index_dir()) if current is not None else None
+    _index = (current, index, now + RELOAD_INTERVAL)
+    return index
+
+
+def postcode_index_state():
+    """
+    (signature, modified) of the index get_postcode_index() serves: a string
+    that changes whenever the index is rebuilt and when it was written (unix
+    time), or (None, None) if there is none. See crime/response_cache.py.
+    """
+    get_postcode_index()
+    signature = _index[0]
+    if signature is None:
+        return None, None
+    inode, mtime_ns = signature
+    return f'postcodes:{inode}:{mtime_ns}', mtime_ns / 1e9
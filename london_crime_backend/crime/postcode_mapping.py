@@ -3,7 +3,9 @@ Mapping of London postcode prefixes (outward codes) to borough area_name values
 that match the CrimeRecord database.
 
 The outward code is the first part of a UK postcode, e.g. "SW1A" from "SW1A 2AA".
-Many outward codes span multiple boroughs; we map to the primary one.
+Many outward codes span multiple boroughs; we map to the primary one. Where a
+full-postcode index has been built (crime/postcode_index.py) it is consulted
+first, and this mapping only covers postcodes the index does not have.
 """
 
 POSTCODE_TO_BOROUGH = {
@@ -331,19 +333,30 @@ POSTCODE_TO_BOROUGH = {
 
 from typing import Optional
 
+from .postcode_index import NOT_LONDON, get_postcode_index
+
 
 def lookup_borough(postcode: str) -> Optional[str]:
     """
-    Given a UK postcode string, extract the outward code and look up the
-    corresponding London borough.  Returns None if not a London postcode.
+    Given a UK postcode string, look up the corresponding London borough.
+    Returns None if not a London postcode.
 
-    Tries the most specific match first (e.g. SW1A), then falls back to
-    shorter prefixes (SW1, SW).
+    Full postcodes in the postcode index get the borough they lie in.
+    Otherwise the outward code is looked up, trying the most specific match
+    first (e.g. SW1A), then falling back to shorter prefixes (SW1, SW).
     """
     clean = postcode.upper().strip().replace(' ', '')
     if len(clean) < 3:
         return None
 
+    index = get_postcode_index()
+    if index is not None:
+        borough = index.borough(clean)
+        if borough == NOT_LONDON:
+            return None
+        if borough is not None:
+            return borough
+
     # The outward code is everything except the last 3 characters (the inward code)
     outward = clean[:-3].strip()
     if not outward:
@@ -0,0 +1,166 @@
+"""
+On-demand profiling of crime API requests.
+
+Adding ``_profile=1`` to the query string of any crime view runs that
+request under cProfile and answers with a JSON report instead of the usual
+response:
+
+- functions: the top PROFILE_FUNCTIONS functions by cumulative time
+- queries: every SQL statement with its params, its time (execution and
+  row fetches) and its EXPLAIN QUERY PLAN
+- the status and size of the response the view produced
+
+The response cache and conditional GET are bypassed, so the view really
+runs. Who may profile is set by CRIME_PROFILING: 'staff' (users logged in
+through the admin with is_staff), 'all', or 'off'.
+"""
+import cProfile
+import os
+import pstats
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import JsonResponse
+
+
+PROFILE_PARAM = '_profile'
+
+# Functions listed in a report, by cumulative time
+PROFILE_FUNCTIONS = 40
+
+# Cursor methods whose time counts towards the statement that produced the rows
+FETCH_METHODS = ('fetchone', 'fetchmany', 'fetchall')
+
+
+def profiling_requested(request):
+    """True when ``request`` asks to be profiled and may be."""
+    if request.GET.get(PROFILE_PARAM) != '1':
+        return False
+    if settings.CRIME_PROFILING == 'all':
+        return True
+    if settings.CRIME_PROFILING == 'staff':
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+    return False
+
+
+class QueryLog:
+    """Execute wrapper recording each statement, its params and its time."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        entry = {'sql': sql, 'params': params, 'many': many, 'seconds': 0.0}
+        self.queries.append(entry)
+        cursor = context['cursor']
+        self._time_fetches(cursor)
+        cursor._profiled_query = entry
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            entry['seconds'] += time.perf_counter() - started
+
+    def _time_fetches(self, cursor):
+        if '_profiled_query' in vars(cursor):
+            return
+        for name in FETCH_METHODS:
+            fetch = getattr(cursor, name)
+
+            def timed_fetch(*args, fetch=fetch):
+                started = time.perf_counter()
+                try:
+                    return fetch(*args)
+                finally:
+                    cursor._profiled_query['seconds'] += time.perf_counter() - started
+
+            setattr(cursor, name, timed_fetch)
+
+
+def _function_name(key):
+    filename, line, name = key
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    return f'{filename}:{line}({name})' if line else name
+
+
+def top_functions(profile, limit=PROFILE_FUNCTIONS):
+    """The ``limit`` functions of a cProfile run with the most cumulative time."""
+    stats = pstats.Stats(profile).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            'function': _function_name(key),
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for key, (primitive_calls, calls, own, cumulative, _) in ranked[:limit]
+    ]
+
+
+def query_plan(sql, params):
+    """The database's plan for a SELECT statement, one line per step."""
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+
+
+def _report_query(entry):
+    report = {
+        'sql': entry['sql'],
+        'params': [str(param) for param in entry['params'] or ()] if not entry['many'] else None,
+        'ms': round(entry['seconds'] * 1000, 3),
+    }
+    if not entry['many'] and entry['sql'].lstrip()[:6].upper() in ('SELECT', 'WITH'):
+        report['plan'] = query_plan(entry['sql'], entry['params'])
+    return report
+
+
+class RequestProfilerMiddleware:
+    """
+    Serves profiling reports for crime views (see the module docstring).
+    Place it after AuthenticationMiddleware, which the staff check needs.
+    """
+
+    def __init__(self, get_response):
+        if settings.CRIME_PROFILING == 'off':
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not view_func.__module__.startswith('crime.') or not profiling_requested(request):
+            return None
+        # Read by the response cache and conditional GET, which step aside
+        request.crime_profiling = True
+
+        log = QueryLog()
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        with connection.execute_wrapper(log):
+            profile.enable()
+            try:
+                response = view_func(request, *view_args, **view_kwargs)
+                if hasattr(response, 'render'):
+                    response.render()
+            finally:
+                profile.disable()
+        elapsed = time.perf_counter() - started
+
+        return JsonResponse({
+            'view': request.resolver_match.url_name,
+            'params': {key: value for key, value in request.GET.items() if key != PROFILE_PARAM},
+            'status': response.status_code,
+            'response_bytes': len(response.content) if not response.streaming else None,
+            'total_ms': round(elapsed * 1000, 3),
+            'functions': top_functions(profile),
+            'queries': [_report_query(entry) for entry in log.queries],
+        }, json_dumps_params={'indent': 2})
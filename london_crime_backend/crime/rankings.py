@@ -0,0 +1,121 @@
+"""
+Precomputed borough rankings.
+
+/borough-ranking/ ranks the boroughs by crime over the latest months, for
+one offence group or for all crime. Instead of aggregating on every
+request, import_crime_data ranks the boroughs for every offence group and
+for all crime over each window in CRIME_RANKING_WINDOWS (the latest 3, 6
+and 12 months by default) and stores the result in BoroughRanking, under
+the data generation it is importing.
+
+Each process loads the rankings of the live generation once per dataset
+version, so serving one is a dict lookup. Data imported before the table
+existed has no rankings; the view computes those on the fly.
+"""
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+
+from .dataset import current_generation, current_version
+from .dimensions import dimension_names
+from .models import Area, BoroughRanking, MonthBoroughOffenceGroupRollup
+
+
+# Areas left out of borough rankings
+RANKING_EXCLUDED = ['Other / NK', 'Unknown']
+
+
+def default_window():
+    """The window used when a request does not name one: 12 months if precomputed."""
+    windows = settings.CRIME_RANKING_WINDOWS
+    return 12 if 12 in windows else windows[-1]
+
+
+def _ranked_ids(totals, names):
+    """Area ids by descending total, ties in ascending name order (as views._ranked)."""
+    return sorted(sorted(totals, key=names.__getitem__), key=lambda pk: -totals[pk])
+
+
+def rebuild_rankings(generation=None):
+    """
+    Recompute BoroughRanking for one data generation, the live one by
+    default, from MonthBoroughOffenceGroupRollup (so run it after the
+    rollups). Returns the number of rows written.
+    """
+    if generation is None:
+        generation = current_generation()
+    rollups = MonthBoroughOffenceGroupRollup.all_generations.filter(generation=generation)
+    labels = dict(rollups.values_list('month_index', 'month_year').distinct())
+    months = sorted(labels)
+    # Read afresh: the import may have added names since they were cached
+    names = dict(Area.objects.values_list('id', 'name'))
+    excluded = Area.objects.filter(name__in=RANKING_EXCLUDED).values_list('id', flat=True)
+
+    rows = []
+    for window in settings.CRIME_RANKING_WINDOWS:
+        recent = months[-window:]
+        if not recent:
+            continue
+        totals = (
+            rollups
+            .filter(area_type='Borough', month_index__gte=recent[0])
+            .exclude(area_id__in=excluded)
+            .values_list('offence_group', 'area')
+            .annotate(total=Sum('count'))
+        )
+        # None: all crime
+        by_group = {None: {}}
+        for group, area, total in totals:
+            by_group.setdefault(group, {})[area] = total
+            by_group[None][area] = by_group[None].get(area, 0) + total
+        for group, group_totals in by_group.items():
+            for rank, area in enumerate(_ranked_ids(group_totals, names), start=1):
+                rows.append(BoroughRanking(
+                    generation=generation, window=window, offence_group_id=group,
+                    area_id=area, rank=rank, total_count=group_totals[area],
+                    first_month=labels[recent[0]], last_month=labels[recent[-1]],
+                ))
+
+    with transaction.atomic():
+        BoroughRanking.all_generations.filter(generation=generation).delete()
+        BoroughRanking.all_generations.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+_rankings = (None, {})  # (dataset version, {(window, offence group id): ranking})
+_rankings_lock = threading.Lock()
+
+
+def _load_rankings():
+    names = dimension_names(Area)
+    rankings = {}
+    rows = BoroughRanking.objects.order_by('window', 'offence_group', 'rank').values_list(
+        'window', 'offence_group', 'area', 'total_count', 'first_month', 'last_month',
+    )
+    for window, group, area, total, first_month, last_month in rows:
+        ranking = rankings.get((window, group))
+        if ranking is None:
+            ranking = rankings[window, group] = {
+                'period': f'{first_month} to {last_month}',
+                'ranked': [],
+            }
+        ranking['ranked'].append({'area_name': names[area], 'total_count': total})
+    return rankings
+
+
+def precomputed_rankings():
+    """
+    {(window, offence group id or None for all crime): ranking} for the
+    live data, each ranking a dict of 'period' and 'ranked' (a list of
+    {'area_name', 'total_count'} in rank order). Empty when the live data
+    has no precomputed rankings. Shared by every request: do not modify.
+    """
+    global _rankings
+    version = current_version()
+    if _rankings[0] != version:
+        with _rankings_lock:
+            if _rankings[0] != version:
+                _rankings = (version, _load_rankings())
+    return _rankings[1]
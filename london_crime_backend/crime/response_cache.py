@@ -0,0 +1,169 @@
+"""
+Response caching for the read-only crime API.
+
+Rendered JSON responses are cached under a key built from the view name,
+the canonicalized query string and the dataset version, so a new import
+makes every older entry unreachable. Which Django cache holds the entries
+is set by CRIME_RESPONSE_CACHE (see CACHES in settings).
+
+The same key doubles as a strong HTTP ETag, so browsers and proxies can
+revalidate with If-None-Match and get a 304 without the view running.
+
+Views that also read data outside the dataset (the postcode index, the
+borough boundaries) name it in ``inputs``: callables returning the
+(signature, modified) of its current state, both None when there is none.
+The signatures go into the key and the latest modified time into
+Last-Modified, so rebuilding such an input invalidates the view's entries
+as an import does.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import metrics
+from .dataset import current_version, dataset_state
+
+
+def canonical_query(params):
+    """
+    Canonical form of the query params: sorted by name, blank values dropped
+    and the comma-separated offence_groups list stripped and sorted. Requests
+    that the views treat identically map to the same string.
+    """
+    items = []
+    for key in sorted(params):
+        value = params.get(key)
+        if key == 'offence_groups' and value:
+            # A list of only blanks still filters (to nothing), so keep it
+            value = ','.join(sorted(g.strip() for g in value.split(',') if g.strip())) or ','
+        if value:
+            items.append(f'{key}={value}')
+    return '&'.join(items)
+
+
+def cache_key(view_name, params, version=None, signatures=()):
+    """
+    Cache key for ``view_name`` with ``params`` under a dataset version and
+    the ``signatures`` of the view's other inputs.
+    """
+    if version is None:
+        version = current_version()
+    query = canonical_query(params) + ''.join(f'\n{signature}' for signature in signatures)
+    digest = hashlib.sha1(query.encode('utf-8')).hexdigest()
+    return f'crime:{version}:{view_name}:{digest}'
+
+
+def _signatures(inputs):
+    return [state()[0] for state in inputs]
+
+
+def _profiling(request):
+    return getattr(request, 'crime_profiling', False)
+
+
+def cache_response(view=None, *, inputs=()):
+    """
+    Cache successful JSON responses of a DRF function view.
+
+    Apply below @api_view so the request has been content-negotiated; only
+    JSON responses are cached (the browsable API is left alone), and
+    requests being profiled (crime/profiling.py) always run the view.
+    Use as ``@cache_response(inputs=...)`` for a view with other inputs
+    than the dataset (see the module docstring).
+    """
+    if view is None:
+        return lambda view: cache_response(view, inputs=inputs)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json' or _profiling(request):
+            return view(request, *args, **kwargs)
+
+        cache = caches[settings.CRIME_RESPONSE_CACHE]
+        key = cache_key(view.__name__, request.query_params, signatures=_signatures(inputs))
+        cached = cache.get(key)
+        metrics.RESPONSE_CACHE.inc(
+            view=request.resolver_match.url_name, result='miss' if cached is None else 'hit',
+        )
+        if cached is not None:
+            content_type, content = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            def store(rendered):
+                cache.set(key, (rendered['Content-Type'], rendered.content))
+            response.add_post_render_callback(store)
+        return response
+
+    return wrapper
+
+
+def response_etag(view_name, params, version=None, signatures=()):
+    """
+    Strong ETag for ``view_name`` with ``params`` under a dataset version
+    and the ``signatures`` of the view's other inputs.
+    """
+    key = cache_key(view_name, params, version, signatures)
+    return '"%s"' % hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _last_modified(inputs):
+    """When the dataset or any of ``inputs`` last changed, or None if unknown."""
+    times = [dataset_state()['imported_at']]
+    times += [state()[1] for state in inputs]
+    times = [t for t in times if t is not None]
+    if not times:
+        return None
+    return datetime.fromtimestamp(max(times), tz=timezone.utc)
+
+
+def conditional_response(view=None, *, inputs=()):
+    """
+    Conditional GET for a DRF function view.
+
+    Responses carry an ETag (dataset version + canonical query, and the
+    signatures of any other ``inputs``) and a Last-Modified of the last
+    import or input change. A matching If-None-Match or If-Modified-Since
+    is answered with 304 Not Modified before the view runs. Cache-Control
+    lets browsers revalidate every time and shared caches reuse a response
+    for CRIME_HTTP_SHARED_MAX_AGE seconds.
+
+    Apply below @api_view and above @cache_response; like cache_response it
+    only applies to JSON responses that are not being profiled, and it
+    takes the same ``inputs``.
+    """
+    if view is None:
+        return lambda view: conditional_response(view, inputs=inputs)
+
+    def etag(request, *args, **kwargs):
+        return response_etag(view.__name__, request.query_params, signatures=_signatures(inputs))
+
+    def last_modified(request, *args, **kwargs):
+        return _last_modified(inputs)
+
+    conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json' or _profiling(request):
+            return view(request, *args, **kwargs)
+
+        response = conditional_view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=0,
+                s_maxage=settings.CRIME_HTTP_SHARED_MAX_AGE,
+                must_revalidate=True,
+            )
+        return response
+
+    return wrapper
@@ -0,0 +1,65 @@
+"""
+Build the pre-aggregated rollup tables from CrimeRecord.
+
+Each rollup is a GROUP BY of CrimeRecord over the rollup's ``dimensions``,
+written with a single INSERT ... SELECT so the aggregation runs inside
+the database.
+"""
+from django.db import connection, transaction
+
+from .dataset import current_generation
+from .models import (
+    CrimeRecord,
+    MonthBoroughOffenceGroupRollup,
+    MonthBoroughRollup,
+    MonthOffenceGroupRollup,
+    MonthOffenceSubgroupRollup,
+)
+
+
+# Smallest first: the query router picks the first rollup that carries
+# every column a query filters or groups on.
+ROLLUPS = [
+    MonthOffenceGroupRollup,
+    MonthBoroughRollup,
+    MonthOffenceSubgroupRollup,
+    MonthBoroughOffenceGroupRollup,
+]
+
+
+def rebuild_rollups(source=CrimeRecord, rollups=ROLLUPS, months=None, generation=None):
+    """
+    Recompute the rollup tables from ``source``. Returns row counts.
+
+    Works on one data generation, the live one by default. With ``months``
+    (a list of month indexes) only the rollup rows of those months are
+    replaced, for imports that touch a few months.
+    """
+    qn = connection.ops.quote_name
+    source_table = qn(source._meta.db_table)
+    row_counts = {}
+
+    if generation is None:
+        generation = current_generation()
+    where, params = f' WHERE {qn("generation")} = %s', [generation]
+    if months is not None:
+        where += f' AND {qn("month_index")} IN ({", ".join(["%s"] * len(months))})'
+        params += list(months)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model in rollups:
+            table = qn(model._meta.db_table)
+            columns = ', '.join(
+                qn(model._meta.get_field(field).column)
+                for field in ('generation', *model.dimensions)
+            )
+            cursor.execute(f'DELETE FROM {table}{where}', params)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}, {qn("count")}) '
+                f'SELECT {columns}, SUM({qn("count")}) FROM {source_table}{where} '
+                f'GROUP BY {columns}',
+                params,
+            )
+            row_counts[model.__name__] = cursor.rowcount
+
+    return row_counts
@@ -1,31 +1,57 @@
 from rest_framework import serializers
+from .middleware import timed
 from .models import CrimeRecord
 
 
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+class TimedSerializer(serializers.Serializer):
+    """Serializer whose .data time counts as serialize time in Server-Timing."""
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
 class CrimeRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = CrimeRecord
         fields = '__all__'
 
 
-class BoroughTotalSerializer(serializers.Serializer):
+class BoroughTotalSerializer(TimedSerializer):
     area_name = serializers.CharField()
     total_count = serializers.IntegerField()
 
 
-class TimeSeriesSerializer(serializers.Serializer):
+class TimeSeriesSerializer(TimedSerializer):
     month_year = serializers.CharField()
     total_count = serializers.IntegerField()
 
 
-class OffenceBreakdownSerializer(serializers.Serializer):
+class OffenceBreakdownSerializer(TimedSerializer):
     label = serializers.CharField()
     total_count = serializers.IntegerField()
 
 
-class SummarySerializer(serializers.Serializer):
+class SummarySerializer(TimedSerializer):
     total_offences = serializers.IntegerField()
     twelve_month_change_pct = serializers.FloatField(allow_null=True)
     one_month_change_pct = serializers.FloatField(allow_null=True)
     latest_month = serializers.CharField()
     earliest_month = serializers.CharField()
+
+
+class DashboardSerializer(TimedSerializer):
+    summary = SummarySerializer()
+    borough_totals = BoroughTotalSerializer(many=True)
+    offence_breakdown = OffenceBreakdownSerializer(many=True)
@@ -0,0 +1,27 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import override_settings
+
+
+class TemporaryDataDirMixin:
+    """
+    Point DATA_DIR (the dataset stamp and the caches beside it) and the
+    metrics directory at a temporary directory for the test class.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data_dir = Path(tempfile.mkdtemp())
+        cls.data_dir_override = override_settings(
+            DATA_DIR=cls.data_dir, CRIME_METRICS_DIR=cls.data_dir / 'metrics',
+        )
+        cls.data_dir_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.data_dir_override.disable()
+        shutil.rmtree(cls.data_dir)
@@ -0,0 +1,61 @@
+import io
+import json
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from crime.cube import reset_cube
+from crime.dimensions import reset_dimensions
+
+from .helpers import TemporaryDataDirMixin
+
+
+@override_settings(CRIME_GENERATION_GC_DELAY=0, CRIME_DATA_RETENTION_MONTHS=0)
+class BenchmarkSmokeTests(TemporaryDataDirMixin, TestCase):
+    """generate_crime_data and benchmark_endpoints on a tiny dataset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_crime_data', months=2, last_month='2026-06', area_types='Borough',
+            noinput=True, stdout=io.StringIO(),
+        )
+
+    def setUp(self):
+        reset_dimensions()
+        reset_cube()
+        self.report_path = self.data_dir / f'{self._testMethodName}.json'
+
+    def benchmark(self, **options):
+        out = io.StringIO()
+        call_command(
+            'benchmark_endpoints', backend=['sql', 'cube'], repeat=1, warmup=1,
+            output=str(self.report_path), stdout=out, **options,
+        )
+        return out.getvalue()
+
+    def test_against_baseline(self):
+        self.benchmark()
+        with open(self.report_path, encoding='utf-8') as f:
+            report = json.load(f)
+        self.assertEqual(report['dataset']['last_month'], '2026-06')
+        self.assertEqual({r['backend'] for r in report['results']}, {'sql', 'cube'})
+
+        baseline_path = self.data_dir / 'baseline.json'
+        self.report_path.rename(baseline_path)
+        # One timed request is noisy: only extra queries can fail this run
+        out = self.benchmark(baseline=str(baseline_path), tolerance=1000)
+        self.assertIn('No regressions against the baseline.', out)
+
+    def test_regression(self):
+        self.benchmark()
+        with open(self.report_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for result in baseline['results']:
+            result['queries'] -= 1
+        baseline_path = self.data_dir / 'fewer-queries.json'
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f)
+        with self.assertRaisesMessage(CommandError, 'regressions against'):
+            self.benchmark(baseline=str(baseline_path), tolerance=1000)
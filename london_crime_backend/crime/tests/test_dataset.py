@@ -0,0 +1,27 @@
+import stat
+
+from django.test import SimpleTestCase
+
+from crime.dataset import STAMP_FILENAME, bump_version, current_version
+from crime.download import read_meta, write_meta
+
+from .helpers import TemporaryDataDirMixin
+
+
+class StampFileTests(TemporaryDataDirMixin, SimpleTestCase):
+
+    def assertReadableByAll(self, path):
+        self.assertEqual(stat.S_IMODE(path.stat().st_mode), 0o644)
+
+    def test_bump_version(self):
+        version = current_version()
+        state = bump_version(import_seconds=1.5)
+        self.assertEqual(state['version'], version + 1)
+        self.assertEqual(current_version(), version + 1)
+        self.assertReadableByAll(self.data_dir / STAMP_FILENAME)
+
+    def test_download_meta(self):
+        path = self.data_dir / 'data.download.json'
+        write_meta(path, {'etag': '"v1"'})
+        self.assertEqual(read_meta(path), {'etag': '"v1"'})
+        self.assertReadableByAll(path)
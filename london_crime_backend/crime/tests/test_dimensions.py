@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from crime.dimensions import dimension_id, dimension_names, reset_dimensions
+from crime.models import Area
+
+from .helpers import TemporaryDataDirMixin
+
+
+class DimensionNamesTests(TemporaryDataDirMixin, TestCase):
+
+    def setUp(self):
+        reset_dimensions()
+        self.camden = Area.objects.create(name='Camden')
+
+    def test_id_added_before_the_version_bump(self):
+        # An import commits new dimension rows before it bumps the version
+        names = dimension_names(Area)
+        self.assertEqual(names[self.camden.pk], 'Camden')
+        hackney = Area.objects.create(name='Hackney')
+        islington = Area.objects.create(name='Islington')
+
+        self.assertEqual(names[hackney.pk], 'Hackney')
+        self.assertEqual(names[islington.pk], 'Islington')
+        self.assertEqual(dimension_names(Area)[islington.pk], 'Islington')
+        self.assertEqual(dimension_id(Area, 'Hackney'), hackney.pk)
+
+    def test_unknown_id(self):
+        with self.assertRaises(KeyError):
+            dimension_names(Area)[self.camden.pk + 1000]
@@ -0,0 +1,120 @@
+import io
+import random
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from crime.download import IncompleteDownload, download
+
+
+def _workbook(seed):
+    """Bytes of a zip archive (as an XLSX is) of a few hundred KB."""
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        archive.writestr('xl/worksheets/sheet1.xml', rng.randbytes(300 * 1024))
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Serves the server's ``body`` under its ``etag``, honouring
+    If-None-Match, and Range when If-Range matches. While ``truncate`` is
+    above 0, responses are cut off halfway (and it counts down).
+    """
+
+    def do_GET(self):
+        server = self.server
+        body, etag = server.body, server.etag
+        if self.headers.get('If-None-Match') == etag:
+            status, start = 304, None
+        elif self.headers.get('Range') and self.headers.get('If-Range') == etag:
+            status = 206
+            start = int(re.fullmatch(r'bytes=(\d+)-', self.headers['Range']).group(1))
+        else:
+            status, start = 200, 0
+        server.log.append((dict(self.headers), status))
+
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        if start is None:
+            self.end_headers()
+            return
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+        self.send_header('Content-Length', str(len(body) - start))
+        self.end_headers()
+        payload = body[start:]
+        if server.truncate:
+            server.truncate -= 1
+            payload = payload[:len(payload) // 2]
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.body, self.server.etag = _workbook(1), '"v1"'
+        self.server.truncate = 0
+        self.server.log = []
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/data.xlsx'
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.dest = self.dir / 'data.xlsx'
+
+    def assertDownloaded(self, meta, body, etag):
+        self.assertEqual(self.dest.read_bytes(), body)
+        self.assertEqual((meta['etag'], meta['size']), (etag, len(body)))
+        self.assertEqual(sorted(p.name for p in self.dir.iterdir()), ['data.xlsx'])
+
+    def test_not_modified(self):
+        meta = download(self.url, self.dest)
+        self.assertDownloaded(meta, self.server.body, '"v1"')
+
+        self.assertIsNone(download(self.url, self.dest, previous=meta))
+        headers, status = self.server.log[-1]
+        self.assertEqual((headers['If-None-Match'], status), ('"v1"', 304))
+        self.assertEqual(self.dest.read_bytes(), self.server.body)
+
+    def test_resume_truncated_body(self):
+        self.server.truncate = 1
+        meta = download(self.url, self.dest)
+        self.assertDownloaded(meta, self.server.body, '"v1"')
+
+        (first, first_status), (headers, status) = self.server.log
+        self.assertEqual(first_status, 200)
+        self.assertNotIn('Range', first)
+        offset = int(re.fullmatch(r'bytes=(\d+)-', headers['Range']).group(1))
+        self.assertGreater(offset, 0)
+        self.assertEqual((headers['If-Range'], status), ('"v1"', 206))
+
+    def test_restart_when_file_changed(self):
+        # Every try of the first run is cut off, leaving a partial download
+        self.server.truncate = 3
+        with self.assertRaises(IncompleteDownload):
+            download(self.url, self.dest)
+        self.assertTrue((self.dir / 'data.xlsx.part').exists())
+
+        # The file changes upstream before the next run resumes
+        self.server.body, self.server.etag = _workbook(2), '"v2"'
+        meta = download(self.url, self.dest)
+        self.assertDownloaded(meta, self.server.body, '"v2"')
+
+        headers, status = self.server.log[-1]
+        self.assertEqual((headers['If-Range'], status), ('"v1"', 200))
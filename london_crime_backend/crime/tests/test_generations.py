@@ -0,0 +1,44 @@
+from django.test import TestCase
+
+from crime.dataset import STAMP_FILENAME, bump_version, current_generation
+from crime.generations import publish_generation
+from crime.models import Area, CrimeRecord, OffenceGroup, OffenceSubgroup
+
+from .helpers import TemporaryDataDirMixin
+
+
+class LiveGenerationTests(TemporaryDataDirMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(name='Camden')
+        group = OffenceGroup.objects.create(name='Burglary')
+        subgroup = OffenceSubgroup.objects.create(name='Residential Burglary')
+        for generation in (1, 2):
+            CrimeRecord.all_generations.create(
+                generation=generation, month_year='2026-01-01 00:00:00', month_index=2026 * 12,
+                area_type='Borough', area=area, offence_group=group, offence_subgroup=subgroup,
+                count=generation * 10,
+            )
+
+    def live_counts(self):
+        return list(CrimeRecord.objects.values_list('count', flat=True))
+
+    def test_readers_switch_over_on_the_version_bump(self):
+        publish_generation(1)
+        bump_version()
+        self.assertEqual(current_generation(), 1)
+        self.assertEqual(self.live_counts(), [10])
+
+        publish_generation(2)
+        self.assertEqual(self.live_counts(), [10])
+        bump_version()
+        self.assertEqual(current_generation(), 2)
+        self.assertEqual(self.live_counts(), [20])
+
+    def test_live_generation_without_a_stamp(self):
+        publish_generation(2)
+        bump_version()
+        (self.data_dir / STAMP_FILENAME).unlink()
+        self.assertEqual(current_generation(), 2)
+        self.assertEqual(self.live_counts(), [20])
@@ -0,0 +1,57 @@
+import io
+import os
+import shutil
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from crime.benchmarks.synthetic import synthetic_rows, write_source_csv
+from crime.cube import reset_cube
+from crime.dimensions import reset_dimensions
+from crime.management.commands.import_crime_data import CSV_FILENAME
+from crime.models import CrimeRecord
+from crime.months import month_index
+
+from .helpers import TemporaryDataDirMixin
+
+
+@override_settings(CRIME_GENERATION_GC_DELAY=0, CRIME_DATA_RETENTION_MONTHS=0)
+class CachedSourceTests(TemporaryDataDirMixin, TestCase):
+    """Which cache an import without --file reads."""
+
+    def setUp(self):
+        # Each test starts without caches or a dataset stamp
+        for path in self.data_dir.iterdir():
+            shutil.rmtree(path) if path.is_dir() else path.unlink()
+        reset_dimensions()
+        reset_cube()
+
+    def write_csv_cache(self, months):
+        rows = synthetic_rows(months, month_index('2026-06'), area_types=('Borough',))
+        write_source_csv(self.data_dir / CSV_FILENAME, rows)
+
+    def import_data(self):
+        out = io.StringIO()
+        call_command('import_crime_data', stdout=out)
+        return out.getvalue()
+
+    def test_column_cache_of_the_same_csv(self):
+        self.write_csv_cache(2)
+        self.assertIn('Using cached CSV', self.import_data())
+        self.assertIn('Using cached columns', self.import_data())
+        self.assertEqual(CrimeRecord.objects.values('month_index').distinct().count(), 2)
+
+    def test_csv_changed_since_the_column_cache(self):
+        self.write_csv_cache(2)
+        self.import_data()
+        self.write_csv_cache(3)
+        self.assertIn('Using cached CSV', self.import_data())
+        self.assertEqual(CrimeRecord.objects.values('month_index').distinct().count(), 3)
+
+    def test_csv_touched_since_the_column_cache(self):
+        self.write_csv_cache(2)
+        self.import_data()
+        path = self.data_dir / CSV_FILENAME
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        self.assertIn('Using cached CSV', self.import_data())
@@ -0,0 +1,92 @@
+import json
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from crime import metrics
+
+from .helpers import TemporaryDataDirMixin
+
+
+@override_settings(CRIME_METRICS=True, CRIME_METRICS_TOKEN='scrape-token')
+class MetricsEndpointTests(TemporaryDataDirMixin, TestCase):
+
+    def test_anonymous(self):
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="metrics"')
+
+    def test_token(self):
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'crime_http_requests_in_flight', response.content)
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer other-token')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(CRIME_METRICS_TOKEN='')
+    def test_no_token_configured(self):
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 401)
+
+    def test_staff(self):
+        self.client.force_login(User.objects.create(username='admin', is_staff=True))
+        self.assertEqual(self.client.get('/metrics/').status_code, 200)
+        self.client.force_login(User.objects.create(username='visitor'))
+        self.assertEqual(self.client.get('/metrics/').status_code, 401)
+
+    @override_settings(CRIME_METRICS=False)
+    def test_turned_off(self):
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 404)
+
+    def test_in_flight_counts_crime_views_only(self):
+        with mock.patch.object(metrics.IN_FLIGHT, 'inc') as inc, \
+                mock.patch.object(metrics.IN_FLIGHT, 'dec') as dec:
+            self.client.get('/admin/login/')
+            self.client.get('/no-such-page/')
+            self.assertEqual((inc.call_count, dec.call_count), (0, 0))
+            self.client.get('/api/summary/')
+            self.assertEqual((inc.call_count, dec.call_count), (1, 1))
+
+
+class ValueFileTests(TemporaryDataDirMixin, SimpleTestCase):
+    counter = metrics._key(metrics.DB_QUERIES.name, {'view': 'test'})
+    gauge = metrics._key(metrics.IN_FLIGHT.name, {'view': 'test'})
+
+    def setUp(self):
+        self.directory = settings.CRIME_METRICS_DIR / self._testMethodName
+        self.directory.mkdir(parents=True)
+        self.settings_override = override_settings(CRIME_METRICS_DIR=self.directory)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def value_file(self):
+        values = metrics._ValueFile(self.directory / f'{os.getpid()}-{self._testMethodName}.db')
+        values.add(self.counter, 3)
+        values.add(self.gauge, 1)
+        return values
+
+    def archive(self):
+        with open(self.directory / metrics.ARCHIVE_FILENAME, encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_exited_process_with_reused_pid(self):
+        # The file is named after a live pid, but no process holds it
+        self.value_file().close()
+        totals = metrics.collect()
+        self.assertEqual(totals.get(self.counter), 3)
+        self.assertNotIn(self.gauge, totals)
+        self.assertEqual(self.archive(), {self.counter: 3})
+        self.assertEqual(list(self.directory.glob('*.db')), [])
+
+    def test_archived_at_exit(self):
+        values = self.value_file()
+        self.assertEqual(metrics.collect().get(self.gauge), 1)
+        self.assertEqual(len(list(self.directory.glob('*.db'))), 1)
+        with mock.patch.object(metrics, '_process_file', (os.getpid(), values)):
+            metrics._archive_process_file(os.getpid())
+        self.assertEqual(self.archive(), {self.counter: 3})
+        self.assertEqual(list(self.directory.glob('*.db')), [])
@@ -0,0 +1,123 @@
+import json
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils.http import parse_http_date
+
+from crime import borough_boundaries, postcode_index
+from crime.models import Area, CrimeRecord, OffenceGroup, OffenceSubgroup
+from crime.postcode_index import write_postcode_index
+from crime.rollups import rebuild_rollups
+
+from .helpers import TemporaryDataDirMixin
+
+
+def _records():
+    """Burglaries in two boroughs, Camden ranked first."""
+    group = OffenceGroup.objects.create(name='Burglary')
+    subgroup = OffenceSubgroup.objects.create(name='Residential Burglary')
+    for name, count in (('Camden', 30), ('Hackney', 20)):
+        CrimeRecord.objects.create(
+            month_year='2026-01-01 00:00:00', month_index=2026 * 12, area_type='Borough',
+            area=Area.objects.create(name=name), offence_group=group,
+            offence_subgroup=subgroup, count=count,
+        )
+    rebuild_rollups()
+
+
+class PostcodeIndexInputTests(TemporaryDataDirMixin, TestCase):
+    """/borough-ranking/ responses follow a rebuilt postcode index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _records()
+
+    def setUp(self):
+        caches[settings.CRIME_RESPONSE_CACHE].clear()
+        # Look for a rebuilt index on every request, starting with none loaded
+        for patcher in (
+            mock.patch.object(postcode_index, 'RELOAD_INTERVAL', 0),
+            mock.patch.object(postcode_index, '_index', (None, None, 0.0)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_ranking(self, **headers):
+        return self.client.get('/api/borough-ranking/', {'postcode': 'NW1 0AA'}, **headers)
+
+    def test_rebuilt_index(self):
+        write_postcode_index({'NW10AA': 'Hackney'})
+        first = self.get_ranking()
+        self.assertEqual(first.json()['borough'], 'Hackney')
+        self.assertEqual(self.get_ranking(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        write_postcode_index({'NW10AA': 'Camden'})
+        modified = postcode_index.postcode_index_state()[1]
+        second = self.get_ranking(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['borough'], 'Camden')
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(parse_http_date(second['Last-Modified']), int(modified))
+
+    def test_index_removed(self):
+        write_postcode_index({'NW10AA': 'Hackney'})
+        self.assertEqual(self.get_ranking().json()['borough'], 'Hackney')
+        postcode_index.index_dir().joinpath(postcode_index.NAMES_FILENAME).unlink()
+        # Back to the outward code mapping
+        self.assertEqual(self.get_ranking().json()['borough'], 'Camden')
+
+
+def _square(name, x):
+    ring = [[x, 0], [x + 1, 0], [x + 1, 1], [x, 1], [x, 0]]
+    return {'properties': {'name': name}, 'geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+
+
+class BoundariesInputTests(TemporaryDataDirMixin, TestCase):
+    """/borough-ranking/location/ validators follow the boundary file."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _records()
+
+    def setUp(self):
+        self.path = self.data_dir / f'{self._testMethodName}.geojson'
+        settings_override = override_settings(CRIME_BOROUGH_BOUNDARIES=self.path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Look for a changed file on every request, starting with none loaded
+        for patcher in (
+            mock.patch.object(borough_boundaries, 'RELOAD_INTERVAL', 0),
+            mock.patch.object(borough_boundaries, '_boundaries', (None, None, 0.0)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write_boundaries(self, *names):
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'features': [_square(name, x) for x, name in enumerate(names)]}, f)
+        os.replace(tmp_path, self.path)
+
+    def get_ranking(self, **headers):
+        return self.client.get('/api/borough-ranking/location/', {'lat': 0.5, 'lon': 0.5}, **headers)
+
+    def test_changed_boundaries(self):
+        self.write_boundaries('Hackney', 'Camden')
+        first = self.get_ranking()
+        self.assertEqual(first.json()['borough'], 'Hackney')
+        self.assertEqual(self.get_ranking(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        self.write_boundaries('Camden', 'Hackney')
+        second = self.get_ranking(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['borough'], 'Camden')
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(
+            parse_http_date(second['Last-Modified']), int(os.stat(self.path).st_mtime),
+        )
+
+    def test_missing_boundaries(self):
+        self.assertEqual(self.get_ranking().status_code, 503)
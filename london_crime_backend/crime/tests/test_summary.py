@@ -0,0 +1,232 @@
+"""
+The summary KPIs from _summary_month_totals (one grouped query, or the
+cube) against the per-mode queries the summary view used to run.
+"""
+import random
+
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+
+from crime.cube import reset_cube
+from crime.dimensions import reset_dimensions
+from crime.models import Area, CrimeRecord, OffenceGroup, OffenceSubgroup
+from crime.months import month_label
+from crime.rollups import rebuild_rollups
+from crime.views import _filter_queryset, _summarize, _summary_month_totals, _summary_window
+
+from .helpers import TemporaryDataDirMixin
+
+
+FIRST_MONTH = 2024 * 12  # 2024-01
+MONTHS = 30  # to 2026-06
+
+OFFENCES = {
+    'Burglary': ['Residential Burglary', 'Business Burglary'],
+    'Robbery': ['Robbery Of Personal Property'],
+    'Theft': ['Bicycle Theft', 'Shoplifting'],
+}
+
+EMPTY = {
+    'total_offences': 0,
+    'twelve_month_change_pct': None,
+    'one_month_change_pct': None,
+    'latest_month': '',
+    'earliest_month': '',
+}
+
+
+def _records():
+    """A small dataset with gaps, zero counts and months missing per area."""
+    rng = random.Random(6)
+    areas = {name: Area.objects.create(name=name) for name in ('Alpha', 'Beta', 'Gamma', 'Alpha North')}
+    records = []
+    for group_name, subgroups in OFFENCES.items():
+        group = OffenceGroup.objects.create(name=group_name)
+        for subgroup_name in subgroups:
+            subgroup = OffenceSubgroup.objects.create(name=subgroup_name)
+            for month in range(FIRST_MONTH, FIRST_MONTH + MONTHS):
+                for area_name, area_type in (
+                    ('Alpha', 'Borough'), ('Beta', 'Borough'), ('Alpha North', 'Ward'),
+                ):
+                    # Beta has no robbery in odd months
+                    if area_name == 'Beta' and group_name == 'Robbery' and month % 2:
+                        continue
+                    records.append(CrimeRecord(
+                        month_year=f'{month_label(month)}-01 00:00:00', month_index=month,
+                        area_type=area_type, area=areas[area_name], offence_group=group,
+                        offence_subgroup=subgroup, count=rng.choice([0, 1, 2, 5, 8, 13, 40]),
+                    ))
+            # Gamma only has data in one month
+            records.append(CrimeRecord(
+                month_year='2025-03-01 00:00:00', month_index=2025 * 12 + 2,
+                area_type='Borough', area=areas['Gamma'], offence_group=group,
+                offence_subgroup=subgroup, count=rng.randint(1, 9),
+            ))
+    CrimeRecord.objects.bulk_create(records)
+
+
+def _percent(current, previous):
+    if previous > 0:
+        return round(((current - previous) / previous) * 100, 2)
+    return None
+
+
+def per_mode_summary(params):
+    """
+    The summary as the view computed it before the single grouped query:
+    a DISTINCT over months, a total, then separate aggregates per mode
+    (snapshot comparisons over the same borough/offence filters without
+    dates). Reads CrimeRecord, not the rollups.
+    """
+    qs = _filter_queryset(CrimeRecord.objects.all(), params)
+    labels = dict(qs.values_list('month_index', 'month_year').distinct())
+    months = sorted(labels)
+    if not months:
+        return EMPTY
+
+    def total(queryset):
+        return queryset.aggregate(total=Sum('count'))['total'] or 0
+
+    current = total(qs)
+    twelve_month_change = None
+    one_month_change = None
+    if len(months) == 1:
+        comparison = _filter_queryset(CrimeRecord.objects.all(), {
+            key: params.get(key)
+            for key in ('borough', 'offence_group', 'offence_subgroup', 'area_type')
+        })
+        one_month_change = _percent(current, total(comparison.filter(month_index=months[0] - 1)))
+        twelve_month_change = _percent(current, total(comparison.filter(month_index=months[0] - 12)))
+    else:
+        if len(months) >= 24:
+            twelve_month_change = _percent(
+                total(qs.filter(month_index__in=months[-12:])),
+                total(qs.filter(month_index__in=months[-24:-12])),
+            )
+        one_month_change = _percent(
+            total(qs.filter(month_index=months[-1])),
+            total(qs.filter(month_index=months[-2])),
+        )
+    return {
+        'total_offences': current,
+        'twelve_month_change_pct': twelve_month_change,
+        'one_month_change_pct': one_month_change,
+        'latest_month': labels[months[-1]],
+        'earliest_month': labels[months[0]],
+    }
+
+
+FILTERS = [
+    {},
+    {'borough': 'Alpha'},
+    {'area_type': 'Borough'},
+    {'offence_group': 'Robbery'},
+    {'offence_groups': 'Burglary,Theft'},
+    {'offence_groups': 'Robbery, Unknown group'},
+    {'borough': 'Beta', 'offence_subgroup': 'Robbery Of Personal Property'},
+]
+
+RANGES = [
+    {},
+    {'start_date': '2024-03', 'end_date': '2026-06'},
+    {'start_date': '2025-01', 'end_date': '2025-12'},
+    {'start_date': '2025-06-01 00:00:00'},
+    {'end_date': '2024-05'},
+]
+
+SNAPSHOTS = ['2026-06', '2025-01', '2024-06', '2024-01', '2025-04-01']
+
+EMPTY_WINDOWS = [
+    {'start_date': '2030-01', 'end_date': '2030-03'},
+    {'start_date': '2026-01', 'end_date': '2025-01'},
+    {'borough': 'Nowhere'},
+    {'offence_groups': ','},
+    {'offence_group': 'Robbery', 'offence_subgroup': 'Shoplifting'},
+]
+
+
+class SummaryMonthTotalsTests(TemporaryDataDirMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _records()
+        rebuild_rollups()
+
+    def setUp(self):
+        reset_dimensions()
+        reset_cube()
+
+    def assertMatchesPerMode(self, params, backend):
+        with override_settings(CRIME_QUERY_BACKEND=backend):
+            summary = _summarize(*_summary_month_totals(params))
+        self.assertEqual(summary, per_mode_summary(params), f'{backend}: {params}')
+        return summary
+
+    def test_range_mode(self):
+        for backend in ('sql', 'cube'):
+            for filters in FILTERS:
+                for dates in RANGES:
+                    self.assertMatchesPerMode({**filters, **dates}, backend)
+
+    def test_range_mode_compares_twelve_months_from_24(self):
+        params = {'start_date': '2024-03', 'end_date': '2026-06'}
+        for backend in ('sql', 'cube'):
+            summary = self.assertMatchesPerMode(params, backend)
+            self.assertIsNotNone(summary['twelve_month_change_pct'])
+            summary = self.assertMatchesPerMode({**params, 'start_date': '2024-08'}, backend)
+            self.assertIsNone(summary['twelve_month_change_pct'])
+
+    def test_snapshot_mode(self):
+        for backend in ('sql', 'cube'):
+            for filters in FILTERS:
+                for month in SNAPSHOTS:
+                    self.assertMatchesPerMode({**filters, 'start_date': month, 'end_date': month}, backend)
+
+    def test_snapshot_mode_compares_earlier_months(self):
+        for backend in ('sql', 'cube'):
+            summary = self.assertMatchesPerMode({'start_date': '2026-06', 'end_date': '2026-06'}, backend)
+            self.assertIsNotNone(summary['one_month_change_pct'])
+            self.assertIsNotNone(summary['twelve_month_change_pct'])
+            # Nothing 12 months before the first month
+            summary = self.assertMatchesPerMode({'start_date': '2024-06', 'end_date': '2024-06'}, backend)
+            self.assertIsNotNone(summary['one_month_change_pct'])
+            self.assertIsNone(summary['twelve_month_change_pct'])
+
+    def test_single_month_of_data_in_a_range(self):
+        # A multi-month selection holding one month of data is summarized as
+        # a snapshot, comparing against months outside the selection
+        cases = [
+            {'start_date': '2026-06', 'end_date': '2026-12'},
+            {'borough': 'Gamma'},
+            {'borough': 'Gamma', 'start_date': '2025-01', 'end_date': '2025-06'},
+            {'offence_group': 'Robbery', 'borough': 'Beta', 'start_date': '2025-01', 'end_date': '2025-02'},
+        ]
+        for backend in ('sql', 'cube'):
+            for params in cases:
+                summary = self.assertMatchesPerMode(params, backend)
+                self.assertEqual(summary['latest_month'], summary['earliest_month'])
+
+    def test_range_mode_reads_the_selected_months(self):
+        params = {'start_date': '2025-01', 'end_date': '2025-12'}
+        self.assertEqual(_summary_window(params), (params, None))
+
+    def test_dashboard_single_month_of_data_in_a_range(self):
+        params = {'borough': 'Alpha', 'start_date': '2026-06', 'end_date': '2026-12'}
+        for backend in ('sql', 'cube'):
+            with override_settings(CRIME_QUERY_BACKEND=backend):
+                response = self.client.get('/api/dashboard/', {**params, 'backend': backend})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['summary'], per_mode_summary(params))
+
+    def test_empty_window(self):
+        for backend in ('sql', 'cube'):
+            for params in EMPTY_WINDOWS:
+                self.assertEqual(self.assertMatchesPerMode(params, backend), EMPTY)
+
+    def test_summary_endpoint(self):
+        params = {'borough': 'Alpha', 'start_date': '2026-05', 'end_date': '2026-05'}
+        for backend in ('sql', 'cube'):
+            with override_settings(CRIME_QUERY_BACKEND=backend):
+                response = self.client.get('/api/summary/', {**params, 'backend': backend})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), per_mode_summary(params))
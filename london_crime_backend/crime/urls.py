@@ -11,5 +11,15 @@ urlpatterns = [
     path('borough-totals/', views.borough_totals, name='borough-totals'),
     path('time-series/', views.time_series, name='time-series'),
     path('offence-breakdown/', views.offence_breakdown, name='offence-breakdown'),
+    path('dashboard/', views.dashboard, name='dashboard'),
     path('borough-ranking/', views.borough_ranking, name='borough-ranking'),
+    path('borough-ranking/bulk/', views.borough_ranking_bulk, name='borough-ranking-bulk'),
+    path(
+        'borough-ranking/location/', views.borough_ranking_location,
+        name='borough-ranking-location',
+    ),
+    path(
+        'borough-ranking/location/bulk/', views.borough_ranking_location_bulk,
+        name='borough-ranking-location-bulk',
+    ),
 ]
@@ -1,238 +1,433 @@
-from django.db.models import Sum, Count
+import json
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
-from .models import CrimeRecord
+from .borough_boundaries import (
+    BoundariesUnavailable, boundaries_state, get_boundaries, lookup_location,
+)
+from .cube import get_cube
+from .dimensions import dimension_id, dimension_ids, dimension_names
+from .metrics import exposition, scrape_allowed
+from .models import Area, CrimeRecord, ImportedMonth, OffenceGroup, OffenceSubgroup
+from .months import month_index, month_label, month_range
+from .postcode_index import postcode_index_state
+from .rankings import RANKING_EXCLUDED, default_window, precomputed_rankings
+from .response_cache import cache_response, conditional_response
+from .rollups import ROLLUPS
 from .serializers import (
     BoroughTotalSerializer,
+    DashboardSerializer,
     TimeSeriesSerializer,
     OffenceBreakdownSerializer,
     SummarySerializer,
 )
 
 
+# Query params handled by _apply_filters and the column each filters on
+FILTER_COLUMNS = {
+    'start_date': 'month_index',
+    'end_date': 'month_index',
+    'borough': 'area',
+    'offence_group': 'offence_group',
+    'offence_groups': 'offence_group',
+    'offence_subgroup': 'offence_subgroup',
+    'area_type': 'area_type',
+}
+
+
+def _source(params, *columns):
+    """
+    Query router: return a queryset over the smallest table able to answer a
+    query that filters on ``params`` and groups on ``columns``.
+
+    Rollups carry the same column names as CrimeRecord, so the result can be
+    passed straight to _apply_filters. Falls back to CrimeRecord itself.
+    Dimension columns (area, offence_group, offence_subgroup) hold ids.
+    """
+    needed = set(columns)
+    needed.update(
+        column for param, column in FILTER_COLUMNS.items() if params.get(param)
+    )
+    for model in ROLLUPS:
+        if needed.issubset(model.dimensions):
+            return model.objects.all()
+    return CrimeRecord.objects.all()
+
+
 def _apply_filters(queryset, request):
     """Apply common query filters from request params."""
-    start_date = request.query_params.get('start_date')
-    end_date = request.query_params.get('end_date')
-    borough = request.query_params.get('borough')
-    offence_group = request.query_params.get('offence_group')
-    offence_groups = request.query_params.get('offence_groups')  # comma-separated
-    offence_subgroup = request.query_params.get('offence_subgroup')
-    area_type = request.query_params.get('area_type')
-
-    if start_date:
-        queryset = queryset.filter(month_year__gte=start_date)
-    if end_date:
-        queryset = queryset.filter(month_year__lte=end_date)
+    return _filter_queryset(queryset, request.query_params)
+
+
+def _filter_queryset(queryset, params):
+    """
+    Apply the common query filters in ``params`` to a queryset.
+
+    start_date/end_date may be in any month_year format; only their YYYY-MM
+    part is used, compared against month_index. Names are resolved to
+    dimension ids; an unknown name matches nothing.
+    """
+    first, last = month_range(params)
+    borough = params.get('borough')
+    offence_group = params.get('offence_group')
+    offence_groups = params.get('offence_groups')  # comma-separated
+    offence_subgroup = params.get('offence_subgroup')
+    area_type = params.get('area_type')
+
+    if first is not None:
+        queryset = queryset.filter(month_index__gte=first)
+    if last is not None:
+        queryset = queryset.filter(month_index__lte=last)
     if borough:
-        queryset = queryset.filter(area_name=borough)
+        queryset = queryset.filter(area_id=dimension_id(Area, borough))
     if offence_group:
-        queryset = queryset.filter(offence_group=offence_group)
+        queryset = queryset.filter(offence_group_id=dimension_id(OffenceGroup, offence_group))
     elif offence_groups:
         groups_list = [g.strip() for g in offence_groups.split(',') if g.strip()]
-        queryset = queryset.filter(offence_group__in=groups_list)
+        queryset = queryset.filter(offence_group_id__in=dimension_ids(OffenceGroup, groups_list))
     if offence_subgroup:
-        queryset = queryset.filter(offence_subgroup=offence_subgroup)
+        queryset = queryset.filter(
+            offence_subgroup_id=dimension_id(OffenceSubgroup, offence_subgroup)
+        )
     if area_type:
         queryset = queryset.filter(area_type=area_type)
 
     return queryset
 
 
-@api_view(['GET'])
-def summary(request):
+def _distinct_names(model, queryset, field):
+    """Sorted names of the distinct dimension ids in ``field`` of a queryset."""
+    names = dimension_names(model)
+    return sorted(names[pk] for pk in queryset.values_list(field, flat=True).distinct())
+
+
+def _ranked(totals):
     """
-    Returns KPI summary data: total offences, 12-month and 1-month trends.
+    (key, total) pairs ordered by descending total, ties in ascending key
+    order (the order the cube's ranked_totals uses too).
 
-    In "snapshot" mode (single month selected), trends compare that month
-    to 1 and 12 months prior using the same borough/offence filters.
-    In "range" mode (multiple months), trends compare halves of the range.
+    Ties used to come out in whatever order SQLite's plan produced: name
+    order when GROUP BY walked the area_name index. That order is now
+    explicit, so it no longer depends on the indexes or the backend.
     """
-    from dateutil.relativedelta import relativedelta
-    from datetime import datetime
+    return sorted(sorted(totals.items()), key=lambda item: -item[1])
 
-    qs = _apply_filters(CrimeRecord.objects.all(), request)
 
-    # Get all distinct months in filtered data, sorted
-    months = sorted(
-        qs.values_list('month_year', flat=True).distinct()
-    )
+def _ranked_names(model, queryset, field):
+    """
+    SUM(count) per dimension id in ``field``, grouped in SQL on the id and
+    returned as ranked (name, total) pairs.
+    """
+    names = dimension_names(model)
+    totals = queryset.values(field).annotate(total=Sum('count')).values_list(field, 'total')
+    return _ranked({names[pk]: total for pk, total in totals})
+
+
+def _month_labels():
+    """
+    {month_index: month_year} of every month in the live data. Read from
+    ImportedMonth, which has one row per month, so it costs the same however
+    much history is kept; data imported before month checksums existed is
+    scanned for instead.
+    """
+    labels = dict(ImportedMonth.objects.values_list('month_index', 'month_year'))
+    if not labels:
+        labels = dict(
+            _source({}, 'month_index', 'month_year')
+            .values_list('month_index', 'month_year')
+            .distinct()
+        )
+    return labels
+
+
+def _use_cube():
+    """True when aggregates are served from the in-memory cube."""
+    return settings.CRIME_QUERY_BACKEND == 'cube'
+
+
+def _change_pct(current, previous):
+    """Percentage change rounded to 2dp, or None if there is no baseline."""
+    if previous > 0:
+        return round(((current - previous) / previous) * 100, 2)
+    return None
+
 
+def _summarize(month_totals, comparison_totals, labels):
+    """
+    Build the summary payload from per-month totals.
+
+    month_totals maps the month index of every month present in the
+    filtered data to its total. comparison_totals maps month indexes to
+    totals under the same borough/offence filters but without date
+    constraints (used in snapshot mode). labels maps month indexes to their
+    month_year values.
+    """
+    months = sorted(month_totals)
     if not months:
-        return Response({
+        return {
             'total_offences': 0,
             'twelve_month_change_pct': None,
             'one_month_change_pct': None,
             'latest_month': '',
             'earliest_month': '',
-        })
-
-    latest_month = months[-1]
-    earliest_month = months[0]
-
-    # Total offences
-    total = qs.aggregate(total=Sum('count'))['total'] or 0
+        }
 
+    total = sum(month_totals.values())
     twelve_month_change = None
     one_month_change = None
 
-    # Build a "comparison" queryset that uses same non-date filters
-    def _comparison_qs():
-        """Same filters as main qs but without date constraints."""
-        cqs = CrimeRecord.objects.all()
-        borough = request.query_params.get('borough')
-        offence_group = request.query_params.get('offence_group')
-        offence_subgroup = request.query_params.get('offence_subgroup')
-        area_type = request.query_params.get('area_type')
-        if borough:
-            cqs = cqs.filter(area_name=borough)
-        if offence_group:
-            cqs = cqs.filter(offence_group=offence_group)
-        if offence_subgroup:
-            cqs = cqs.filter(offence_subgroup=offence_subgroup)
-        if area_type:
-            cqs = cqs.filter(area_type=area_type)
-        return cqs
-
     if len(months) == 1:
         # SNAPSHOT MODE: compare single month vs 1-month-ago and 12-months-ago
-        try:
-            # Handle YYYY-MM-DD HH:MM:SS, YYYY-MM-DD and YYYY-MM formats
-            if len(latest_month) >= 19:
-                ref_date = datetime.strptime(latest_month[:19], '%Y-%m-%d %H:%M:%S')
-                date_fmt = '%Y-%m-%d %H:%M:%S'
-            elif len(latest_month) == 10:  # YYYY-MM-DD
-                ref_date = datetime.strptime(latest_month, '%Y-%m-%d')
-                date_fmt = '%Y-%m-%d'
-            else:
-                ref_date = datetime.strptime(latest_month, '%Y-%m')
-                date_fmt = '%Y-%m'
-        except ValueError:
-            ref_date = None
-
-        if ref_date:
-            cqs = _comparison_qs()
-
-            # Generate comparison date strings in same format as data
-            # (date_fmt is computed above)
-
-            # 1-month trend
-            prev_1_date = ref_date - relativedelta(months=1)
-            prev_1 = prev_1_date.strftime(date_fmt)
-            current_total = total  # already computed
-            prev_1_total = cqs.filter(month_year=prev_1).aggregate(
-                total=Sum('count'))['total'] or 0
-            if prev_1_total > 0:
-                one_month_change = round(
-                    ((current_total - prev_1_total) / prev_1_total) * 100, 2
-                )
-
-            # 12-month trend
-            prev_12_date = ref_date - relativedelta(months=12)
-            prev_12 = prev_12_date.strftime(date_fmt)
-            prev_12_total = cqs.filter(month_year=prev_12).aggregate(
-                total=Sum('count'))['total'] or 0
-            if prev_12_total > 0:
-                twelve_month_change = round(
-                    ((current_total - prev_12_total) / prev_12_total) * 100, 2
-                )
+        month = months[-1]
+        one_month_change = _change_pct(total, comparison_totals.get(month - 1, 0))
+        twelve_month_change = _change_pct(total, comparison_totals.get(month - 12, 0))
     else:
-        # RANGE MODE: original logic
-        # 12-month trend: compare last 12 months vs previous 12 months
+        # RANGE MODE: last 12 months vs previous 12, last month vs month before
         if len(months) >= 24:
-            recent_12 = months[-12:]
-            prev_12 = months[-24:-12]
-
-            recent_total = qs.filter(month_year__in=recent_12).aggregate(
-                total=Sum('count'))['total'] or 0
-            prev_total = qs.filter(month_year__in=prev_12).aggregate(
-                total=Sum('count'))['total'] or 0
-
-            if prev_total > 0:
-                twelve_month_change = round(
-                    ((recent_total - prev_total) / prev_total) * 100, 2
-                )
-
-        # 1-month trend: compare last month vs month before
-        if len(months) >= 2:
-            last_month = months[-1]
-            prev_month = months[-2]
-
-            last_total = qs.filter(month_year=last_month).aggregate(
-                total=Sum('count'))['total'] or 0
-            prev_total = qs.filter(month_year=prev_month).aggregate(
-                total=Sum('count'))['total'] or 0
-
-            if prev_total > 0:
-                one_month_change = round(
-                    ((last_total - prev_total) / prev_total) * 100, 2
-                )
-
-    data = {
+            recent_total = sum(month_totals[m] for m in months[-12:])
+            prev_total = sum(month_totals[m] for m in months[-24:-12])
+            twelve_month_change = _change_pct(recent_total, prev_total)
+        one_month_change = _change_pct(
+            month_totals[months[-1]], month_totals[months[-2]]
+        )
+
+    return {
         'total_offences': total,
         'twelve_month_change_pct': twelve_month_change,
         'one_month_change_pct': one_month_change,
-        'latest_month': latest_month,
-        'earliest_month': earliest_month,
+        'latest_month': labels[months[-1]],
+        'earliest_month': labels[months[0]],
     }
+
+
+def _summary_window(params):
+    """
+    Date window the summary needs: the selected months plus the months that
+    snapshot mode compares against.
+
+    Returns (dates, months): for a single-month selection ``months`` lists
+    the month indexes of that month, 1 month and 12 months before it and
+    ``dates`` is empty; otherwise ``months`` is None and ``dates`` holds
+    start_date/end_date as given (see _snapshot_comparisons).
+    """
+    first, last = month_range(params)
+    if first is not None and first == last:
+        return {}, [first, first - 1, first - 12]
+    return {'start_date': params.get('start_date'), 'end_date': params.get('end_date')}, None
+
+
+def _snapshot_comparisons(params, month_totals, comparison_totals):
+    """
+    Add the totals snapshot mode compares against to comparison_totals when
+    a date range holds a single month of data: the months before it that
+    fall outside the range were not queried.
+    """
+    first, last = month_range(params)
+    if len(month_totals) != 1 or (first is not None and first == last):
+        return
+    (month,) = month_totals
+    missing = [
+        m for m in (month - 1, month - 12)
+        if (first is not None and m < first) or (last is not None and m > last)
+    ]
+    if not missing:
+        return
+    base = {
+        key: params.get(key)
+        for key in ('borough', 'offence_group', 'offence_subgroup', 'area_type')
+    }
+    if _use_cube():
+        cube = get_cube()
+        indexes = dict(zip(cube.labels['month_year'], cube.month_keys))
+        rows = [
+            (indexes[label], total)
+            for label, total in cube.group_totals('month_year', base, months=missing)
+        ]
+    else:
+        rows = (
+            _filter_queryset(_source(base, 'month_index'), base)
+            .filter(month_index__in=missing)
+            .values('month_index')
+            .annotate(total=Sum('count'))
+            .values_list('month_index', 'total')
+        )
+    comparison_totals.update(rows)
+
+
+def _summary_month_totals(params):
+    """
+    Per-month totals for the summary KPIs, as (month_totals,
+    comparison_totals, labels) for _summarize, from a single grouped query.
+
+    Snapshot comparisons use the same borough/offence filters but ignore
+    offence_groups, so when that filter is active the selected groups are
+    summed with a conditional aggregate alongside the unfiltered total.
+    """
+    first, last = month_range(params)
+    offence_groups = None
+    if not params.get('offence_group') and params.get('offence_groups'):
+        offence_groups = [
+            g.strip() for g in params.get('offence_groups').split(',') if g.strip()
+        ]
+
+    def in_range(month):
+        return not (first is not None and month < first) and not (last is not None and month > last)
+
+    if _use_cube():
+        cube = get_cube()
+        comparison_params = {
+            key: params.get(key)
+            for key in ('borough', 'offence_group', 'offence_subgroup', 'area_type')
+        }
+        indexes = dict(zip(cube.labels['month_year'], cube.month_keys))
+        month_totals = {
+            indexes[label]: total for label, total in cube.group_totals('month_year', params)
+        }
+        comparison_totals = {
+            indexes[label]: total
+            for label, total in cube.group_totals('month_year', comparison_params)
+        }
+        return month_totals, comparison_totals, dict(zip(cube.month_keys, cube.labels['month_year']))
+
+    dates, months = _summary_window(params)
+    base = {
+        **dates,
+        'borough': params.get('borough'),
+        'offence_group': params.get('offence_group'),
+        'offence_subgroup': params.get('offence_subgroup'),
+        'area_type': params.get('area_type'),
+    }
+    columns = ('month_index', 'month_year')
+    if offence_groups is not None:
+        columns += ('offence_group',)
+    qs = _filter_queryset(_source(base, *columns), base)
+    if months is not None:
+        qs = qs.filter(month_index__in=months)
+
+    labels = {}
+    by_month = qs.values('month_index', 'month_year')
+    if offence_groups is None:
+        rows = by_month.annotate(total=Sum('count')).values_list(
+            'month_index', 'month_year', 'total'
+        )
+        comparison_totals = {}
+        for month, label, total in rows:
+            comparison_totals[month] = total
+            labels[month] = label
+        month_totals = {
+            month: total for month, total in comparison_totals.items() if in_range(month)
+        }
+        _snapshot_comparisons(params, month_totals, comparison_totals)
+        return month_totals, comparison_totals, labels
+
+    selected = Q(offence_group_id__in=dimension_ids(OffenceGroup, offence_groups))
+    rows = by_month.annotate(
+        total=Sum('count'),
+        selected_total=Sum('count', filter=selected),
+        selected_rows=Count('pk', filter=selected),
+    ).values_list('month_index', 'month_year', 'total', 'selected_total', 'selected_rows')
+
+    month_totals = {}
+    comparison_totals = {}
+    for month, label, total, selected_total, selected_rows in rows:
+        comparison_totals[month] = total
+        labels[month] = label
+        if selected_rows and in_range(month):
+            month_totals[month] = selected_total or 0
+    _snapshot_comparisons(params, month_totals, comparison_totals)
+    return month_totals, comparison_totals, labels
+
+
+@api_view(['GET'])
+@conditional_response
+@cache_response
+def summary(request):
+    """
+    Returns KPI summary data: total offences, 12-month and 1-month trends.
+
+    In "snapshot" mode (single month selected), trends compare that month
+    to 1 and 12 months prior using the same borough/offence filters.
+    In "range" mode (multiple months), trends compare halves of the range.
+    """
+    data = _summarize(*_summary_month_totals(request.query_params))
     serializer = SummarySerializer(data)
     return Response(serializer.data)
 
 
 @api_view(['GET'])
+@conditional_response
+@cache_response
 def boroughs(request):
     """Returns list of unique borough/area names."""
     area_type = request.query_params.get('area_type', '')
-    qs = CrimeRecord.objects.all()
+    if _use_cube():
+        return Response(get_cube().distinct('area_name', {'area_type': area_type}))
+
+    qs = _source({'area_type': area_type}, 'area')
     if area_type:
         qs = qs.filter(area_type=area_type)
-    names = sorted(
-        qs.values_list('area_name', flat=True).distinct()
-    )
+    names = _distinct_names(Area, qs, 'area')
     return Response(names)
 
 
 @api_view(['GET'])
+@conditional_response
+@cache_response
 def area_types(request):
     """Returns list of unique area types."""
+    if _use_cube():
+        return Response(get_cube().distinct('area_type'))
+
     types = sorted(
-        CrimeRecord.objects.values_list('area_type', flat=True).distinct()
+        _source({}, 'area_type').values_list('area_type', flat=True).distinct()
     )
     return Response(types)
 
 
 @api_view(['GET'])
+@conditional_response
+@cache_response
 def offence_groups(request):
     """Returns list of unique offence groups."""
-    groups = sorted(
-        CrimeRecord.objects
-        .exclude(offence_group='Nfib Fraud')
-        .values_list('offence_group', flat=True)
-        .distinct()
-    )
-    return Response(groups)
+    if _use_cube():
+        return Response([
+            g for g in get_cube().distinct('offence_group') if g != 'Nfib Fraud'
+        ])
+
+    groups = _distinct_names(OffenceGroup, _source({}, 'offence_group'), 'offence_group')
+    return Response([g for g in groups if g != 'Nfib Fraud'])
 
 
 @api_view(['GET'])
+@conditional_response
+@cache_response
 def offence_subgroups(request):
     """Returns list of unique offence subgroups, optionally filtered by group."""
-    qs = CrimeRecord.objects.all()
     group = request.query_params.get('offence_group')
+    if _use_cube():
+        return Response(get_cube().distinct('offence_subgroup', {'offence_group': group}))
+
+    qs = _source({'offence_group': group}, 'offence_subgroup')
     if group:
-        qs = qs.filter(offence_group=group)
-    subgroups = sorted(
-        qs.values_list('offence_subgroup', flat=True).distinct()
-    )
+        qs = qs.filter(offence_group_id=dimension_id(OffenceGroup, group))
+    subgroups = _distinct_names(OffenceSubgroup, qs, 'offence_subgroup')
     return Response(subgroups)
 
 
 @api_view(['GET'])
+@conditional_response
+@cache_response
 def date_range(request):
     """Returns the min and max month_year values in the data."""
-    months = sorted(
-        CrimeRecord.objects.values_list('month_year', flat=True).distinct()
-    )
+    if _use_cube():
+        months = get_cube().distinct('month_year')
+    else:
+        labels = _month_labels()
+        months = [labels[month] for month in sorted(labels)]
     return Response({
         'months': months,
         'earliest': months[0] if months else '',
@@ -241,86 +436,324 @@ def date_range(request):
 
 
 @api_view(['GET'])
+@conditional_response
+@cache_response
 def borough_totals(request):
     """
     Returns aggregated crime counts per borough/area for map shading.
     """
-    qs = _apply_filters(CrimeRecord.objects.all(), request)
-
-    totals = (
-        qs.values('area_name')
-        .annotate(total_count=Sum('count'))
-        .order_by('-total_count')
-    )
+    if _use_cube():
+        ranked = get_cube().ranked_totals('area_name', request.query_params)
+    else:
+        qs = _apply_filters(_source(request.query_params, 'area'), request)
+        ranked = _ranked_names(Area, qs, 'area')
+    totals = [{'area_name': name, 'total_count': total} for name, total in ranked]
 
     serializer = BoroughTotalSerializer(totals, many=True)
     return Response(serializer.data)
 
 
 @api_view(['GET'])
+@conditional_response
+@cache_response
 def time_series(request):
     """
     Returns monthly aggregated offence counts for line chart.
     """
-    qs = _apply_filters(CrimeRecord.objects.all(), request)
-
-    series = (
-        qs.values('month_year')
-        .annotate(total_count=Sum('count'))
-        .order_by('month_year')
-    )
+    if _use_cube():
+        series = [
+            {'month_year': month, 'total_count': total}
+            for month, total in get_cube().group_totals('month_year', request.query_params)
+        ]
+    else:
+        qs = _apply_filters(_source(request.query_params, 'month_index', 'month_year'), request)
+        series = (
+            qs.values('month_index', 'month_year')
+            .annotate(total_count=Sum('count'))
+            .order_by('month_index')
+        )
 
     serializer = TimeSeriesSerializer(series, many=True)
     return Response(serializer.data)
 
 
 @api_view(['GET'])
+@conditional_response
+@cache_response
 def offence_breakdown(request):
     """
     Returns offence counts grouped by offence_group OR offence_subgroup.
     If 'offence_group' is filtered, we break down by subgroup.
     Otherwise, we break down by group.
     """
-    qs = _apply_filters(CrimeRecord.objects.all(), request)
-    
     # Check if we are filtering by a specific group
     group_filter = request.query_params.get('offence_group')
-    
-    if group_filter:
-        # Breakdown by subgroup
-        breakdown = (
-            qs.values('offence_subgroup')
-            .annotate(total_count=Sum('count'))
-            .order_by('-total_count')
-        )
-        # Rename key for serializer
-        data = [
-            {'label': item['offence_subgroup'], 'total_count': item['total_count']}
-            for item in breakdown
+    field = 'offence_subgroup' if group_filter else 'offence_group'
+
+    if _use_cube():
+        ranked = get_cube().ranked_totals(field, request.query_params)
+    else:
+        qs = _apply_filters(_source(request.query_params, field), request)
+        model = OffenceSubgroup if group_filter else OffenceGroup
+        ranked = _ranked_names(model, qs, field)
+    data = [{'label': label, 'total_count': total} for label, total in ranked]
+
+    serializer = OffenceBreakdownSerializer(data, many=True)
+    return Response(serializer.data)
+
+
+def _dashboard_rows(params, label_field):
+    """
+    (month_index, month_year, area, label, count) rows for the dashboard
+    bundle, from a single query. Rows may repeat a (month, area, label) key;
+    callers sum them. area and label are dimension ids, or names when the
+    rows come from the cube.
+
+    Covers the selected months plus those the summary compares against.
+    borough and offence_groups are left unfiltered so the map and the
+    breakdown can be derived from the same rows.
+    """
+    dates, months = _summary_window(params)
+    base = {
+        **dates,
+        'area_type': params.get('area_type'),
+        'offence_group': params.get('offence_group'),
+        'offence_subgroup': params.get('offence_subgroup'),
+    }
+
+    if _use_cube():
+        cube = get_cube()
+        indexes = dict(zip(cube.labels['month_year'], cube.month_keys))
+        fields = ('month_year', 'area_name', label_field)
+        return [
+            (indexes[month], month, area, label, total)
+            for (month, area, label), total in cube.group_totals(fields, base, months=months)
         ]
+
+    fields = ('month_index', 'month_year', 'area', label_field)
+    qs = _filter_queryset(_source(base, *fields), base)
+    if months is not None:
+        qs = qs.filter(month_index__in=months)
+    # The rows are summed in _dashboard anyway, so read them straight from
+    # the (usually rollup) table instead of grouping again in SQL
+    return qs.values_list(*fields, 'count')
+
+
+def _dashboard(params):
+    """
+    Summary, borough totals (ignoring the borough filter) and offence
+    breakdown (ignoring offence_groups) for the Overview page, computed
+    from one grouped result set.
+    """
+    first, last = month_range(params)
+    borough = params.get('borough')
+    offence_group = params.get('offence_group')
+    offence_groups = params.get('offence_groups')
+
+    groups_list = None
+    if not offence_group and offence_groups:
+        groups_list = {g.strip() for g in offence_groups.split(',') if g.strip()}
+
+    label_field = 'offence_subgroup' if offence_group else 'offence_group'
+
+    # SQL rows carry dimension ids: compare on ids and name the totals last
+    area_names = label_names = None
+    if not _use_cube():
+        area_names = dimension_names(Area)
+        label_names = dimension_names(OffenceSubgroup if offence_group else OffenceGroup)
+        if borough:
+            # An unknown borough matches no rows
+            borough = dimension_id(Area, borough) or -1
+        if groups_list is not None:
+            groups_list = set(dimension_ids(OffenceGroup, groups_list))
+
+    def named(totals, names):
+        if names is None:
+            return totals
+        return {names[key]: total for key, total in totals.items()}
+
+    month_totals = {}
+    comparison_totals = {}
+    month_labels = {}
+    area_totals = {}
+    label_totals = {}
+    for month, month_year, area, label, total in _dashboard_rows(params, label_field):
+        month_labels[month] = month_year
+        in_borough = not borough or area == borough
+        if in_borough:
+            comparison_totals[month] = comparison_totals.get(month, 0) + total
+        if (first is not None and month < first) or (last is not None and month > last):
+            continue
+        if groups_list is None or label in groups_list:
+            area_totals[area] = area_totals.get(area, 0) + total
+            if in_borough:
+                month_totals[month] = month_totals.get(month, 0) + total
+        if in_borough:
+            label_totals[label] = label_totals.get(label, 0) + total
+
+    _snapshot_comparisons(params, month_totals, comparison_totals)
+    return {
+        'summary': _summarize(month_totals, comparison_totals, month_labels),
+        'borough_totals': [
+            {'area_name': area, 'total_count': total}
+            for area, total in _ranked(named(area_totals, area_names))
+        ],
+        'offence_breakdown': [
+            {'label': label, 'total_count': total}
+            for label, total in _ranked(named(label_totals, label_names))
+        ],
+    }
+
+
+@api_view(['GET'])
+@conditional_response
+@cache_response
+def dashboard(request):
+    """
+    Everything the Overview page shows for one filter selection, in one
+    response:
+      - summary: as /summary/ with the same params
+      - borough_totals: as /borough-totals/ without the borough filter
+      - offence_breakdown: as /offence-breakdown/ without offence_groups
+    """
+    serializer = DashboardSerializer(_dashboard(request.query_params))
+    return Response(serializer.data)
+
+
+# Most postcodes (or points) one bulk ranking request may carry
+BULK_RANKING_MAX_POSTCODES = 100000
+
+# NDJSON lines per chunk of a streamed bulk ranking response
+BULK_RANKING_CHUNK = 500
+
+UNKNOWN_POSTCODE_ERROR = (
+    'That postcode was not recognised as a London postcode. '
+    'Please enter a valid London postcode (e.g. E1 6AN).'
+)
+
+MISSING_LOCATION_ERROR = 'Please provide a latitude (lat) and longitude (lon).'
+OUTSIDE_LONDON_ERROR = 'That location is not in a London borough.'
+BOUNDARIES_UNAVAILABLE_ERROR = 'Lookups by location are not available.'
+
+
+def _ranking_window(value):
+    """
+    The ranking window (months) a request asks for, from a query param or
+    JSON value; None if it is not one of CRIME_RANKING_WINDOWS.
+    """
+    if value is None or value == '':
+        return default_window()
+    try:
+        window = int(value)
+    except (TypeError, ValueError):
+        return None
+    return window if window in settings.CRIME_RANKING_WINDOWS else None
+
+
+def _window_error():
+    windows = ', '.join(str(window) for window in settings.CRIME_RANKING_WINDOWS)
+    return f'window must be one of {windows} (months).'
+
+
+def _ranking_months(window):
+    """({month_index: month_year}, the indexes of the most recent ``window`` months)."""
+    if _use_cube():
+        cube = get_cube()
+        labels = dict(zip(cube.month_keys, cube.labels['month_year']))
     else:
-        # Breakdown by group
-        breakdown = (
-            qs.values('offence_group')
-            .annotate(total_count=Sum('count'))
-            .order_by('-total_count')
+        labels = _month_labels()
+    months = sorted(labels)
+    return labels, months[-window:]
+
+
+def _compute_ranking(offence_group, window):
+    """
+    Boroughs ranked by crime over the most recent ``window`` months, for
+    one offence group (empty or 'OVERALL' for all crime). Looked up in the
+    rankings precomputed at import time (crime/rankings.py), or aggregated
+    when the live data has none.
+
+    Returns a dict of 'offence_group' (the display name), 'period' and
+    'ranked', a list of {'area_name', 'total_count'} in rank order. The
+    'ranked' items may be shared with other requests: do not modify them.
+    """
+    # If a specific offence group is selected (not "OVERALL"), filter by it
+    is_overall = (not offence_group or offence_group == 'OVERALL')
+    display_name = 'Overall' if is_overall else offence_group
+
+    rankings = precomputed_rankings()
+    overall = rankings.get((window, None))
+    if overall is not None:
+        if is_overall:
+            ranking = overall
+        else:
+            group_id = dimension_id(OffenceGroup, offence_group)
+            # Groups with no borough crime in the window have no ranking
+            ranking = rankings.get((window, group_id)) if group_id is not None else None
+        return {
+            'offence_group': display_name,
+            'period': overall['period'],
+            'ranked': ranking['ranked'] if ranking is not None else [],
+        }
+
+    labels, recent_months = _ranking_months(window)
+    if _use_cube():
+        params = {'area_type': 'Borough'}
+        if recent_months:
+            params['start_date'] = month_label(recent_months[0])
+        if not is_overall:
+            params['offence_group'] = offence_group
+        ranked = [
+            {'area_name': name, 'total_count': total}
+            for name, total in get_cube().ranked_totals('area_name', params)
+            if name not in RANKING_EXCLUDED
+        ]
+    else:
+        # Base filter
+        base_filter = {
+            'area_type': 'Borough',
+            'month_index__in': recent_months,
+        }
+        if not is_overall:
+            base_filter['offence_group_id'] = dimension_id(OffenceGroup, offence_group)
+
+        # Aggregate by borough, excluding Other / NK and Unknown
+        source = _source(
+            {'area_type': 'Borough', 'offence_group': None if is_overall else offence_group},
+            'area', 'month_index',
+        )
+        qs = (
+            source
+            .filter(**base_filter)
+            .exclude(area_id__in=dimension_ids(Area, RANKING_EXCLUDED))
         )
-        # Rename key for serializer
-        data = [
-            {'label': item['offence_group'], 'total_count': item['total_count']}
-            for item in breakdown
+        ranked = [
+            {'area_name': name, 'total_count': total}
+            for name, total in _ranked_names(Area, qs, 'area')
         ]
 
-    serializer = OffenceBreakdownSerializer(data, many=True)
-    return Response(serializer.data)
+    return {
+        'offence_group': display_name,
+        'period': (
+            f'{labels[recent_months[0]]} to {labels[recent_months[-1]]}' if recent_months else ''
+        ),
+        'ranked': ranked,
+    }
+
+
+def _no_data_error(borough, ranking):
+    return f'No crime data found for {borough} in the category "{ranking["offence_group"]}".'
 
 
 @api_view(['GET'])
+@conditional_response(inputs=[postcode_index_state])
+@cache_response(inputs=[postcode_index_state])
 def borough_ranking(request):
     """
-    Given a postcode and optionally an offence_group, return:
+    Given a postcode and optionally an offence_group and a window, return:
       - The matched borough
-      - Its rank among all boroughs for that crime type (most recent 12 months)
+      - Its rank among all boroughs for that crime type (over the most
+        recent ``window`` months, one of CRIME_RANKING_WINDOWS; 12 by default)
       - A full ranked list for charting
     If offence_group is empty or 'OVERALL', ranks by total crime across all types.
     """
@@ -329,71 +762,270 @@ def borough_ranking(request):
     postcode = request.query_params.get('postcode', '').strip()
     offence_group = request.query_params.get('offence_group', '').strip()
 
+    window = _ranking_window(request.query_params.get('window'))
+
     if not postcode:
         return Response({'error': 'Please provide a postcode.'}, status=400)
+    if window is None:
+        return Response({'error': _window_error()}, status=400)
 
     borough = lookup_borough(postcode)
     if not borough:
-        return Response(
-            {'error': 'That postcode was not recognised as a London postcode. '
-                       'Please enter a valid London postcode (e.g. E1 6AN).'},
-            status=400
-        )
-
-    # Use the most recent 12 months of data
-    months = sorted(
-        CrimeRecord.objects.values_list('month_year', flat=True).distinct()
-    )
-    recent_months = months[-12:] if len(months) >= 12 else months
+        return Response({'error': UNKNOWN_POSTCODE_ERROR}, status=400)
 
-    # Base filter
-    base_filter = {
-        'area_type': 'Borough',
-        'month_year__in': recent_months,
-    }
+    return _ranking_response(borough, offence_group, window)
 
-    # If a specific offence group is selected (not "OVERALL"), filter by it
-    is_overall = (not offence_group or offence_group == 'OVERALL')
-    if not is_overall:
-        base_filter['offence_group'] = offence_group
-
-    # Aggregate by borough, excluding Other / NK and Unknown
-    qs = (
-        CrimeRecord.objects
-        .filter(**base_filter)
-        .exclude(area_name__in=['Other / NK', 'Unknown'])
-        .values('area_name')
-        .annotate(total_count=Sum('count'))
-        .order_by('-total_count')
-    )
 
-    ranked = list(qs)
+def _ranking_response(borough, offence_group, window):
+    """The /borough-ranking/ response for a borough, or its 404."""
+    ranking = _compute_ranking(offence_group, window)
+    ranked = [
+        {**item, 'is_user_borough': item['area_name'] == borough} for item in ranking['ranked']
+    ]
     total_boroughs = len(ranked)
 
     # Find the user's borough rank
     user_rank = None
     user_count = 0
     for i, item in enumerate(ranked, start=1):
-        item['is_user_borough'] = (item['area_name'] == borough)
-        if item['area_name'] == borough:
+        if item['is_user_borough']:
             user_rank = i
             user_count = item['total_count']
 
-    display_group = 'Overall' if is_overall else offence_group
-
     if user_rank is None:
-        return Response(
-            {'error': f'No crime data found for {borough} in the category "{display_group}".'},
-            status=404
-        )
+        return Response({'error': _no_data_error(borough, ranking)}, status=404)
 
     return Response({
         'borough': borough,
         'rank': user_rank,
         'total_boroughs': total_boroughs,
         'borough_count': user_count,
-        'offence_group': display_group,
-        'period': f'{recent_months[0]} to {recent_months[-1]}',
+        'offence_group': ranking['offence_group'],
+        'period': ranking['period'],
         'all_boroughs': ranked,
     })
 
+
+def _coordinate(value, limit):
+    """``value`` as a float, or None if it is not a number from -limit to limit."""
+    if isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    # NaN fails both comparisons
+    return value if -limit <= value <= limit else None
+
+
+@api_view(['GET'])
+@conditional_response(inputs=[boundaries_state])
+def borough_ranking_location(request):
+    """
+    As /borough-ranking/, for the borough containing a location given as
+    lat and lon (WGS84 degrees) instead of a postcode. The borough is found
+    in the boundaries the frontend's map draws (crime/borough_boundaries.py).
+
+    Not in the response cache: locations rarely repeat exactly, and would
+    push out the entries that do.
+    """
+    lat = _coordinate(request.query_params.get('lat'), 90)
+    lon = _coordinate(request.query_params.get('lon'), 180)
+    offence_group = request.query_params.get('offence_group', '').strip()
+    window = _ranking_window(request.query_params.get('window'))
+
+    if lat is None or lon is None:
+        return Response({'error': MISSING_LOCATION_ERROR}, status=400)
+    if window is None:
+        return Response({'error': _window_error()}, status=400)
+
+    try:
+        borough = lookup_location(lat, lon)
+    except BoundariesUnavailable:
+        return Response({'error': BOUNDARIES_UNAVAILABLE_ERROR}, status=503)
+    if not borough:
+        return Response({'error': OUTSIDE_LONDON_ERROR}, status=400)
+
+    return _ranking_response(borough, offence_group, window)
+
+
+def _bulk_ranking_record(borough, ranking, position, errors):
+    """
+    The bulk record of one item (without its own fields) for one ranking.
+    ``errors`` is the (missing item, not in a borough) error pair.
+    """
+    record = {'offence_group': ranking['offence_group']}
+    if borough == '':
+        record['error'] = errors[0]
+    elif borough is None:
+        record['error'] = errors[1]
+    elif borough not in position:
+        record.update(borough=borough, error=_no_data_error(borough, ranking))
+    else:
+        rank, count = position[borough]
+        record.update(
+            borough=borough,
+            rank=rank,
+            total_boroughs=len(position),
+            borough_count=count,
+            period=ranking['period'],
+        )
+    return record
+
+
+def _bulk_ranking_lines(located, rankings, errors):
+    """
+    NDJSON lines, one per item and ranking: the borough's rank as in
+    /borough-ranking/ (without the full list), or an 'error'.
+
+    ``located`` yields a (head, borough) pair per item: head opens its
+    record with the item's own fields (e.g. '{"postcode": "E1 6AN", '),
+    borough is '' for a missing item and None for one in no borough.
+    ``errors`` is the (missing item, not in a borough) error pair.
+
+    Records differ only in the head once the borough is known, so each
+    (borough, ranking) record is encoded once and reused.
+    """
+    positions = [
+        {item['area_name']: (rank, item['total_count']) for rank, item in enumerate(ranking['ranked'], 1)}
+        for ranking in rankings
+    ]
+    encoded = {}
+    for head, borough in located:
+        for i, ranking in enumerate(rankings):
+            tail = encoded.get((borough, i))
+            if tail is None:
+                record = _bulk_ranking_record(borough, ranking, positions[i], errors)
+                tail = encoded[borough, i] = json.dumps(record)[1:] + '\n'
+            yield head + tail
+
+
+def _located_postcodes(postcodes):
+    """(head, borough) of each postcode, for _bulk_ranking_lines."""
+    from .postcode_mapping import lookup_borough
+
+    boroughs = {}
+    for postcode in postcodes:
+        if postcode not in boroughs:
+            boroughs[postcode] = lookup_borough(postcode) if postcode else ''
+        yield '{"postcode": ' + json.dumps(postcode) + ', ', boroughs[postcode]
+
+
+def _located_points(points, boundaries):
+    """(head, borough) of each {'lat', 'lon'} point, for _bulk_ranking_lines."""
+    for point in points:
+        if not isinstance(point, dict):
+            point = {}
+        lat = _coordinate(point.get('lat'), 90)
+        lon = _coordinate(point.get('lon'), 180)
+        head = (
+            '{"lat": ' + json.dumps(point.get('lat')) + ', "lon": '
+            + json.dumps(point.get('lon')) + ', '
+        )
+        if lat is None or lon is None:
+            yield head, ''
+        else:
+            yield head, boundaries.borough(lon, lat)
+
+
+def _chunked(lines):
+    """Join lines into chunks of BULK_RANKING_CHUNK for streaming."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == BULK_RANKING_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _bulk_rankings(data):
+    """
+    (the rankings a bulk request's 'offence_groups' and 'window' ask for,
+    None), or (None, the error response) if they are invalid.
+    """
+    offence_groups = data.get('offence_groups') or ['OVERALL']
+    if not isinstance(offence_groups, list) or not all(isinstance(g, str) for g in offence_groups):
+        return None, Response({'error': 'offence_groups must be a list of names.'}, status=400)
+    window = _ranking_window(data.get('window'))
+    if window is None:
+        return None, Response({'error': _window_error()}, status=400)
+    return [_compute_ranking(group.strip(), window) for group in offence_groups], None
+
+
+@api_view(['POST'])
+def borough_ranking_bulk(request):
+    """
+    Rank the boroughs of many postcodes at once. Takes a JSON body of
+    'postcodes' (a list), 'offence_groups' (a list; defaults to
+    ['OVERALL']) and optionally 'window' (as for /borough-ranking/), and
+    streams NDJSON: one /borough-ranking/ record per postcode and offence
+    group, in request order, without the full ranked list. Postcodes that
+    cannot be ranked get an 'error' instead.
+
+    Each offence group's ranking is computed once for the whole batch.
+    """
+    data = request.data if isinstance(request.data, dict) else {}
+    postcodes = data.get('postcodes')
+    if (
+        not isinstance(postcodes, list) or not postcodes
+        or not all(isinstance(p, str) for p in postcodes)
+    ):
+        return Response({'error': 'Please provide a list of postcodes.'}, status=400)
+    if len(postcodes) > BULK_RANKING_MAX_POSTCODES:
+        return Response(
+            {'error': f'At most {BULK_RANKING_MAX_POSTCODES} postcodes per request.'},
+            status=400,
+        )
+    rankings, error = _bulk_rankings(data)
+    if error is not None:
+        return error
+
+    located = _located_postcodes([p.strip() for p in postcodes])
+    lines = _bulk_ranking_lines(
+        located, rankings, ('Please provide a postcode.', UNKNOWN_POSTCODE_ERROR),
+    )
+    return StreamingHttpResponse(_chunked(lines), content_type='application/x-ndjson')
+
+
+@api_view(['POST'])
+def borough_ranking_location_bulk(request):
+    """
+    As /borough-ranking/bulk/, for 'points' (a list of {'lat', 'lon'}) in
+    place of postcodes. Each record starts with the point's lat and lon;
+    points that are not valid coordinates get an 'error'.
+    """
+    data = request.data if isinstance(request.data, dict) else {}
+    points = data.get('points')
+    if not isinstance(points, list) or not points:
+        return Response({'error': 'Please provide a list of points.'}, status=400)
+    if len(points) > BULK_RANKING_MAX_POSTCODES:
+        return Response(
+            {'error': f'At most {BULK_RANKING_MAX_POSTCODES} points per request.'},
+            status=400,
+        )
+    rankings, error = _bulk_rankings(data)
+    if error is not None:
+        return error
+    try:
+        boundaries = get_boundaries()
+    except BoundariesUnavailable:
+        return Response({'error': BOUNDARIES_UNAVAILABLE_ERROR}, status=503)
+
+    lines = _bulk_ranking_lines(
+        _located_points(points, boundaries), rankings,
+        (MISSING_LOCATION_ERROR, OUTSIDE_LONDON_ERROR),
+    )
+    return StreamingHttpResponse(_chunked(lines), content_type='application/x-ndjson')
+
+
+def metrics(request):
+    """Prometheus metrics of the crime API, summed over all workers (see crime/metrics.py)."""
+    if not settings.CRIME_METRICS:
+        raise Http404
+    if not scrape_allowed(request):
+        response = HttpResponse('Authentication required\n', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
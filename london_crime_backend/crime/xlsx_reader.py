@@ -0,0 +1,280 @@
+"""
+Fast XLSX reader for the import.
+
+openpyxl's read-only mode still builds a cell object for every value of
+every column. The crime workbook has a dozen columns of which the import
+keeps six, so this reader streams the worksheet XML straight out of the
+zip through expat, the incremental parser under ElementTree, and only
+converts the cells of the wanted columns. Values come out as openpyxl
+would give them (shared strings resolved, date-formatted numbers as
+datetimes), so either reader can feed crime.ingest.
+
+Only what the import needs is supported: the active sheet, and the
+cached values of formula cells rather than the formulas.
+"""
+import posixpath
+import re
+import zipfile
+from xml.etree.ElementTree import fromstring
+from xml.parsers.expat import ParserCreate
+
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import (
+    CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601,
+)
+
+
+MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+RELATIONSHIP_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+PACKAGE_RELATIONSHIP = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+
+# Element names as reported by expat with namespace_separator=' '
+ROW, CELL, VALUE, TEXT, PHONETIC = (
+    f'{MAIN[1:-1]} {tag}' for tag in ('row', 'c', 'v', 't', 'rPh')
+)
+
+# The end tag of a row, with or without a namespace prefix
+ROW_END = re.compile(rb'</(?:[\w.-]+:)?row>')
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _column_index(letters):
+    """0-based column index of a column name ('A' -> 0, 'AA' -> 26)."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _relationships(archive, part):
+    """{id: (type, path)} of the relationships of a package part."""
+    folder, name = posixpath.split(part)
+    rels = fromstring(archive.read(posixpath.join(folder, '_rels', f'{name}.rels')))
+    targets = {}
+    for rel in rels.iter(PACKAGE_RELATIONSHIP):
+        target = rel.get('Target')
+        if target.startswith('/'):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        targets[rel.get('Id')] = (rel.get('Type').rsplit('/', 1)[-1], target)
+    return targets
+
+
+def _styles(archive, path):
+    """(date style ids, timedelta style ids) from the workbook's stylesheet."""
+    if path is None:
+        return set(), set()
+    root = fromstring(archive.read(path))
+    formats = dict(BUILTIN_FORMATS)
+    for fmt in root.iter(f'{MAIN}numFmt'):
+        formats[int(fmt.get('numFmtId'))] = fmt.get('formatCode')
+    dates, timedeltas = set(), set()
+    xfs = root.find(f'{MAIN}cellXfs')
+    for style_id, xf in enumerate(xfs if xfs is not None else ()):
+        code = formats.get(int(xf.get('numFmtId', 0)))
+        if code and is_date_format(code):
+            dates.add(style_id)
+            if is_timedelta_format(code):
+                timedeltas.add(style_id)
+    return dates, timedeltas
+
+
+class SheetReader:
+    """
+    The active sheet of an XLSX file. Iterating yields one tuple per row
+    with the values of ``columns`` (header names, looked up in the first
+    row). Columns that are not found are reported through ``warn`` and
+    read as None.
+    """
+
+    def __init__(self, path, columns, warn=None):
+        self.path = path
+        self.columns = list(columns)
+        self.warn = warn
+
+    def _load(self, archive):
+        """Read the workbook's metadata; returns the path of the active sheet."""
+        workbook_path = 'xl/workbook.xml'
+        for rel in fromstring(archive.read('_rels/.rels')).iter(PACKAGE_RELATIONSHIP):
+            if rel.get('Type').endswith('/officeDocument'):
+                workbook_path = rel.get('Target').lstrip('/')
+        workbook = fromstring(archive.read(workbook_path))
+        rels = _relationships(archive, workbook_path)
+
+        view = workbook.find(f'{MAIN}bookViews/{MAIN}workbookView')
+        active = int(view.get('activeTab', 0)) if view is not None else 0
+        sheets = workbook.findall(f'{MAIN}sheets/{MAIN}sheet')
+        sheet_path = rels[sheets[active].get(RELATIONSHIP_ID)][1]
+
+        parts = {kind: target for kind, target in rels.values()}
+        if 'sharedStrings' in parts:
+            with archive.open(parts['sharedStrings']) as f:
+                self.strings = read_string_table(f)
+        else:
+            self.strings = []
+        self.dates, self.timedeltas = _styles(archive, parts.get('styles'))
+        properties = workbook.find(f'{MAIN}workbookPr')
+        if properties is not None and properties.get('date1904') in ('1', 'true'):
+            self.epoch = CALENDAR_MAC_1904
+        else:
+            self.epoch = CALENDAR_WINDOWS_1900
+        return sheet_path
+
+    def _value(self, kind, style, text):
+        """A cell's value, converted the way openpyxl does, from its raw text."""
+        if kind == 'inlineStr':
+            return text
+        if not text:
+            return None
+        if kind == 'n':
+            if '.' in text or 'E' in text or 'e' in text:
+                value = float(text)
+            else:
+                value = int(text)
+            if style and int(style) in self.dates:
+                try:
+                    return from_excel(value, self.epoch, timedelta=int(style) in self.timedeltas)
+                except (OverflowError, ValueError):
+                    return '#VALUE!'
+            return value
+        if kind == 's':
+            return self.strings[int(text)]
+        if kind == 'b':
+            return bool(int(text))
+        if kind == 'd':
+            return from_ISO8601(text)
+        return text
+
+    def _positions(self, header):
+        """{column index: output position} from the header row's {column index: value}."""
+        headers = {}
+        for column, value in sorted(header.items()):
+            headers.setdefault(value, column)
+        for name in self.columns:
+            if name not in headers and self.warn is not None:
+                self.warn(f'Column "{name}" not found in Excel')
+        return {headers[name]: i for i, name in enumerate(self.columns) if name in headers}
+
+    def __iter__(self):
+        with zipfile.ZipFile(self.path) as archive:
+            with archive.open(self._load(archive)) as sheet:
+                yield from self._rows(iter(lambda: sheet.read(CHUNK_SIZE), b''))
+
+    def blocks(self, size):
+        """
+        Split the sheet for parsing in other processes. Yields the XML up
+        to the end of the header row first, then blocks of about ``size``
+        bytes that each end with a complete row. ``parse_block(head,
+        block)`` of a SheetReader for the same file gives a block's rows.
+        """
+        with zipfile.ZipFile(self.path) as archive:
+            with archive.open(self._load(archive)) as sheet:
+                data = b''
+                end = None
+                while end is None:
+                    chunk = sheet.read(size)
+                    data += chunk
+                    end = ROW_END.search(data)
+                    if not chunk:
+                        break
+                if end is None:
+                    return
+                head, data = data[:end.end()], data[end.end():]
+                # Parsed here too, to report missing columns once
+                for _ in self._rows([head], final=False):
+                    pass
+                yield head
+
+                while True:
+                    chunk = sheet.read(size)
+                    data += chunk
+                    end = None
+                    for end in ROW_END.finditer(data):
+                        pass
+                    if end is not None:
+                        yield data[:end.end()]
+                        data = data[end.end():]
+                    if not chunk:
+                        return
+
+    def load(self):
+        """Read the workbook's metadata, for ``parse_block``."""
+        with zipfile.ZipFile(self.path) as archive:
+            self._load(archive)
+
+    def parse_block(self, head, block):
+        """The rows of a block from ``blocks``, as a list."""
+        return list(self._rows([head, block], final=False))
+
+    def _rows(self, chunks, final=True):
+        # Expat handlers rather than ElementTree elements: no object is
+        # built for the cells of unwanted columns, and the rows completed
+        # by each chunk of XML are handed out before the next is parsed.
+        width = len(self.columns)
+        wanted = None  # column index -> position in the output tuple
+        indexes = {}  # column letters -> column index
+        rows = []
+        values = cell = text = None
+        column = -1
+        in_text = in_phonetic = False
+
+        def start(name, attrs):
+            nonlocal values, cell, text, column, in_text, in_phonetic
+            if name == CELL:
+                ref = attrs.get('r')
+                if ref:
+                    letters = ref.rstrip('0123456789')
+                    column = indexes.get(letters)
+                    if column is None:
+                        column = indexes[letters] = _column_index(letters)
+                else:
+                    column += 1
+                if wanted is None or column in wanted:
+                    cell = (column, attrs.get('t', 'n'), attrs.get('s'))
+                    text = []
+            elif name == ROW:
+                values = {} if wanted is None else [None] * width
+                column = -1
+            elif cell is not None and (name == VALUE or name == TEXT) and not in_phonetic:
+                in_text = True
+            elif name == PHONETIC:
+                in_phonetic = True
+
+        def end(name):
+            nonlocal wanted, cell, in_text, in_phonetic
+            if name == CELL:
+                if cell is not None:
+                    column, kind, style = cell
+                    value = self._value(kind, style, ''.join(text))
+                    values[column if wanted is None else wanted[column]] = value
+                    cell = None
+            elif name == ROW:
+                if wanted is None:
+                    wanted = self._positions(values)
+                else:
+                    rows.append(tuple(values))
+            elif name == VALUE or name == TEXT:
+                in_text = False
+            elif name == PHONETIC:
+                in_phonetic = False
+
+        def data(chars):
+            if in_text:
+                text.append(chars)
+
+        parser = ParserCreate(namespace_separator=' ')
+        parser.buffer_text = True
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = data
+
+        for chunk in chunks:
+            parser.Parse(chunk, False)
+            yield from rows
+            rows.clear()
+        if final:
+            parser.Parse(b'', True)
+            yield from rows
@@ -31,6 +31,12 @@ export const fetchOffenceSubgroups = (params = {}) =>
 export const fetchOffenceBreakdown = (params = {}) =>
     api.get('/offence-breakdown/', { params }).then(r => r.data);
 
+// Overview page bundle: { summary, borough_totals, offence_breakdown }.
+// borough_totals ignores the borough filter and offence_breakdown ignores
+// offence_groups, matching what the page fetched separately before.
+export const fetchDashboard = (params = {}) =>
+    api.get('/dashboard/', { params }).then(r => r.data);
+
 export const fetchBoroughRanking = (params = {}) =>
     api.get('/borough-ranking/', { params }).then(r => r.data);
 
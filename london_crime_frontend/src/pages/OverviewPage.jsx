@@ -5,9 +5,8 @@ import KPICards from '../components/KPICards';
 import BoroughMap from '../components/BoroughMap';
 import OffenceBarChart from '../components/OffenceBarChart';
 import {
-    fetchSummary, fetchBoroughs, fetchDateRange,
-    fetchBoroughTotals,
-    fetchOffenceBreakdown,
+    fetchBoroughs, fetchDateRange,
+    fetchDashboard,
     fetchOffenceGroups, fetchOffenceSubgroups
 } from '../api/crimeApi';
 
@@ -100,12 +99,6 @@ export default function OverviewPage() {
             params.end_date = params.start_date;
         }
 
-        // Add offence_group to API params when drilled to group or subgroup level
-        const dataParams = { ...params };
-        if (drillGroup) {
-            dataParams.offence_group = drillGroup;
-        }
-
         // Apply drill-down context to params
         const drillParams = {};
         if (drillGroup) {
@@ -119,16 +112,11 @@ export default function OverviewPage() {
 
         const summaryParams = { ...params, ...drillParams };
 
-        // Map Context Params: Exclude borough filter to keep all boroughs colored
-        const mapParams = { ...summaryParams };
-        delete mapParams.borough;
-
-        Promise.all([
-            fetchSummary(summaryParams), // Validated: KPIs update on chart drill-down
-            fetchBoroughTotals(mapParams), // Validated: Map updates on chart drill-down
-            fetchOffenceBreakdown(dataParams)
-        ])
-            .then(([sum, bt, ob]) => {
+        // One request for KPIs, map and bar chart. The backend drops the
+        // borough filter for the map (keeps all boroughs coloured) and the
+        // category's offence_groups for the breakdown.
+        fetchDashboard(summaryParams)
+            .then(({ summary: sum, borough_totals: bt, offence_breakdown: ob }) => {
                 if (active) {
                     setSummary(sum);
                     setBoroughTotals(bt);